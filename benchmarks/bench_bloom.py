@@ -0,0 +1,67 @@
+"""
+Insert/query throughput and serialized size: ScalableBloomFilter raw format vs. pickled pybloom_live filters.
+
+    python benchmarks/bench_bloom.py --items 100000 1000000
+"""
+import argparse
+import base64
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from utils.bloom_filter import ScalableBloomFilter
+from utils.hashing_utils import salted_digest, serialize_bloom_filter_base64, deserialize_bloom_filter_base64
+
+
+def bench(name, bloom, items, missing, serialize, deserialize) -> None:
+    start = time.perf_counter()
+    for item in items:
+        bloom.add(item)
+    insert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(1 for item in missing if item in bloom)
+    query_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serialized = serialize(bloom)
+    serialize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored = deserialize(serialized)
+    deserialize_seconds = time.perf_counter() - start
+    assert items[0] in restored
+
+    print(f"{name:<10} n={len(items):>9}  insert {len(items) / insert_seconds:>10.0f}/s  "
+          f"query {len(missing) / query_seconds:>10.0f}/s  fp {hits / len(missing):.5f}  "
+          f"size {len(serialized) / 1024:>9.1f} KB  dump {serialize_seconds * 1000:>7.1f} ms  "
+          f"load {deserialize_seconds * 1000:>7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    for count in args.items:
+        items = [salted_digest(f"message{i}", "bench") for i in range(count)]
+        missing = [salted_digest(f"missing{i}", "bench") for i in range(min(count, 100000))]
+
+        bench('raw', ScalableBloomFilter(), items, missing,
+              serialize_bloom_filter_base64, deserialize_bloom_filter_base64)
+
+        try:
+            from pybloom_live import ScalableBloomFilter as PickledBloomFilter
+        except ImportError:
+            print("pybloom_live not installed, skipping pickle comparison")
+            continue
+        bench('pickle', PickledBloomFilter(initial_capacity=100000, error_rate=0.001), items, missing,
+              lambda bloom: base64.b64encode(pickle.dumps(bloom)).decode('utf-8'),
+              lambda data: pickle.loads(base64.b64decode(data.encode('utf-8'))))
+
+
+if __name__ == '__main__':
+    main()
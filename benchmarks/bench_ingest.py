@@ -0,0 +1,79 @@
+"""
+Compare chats.json ingest: json.load + get_source_data vs. the streaming get_source_data_stream.
+
+Each mode runs in a fresh interpreter so peak RSS is measured per mode.
+
+    python benchmarks/bench_ingest.py --sizes 10 100 1000   # sizes in MB
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from synthetic_chats import Workload, generate_chats, write_chats_json
+
+MESSAGES_PER_CHAT = 5000
+
+
+def size_workload(size_mb: int, seed: int = 42) -> Workload:
+    """A workload whose chats.json is roughly size_mb megabytes, sized from a one-chat sample."""
+    sample = Workload(chats=1, messages_per_chat=1000, seed=seed)
+    bytes_per_message = len(json.dumps(generate_chats(sample))) / sample.messages
+    chats = math.ceil(size_mb * 1024 * 1024 / (bytes_per_message * MESSAGES_PER_CHAT))
+    return Workload(chats=chats, messages_per_chat=MESSAGES_PER_CHAT, seed=seed)
+
+
+def run_mode(mode: str, path: str) -> None:
+    """Parse path with the given mode and print a JSON result line."""
+    from proof import get_source_data, get_source_data_stream
+
+    start = time.perf_counter()
+    with open(path, 'r') as f:
+        if mode == 'stream':
+            source_data = get_source_data_stream(f)
+        else:
+            source_data = get_source_data(json.load(f))
+    elapsed = time.perf_counter() - start
+    messages = sum(len(chat.contents) for chat in source_data.source_chats)
+    print(json.dumps({
+        'mode': mode,
+        'seconds': round(elapsed, 3),
+        'messages': messages,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size_mb in args.sizes:
+            path = os.path.join(tmp_dir, f'chats_{size_mb}mb.json')
+            write_chats_json(path, size_workload(size_mb))
+            for mode in ('load', 'stream'):
+                result = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run', mode, path],
+                    capture_output=True, text=True, check=True
+                )
+                stats = json.loads(result.stdout.strip().splitlines()[-1])
+                print(f"{size_mb:>5} MB  {mode:<6}  {stats['seconds']:>8.2f}s  "
+                      f"peak RSS {stats['peak_rss_mb']:>8.1f} MB  messages {stats['messages']}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
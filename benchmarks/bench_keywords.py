@@ -0,0 +1,56 @@
+"""
+Keyword engine timing: per-chat gensim LDA vs. one shared TF-IDF matrix, over the demo chats scaled up.
+
+    python benchmarks/bench_keywords.py --scale 100
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'my_proof'))
+
+from proof import get_source_data
+from utils.feature_extraction import get_keywords_lda, get_keywords_tfidf_batch
+
+
+def load_scaled_chats(path: str, scale: int):
+    with open(path, 'r') as f:
+        input_data = json.load(f)
+    chats = input_data['chats']
+    input_data['chats'] = [
+        dict(chat, chat_id=f"{chat['chat_id']}-{copy}")
+        for copy in range(scale)
+        for chat in chats
+    ]
+    source_data = get_source_data(input_data)
+    return [chat.content_as_text() for chat in source_data.source_chats if chat.contents]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default=os.path.join(ROOT, 'input', 'chats.json'))
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--keywords', type=int, default=10)
+    args = parser.parse_args()
+
+    texts = load_scaled_chats(args.input, args.scale)
+    print(f"{len(texts)} chats, {sum(len(text) for text in texts)} characters")
+
+    start = time.perf_counter()
+    for text in texts:
+        get_keywords_lda(text, args.keywords)
+    lda_seconds = time.perf_counter() - start
+    print(f"lda    {lda_seconds:>8.2f}s  {len(texts) / lda_seconds:>8.1f} chats/s")
+
+    start = time.perf_counter()
+    get_keywords_tfidf_batch(texts, args.keywords)
+    tfidf_seconds = time.perf_counter() - start
+    print(f"tfidf  {tfidf_seconds:>8.2f}s  {len(texts) / tfidf_seconds:>8.1f} chats/s  "
+          f"({lda_seconds / tfidf_seconds:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Keyword tokenization: nltk word_tokenize, as get_keywords_lda used to call it per chat,
+against utils.text_preprocessing.TextPreprocessor on the same chats. Exits 1 if any chat's
+tokens differ, since LDA/TF-IDF keywords are only unchanged if the tokens are.
+
+    python benchmarks/bench_preprocessing.py --input input/chats.json --repeat 3
+    python benchmarks/bench_preprocessing.py --chats 200 --messages-per-chat 500
+
+Needs the NLTK punkt_tab and stopwords data, as the proof does.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from synthetic_chats import Workload, generate_chats
+
+
+def chat_texts(export: Dict[str, Any]) -> List[str]:
+    """The text of each chat as validate_data analyzes it."""
+    from proof import get_source_data
+
+    return [source_chat.content_as_text() for source_chat in get_source_data(export).source_chats]
+
+
+def reference_tokens(texts: List[str], stop_words) -> List[List[str]]:
+    from nltk.tokenize import word_tokenize
+
+    return [[word for word in word_tokenize(text.lower()) if word.isalnum() and word not in stop_words] for text in texts]
+
+
+def best_of(repeat: int, func):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', help='chats.json to tokenize instead of a synthetic workload')
+    parser.add_argument('--chats', type=int, default=Workload.chats)
+    parser.add_argument('--messages-per-chat', type=int, default=Workload.messages_per_chat)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--languages', default='english', help='comma-separated stopword languages')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from utils.text_preprocessing import TextPreprocessor
+
+    if args.input:
+        with open(args.input, 'r') as f:
+            export = json.load(f)
+    else:
+        export = generate_chats(Workload(chats=args.chats, messages_per_chat=args.messages_per_chat, seed=args.seed))
+    texts = chat_texts(export)
+    chars = sum(len(text) for text in texts)
+
+    preprocessor = TextPreprocessor(args.languages.split(','))
+    reference_seconds, expected = best_of(args.repeat, lambda: reference_tokens(texts, preprocessor.stop_words))
+
+    def fast():
+        # a fresh chunk cache per repetition, like the first submission a worker sees
+        preprocessor._chunk_words.clear()
+        return preprocessor.tokenize_batch(texts)
+
+    seconds, tokens = best_of(args.repeat, fast)
+    count = sum(len(words) for words in expected)
+    print(f"{len(texts)} chats, {chars:,} characters, {count:,} keyword tokens")
+    print(f"word_tokenize     {reference_seconds:9.3f}s  {count / reference_seconds:>12,.0f} tokens/s")
+    print(f"TextPreprocessor  {seconds:9.3f}s  {count / seconds:>12,.0f} tokens/s  ({reference_seconds / seconds:.1f}x)")
+
+    mismatches = [index for index, (a, b) in enumerate(zip(tokens, expected)) if a != b]
+    if mismatches:
+        print(f"TOKENS DIFFER in {len(mismatches)} chats, first: chat {mismatches[0]}")
+        sys.exit(1)
+    print("Tokens identical for every chat")
+
+
+if __name__ == '__main__':
+    main()
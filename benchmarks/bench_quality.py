@@ -0,0 +1,61 @@
+"""
+Quality scoring of all chats: scalar SourceChatData.quality_score loop vs. the vectorized QualityColumns pass.
+
+    python benchmarks/bench_quality.py --chats 1000 10000 100000
+
+Fails if any vectorized score differs from the scalar one.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from models.cargo_data import SourceChatData
+from utils.quality_scoring import QualityColumns
+
+
+def synthetic_chats(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    chats = []
+    for chat_id in range(count):
+        chat = SourceChatData(chat_id=chat_id + 1)
+        for _ in range(rng.randint(0, 12)):
+            chat.add_participant(rng.randint(1, 6))
+            chat.add_content('x' * rng.randint(1, 200), rng.randint(0, 60 * 24 * 30))
+        chats.append(chat)
+    return chats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chats', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    for count in args.chats:
+        chats = synthetic_chats(count)
+
+        start = time.perf_counter()
+        scalar = [chat.quality_score() for chat in chats]
+        scalar_seconds = time.perf_counter() - start
+        scalar_timeliness = [chat.timeliness_value() for chat in chats]
+
+        start = time.perf_counter()
+        columns = QualityColumns.from_chats(chats)
+        vectorized = columns.quality_scores()
+        vectorized_seconds = time.perf_counter() - start
+
+        mismatches = sum(a != b for a, b in zip(scalar, vectorized))
+        ulp_diffs = sum(a != b for a, b in zip(scalar_timeliness, columns.timeliness().tolist()))
+        print(f"chats={count:>7}  scalar {scalar_seconds * 1000:>8.1f} ms  "
+              f"vectorized {vectorized_seconds * 1000:>7.1f} ms  "
+              f"speedup {scalar_seconds / vectorized_seconds:>5.1f}x  "
+              f"score mismatches {mismatches}  unrounded timeliness diffs {ulp_diffs}")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Messages per second of get_source_data (chat extraction only, the export is already parsed) for
+each registered source adapter, on a synthetic export (see synthetic_chats.py).
+
+    python benchmarks/bench_source_adapters.py --messages 1000000
+    python benchmarks/bench_source_adapters.py --sources discord
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from proof import get_source_data
+from synthetic_chats import Workload, generate_chats
+from utils.source_adapters import SOURCE_ADAPTERS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--messages-per-chat', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sources', nargs='+', default=[source.name for source in SOURCE_ADAPTERS])
+    args = parser.parse_args()
+
+    for source in args.sources:
+        messages_per_chat = min(args.messages_per_chat, args.messages)
+        workload = Workload(chats=max(1, args.messages // messages_per_chat), messages_per_chat=messages_per_chat, seed=args.seed)
+        export = generate_chats(workload, source=source)
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            source_data = get_source_data(export)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        messages = sum(len(chat.contents) for chat in source_data.source_chats)
+        print(f"{source:<10} messages={messages}  best of {args.repeat}: {best:.2f}s  "
+              f"{messages / best:,.0f} messages/s")
+
+
+if __name__ == '__main__':
+    main()
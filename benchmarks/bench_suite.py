@@ -0,0 +1,206 @@
+"""
+Regression suite: get_source_data, validate_data and end-to-end Proof.proof_data on seeded
+synthetic Telegram workloads (see synthetic_chats.py) at several scales.
+
+Every (target, scale) case runs in a fresh interpreter so peak RSS is its own; models are
+loaded before timing and each repetition gets empty sealed indexes, so runs are repeatable.
+
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --threshold 0.15
+
+With --baseline the suite exits 1 if any case lost more than --threshold of its throughput
+or grew its peak RSS by more than --threshold. Baselines are only comparable on the same
+machine and settings (MODEL_DIR, INFERENCE_BACKEND, KEYWORD_ENGINE); the file records them.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from synthetic_chats import Workload, generate_chats
+
+SCALES = {
+    'small': {'chats': 20, 'messages_per_chat': 50},
+    'medium': {'chats': 100, 'messages_per_chat': 200},
+    'large': {'chats': 1000, 'messages_per_chat': 1000},
+}
+TARGETS = ('get_source_data', 'validate_data', 'proof_data')
+NLP_TARGETS = ('validate_data', 'proof_data')
+
+
+def suite_config(work_dir: str) -> Dict[str, Any]:
+    """Proof config for one repetition: fresh sealed indexes under work_dir, models as in the environment."""
+    sealed_dir = os.path.join(work_dir, 'sealed')
+    os.makedirs(sealed_dir, exist_ok=True)
+    return {
+        'dlp_id': 1234,
+        'use_sealing': True,
+        'sealed_dir': sealed_dir,
+        'input_dir': os.path.join(work_dir, 'input'),
+        'salt': 'bench',
+        'model_dir': os.environ.get('MODEL_DIR'),
+        'inference_backend': os.environ.get('INFERENCE_BACKEND', 'torch'),
+        'keyword_engine': os.environ.get('KEYWORD_ENGINE', 'lda'),
+        'sentiment_token_budget': int(os.environ.get('SENTIMENT_TOKEN_BUDGET', 8192)),
+        'workers': 1,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'model_dir': os.environ.get('MODEL_DIR'),
+        'inference_backend': os.environ.get('INFERENCE_BACKEND', 'torch'),
+        'keyword_engine': os.environ.get('KEYWORD_ENGINE', 'lda'),
+    }
+
+
+def run_case(target: str, workload: Workload, repeat: int) -> Dict[str, Any]:
+    """Time target on the workload in this process (the child side of the suite)."""
+    from models.cargo_data import CargoData
+    from models.proof_response import ProofResponse
+    from proof import Proof, get_source_data
+    from utils.feature_extraction import configure_models, warm_up_models
+    from utils.validate_data import validate_data
+
+    export = generate_chats(workload)
+    if target in NLP_TARGETS:
+        configure_models(os.environ.get('MODEL_DIR'), os.environ.get('INFERENCE_BACKEND', 'torch'))
+        warm_up_models()
+
+    seconds = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as work_dir:
+            config = suite_config(work_dir)
+            if target == 'proof_data':
+                os.makedirs(config['input_dir'])
+                with open(os.path.join(config['input_dir'], 'chats.json'), 'w') as f:
+                    json.dump(export, f)
+            elif target == 'validate_data':
+                cargo_data = CargoData(source_data=get_source_data(export), source_id='bench')
+                proof_response = ProofResponse(dlp_id=config['dlp_id'])
+            start = time.perf_counter()
+            if target == 'get_source_data':
+                get_source_data(export)
+            elif target == 'validate_data':
+                validate_data(config, cargo_data, proof_response)
+            else:
+                Proof(config).proof_data()
+            seconds.append(time.perf_counter() - start)
+
+    median = statistics.median(seconds)
+    return {
+        'messages': workload.messages,
+        'repeat': repeat,
+        'seconds_median': round(median, 6),
+        'seconds_min': round(min(seconds), 6),
+        'messages_per_second': round(workload.messages / median, 1) if median else None,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def run_in_child(target: str, workload: Workload, repeat: int) -> Dict[str, Any]:
+    command = [
+        sys.executable, os.path.abspath(__file__), '--child', target,
+        '--workload', json.dumps(workload.to_dict()), '--repeat', str(repeat)
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{target} failed:\n{completed.stderr[-4000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Descriptions of the cases that regressed beyond threshold against the baseline."""
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get('cases', {}).get(case)
+        if reference is None:
+            continue
+        if reference['workload'] != result['workload']:
+            logging.warning(f"{case}: workload differs from the baseline, not compared")
+            continue
+        throughput, reference_throughput = result['messages_per_second'], reference['messages_per_second']
+        if reference_throughput and throughput < reference_throughput * (1 - threshold):
+            regressions.append(f"{case}: {throughput:,.0f} messages/s vs. {reference_throughput:,.0f} in the baseline")
+        rss, reference_rss = result['peak_rss_bytes'], reference['peak_rss_bytes']
+        if reference_rss and rss > reference_rss * (1 + threshold):
+            regressions.append(f"{case}: peak RSS {rss / 2 ** 20:,.0f} MiB vs. {reference_rss / 2 ** 20:,.0f} MiB in the baseline")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=TARGETS)
+    parser.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mean-words', type=float, default=Workload.mean_words)
+    parser.add_argument('--length-sigma', type=float, default=Workload.length_sigma)
+    parser.add_argument('--participants', type=int, default=Workload.participants)
+    parser.add_argument('--duplicate-ratio', type=float, default=Workload.duplicate_ratio)
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='write the results as a new baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--child', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--workload', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(run_case(args.child, Workload(**json.loads(args.workload)), args.repeat)))
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    results = {}
+    for scale in args.scales:
+        workload = Workload(
+            **SCALES[scale],
+            mean_words=args.mean_words,
+            length_sigma=args.length_sigma,
+            participants=args.participants,
+            duplicate_ratio=args.duplicate_ratio,
+            seed=args.seed
+        )
+        for target in args.targets:
+            case = f"{target}/{scale}"
+            result = run_in_child(target, workload, args.repeat)
+            result['workload'] = workload.to_dict()
+            results[case] = result
+            print(f"{case:<24} messages={result['messages']:>8}  median {result['seconds_median']:>9.3f}s  "
+                  f"{result['messages_per_second']:>12,.0f} messages/s  "
+                  f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:>7,.0f} MiB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'environment': environment(), 'cases': results}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != environment():
+            logging.warning(f"Baseline environment {baseline.get('environment')} differs from {environment()}")
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
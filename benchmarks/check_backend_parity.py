@@ -0,0 +1,88 @@
+"""
+Accuracy parity of an inference backend against the fp32 torch pipeline on a fixed corpus.
+
+    MODEL_DIR=/models python benchmarks/check_backend_parity.py --backend onnx
+
+Exits non-zero when sentiment label agreement or embedding cosine similarity drop below the thresholds.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'my_proof'))
+
+from proof import get_source_data
+from utils.feature_extraction import ModelRegistry
+
+FIXED_CORPUS = [
+    "I love this, thank you so much!",
+    "This is the worst support I have ever had.",
+    "The meeting is at 3pm tomorrow.",
+    "Ich finde das Projekt wirklich großartig.",
+    "No estoy seguro de que esto funcione.",
+    "C'est correct, rien de spécial.",
+    "Please send me the login code again",
+    "lol that was hilarious 😂",
+    "Never give this code to anyone, even if they say they are from Telegram!",
+    "ok",
+]
+
+
+def load_corpus(path: str):
+    with open(path, 'r') as f:
+        source_data = get_source_data(json.load(f))
+    return FIXED_CORPUS + [content for chat in source_data.source_chats for content in chat.contents]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', default='quantized')
+    parser.add_argument('--input', default=os.path.join(ROOT, 'input', 'chats.json'))
+    parser.add_argument('--min-agreement', type=float, default=0.95)
+    parser.add_argument('--min-cosine', type=float, default=0.98)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.input)
+    model_dir = os.environ.get('MODEL_DIR')
+    reference = ModelRegistry(model_dir, 'torch')
+    candidate = ModelRegistry(model_dir, args.backend)
+
+    results = {}
+    for name, registry in (('torch', reference), (args.backend, candidate)):
+        sentiment_analyzer = registry.sentiment_analyzer()
+        encoder = registry.keybert().model
+        start = time.perf_counter()
+        sentiments = sentiment_analyzer(corpus)
+        sentiment_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        embeddings = np.asarray(encoder.embed(corpus), dtype=np.float32)
+        embed_seconds = time.perf_counter() - start
+        results[name] = (sentiments, embeddings)
+        print(f"{name:<10} load {sum(registry.load_seconds.values()):>6.2f}s  "
+              f"sentiment {sentiment_seconds:>6.2f}s  embeddings {embed_seconds:>6.2f}s")
+
+    reference_sentiments, reference_embeddings = results['torch']
+    candidate_sentiments, candidate_embeddings = results[args.backend]
+    agreement = np.mean([
+        a['label'].lower() == b['label'].lower() for a, b in zip(reference_sentiments, candidate_sentiments)
+    ])
+    score_diff = max(abs(a['score'] - b['score']) for a, b in zip(reference_sentiments, candidate_sentiments))
+    cosine = np.sum(reference_embeddings * candidate_embeddings, axis=1) / (
+        np.linalg.norm(reference_embeddings, axis=1) * np.linalg.norm(candidate_embeddings, axis=1)
+    )
+    print(f"{len(corpus)} texts: label agreement {agreement:.3f}, max score diff {score_diff:.4f}, "
+          f"min embedding cosine {cosine.min():.4f}")
+
+    if agreement < args.min_agreement or cosine.min() < args.min_cosine:
+        print("Parity check FAILED")
+        sys.exit(1)
+    print("Parity check passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Seeded generator of chats.json workloads, in Telegram (default) or Discord format. The same
+parameters and seed always give the same export, so benchmark runs on different commits see
+identical input.
+
+    python benchmarks/synthetic_chats.py /tmp/input/chats.json --chats 200 --messages-per-chat 500
+    python benchmarks/synthetic_chats.py /tmp/input/chats.json --source discord
+"""
+import argparse
+import json
+import math
+import os
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator
+
+SYLLABLES = "ba be bi bo bu ka ke ki ko ku la le li lo lu ma me mi mo mu na ne ni no nu ra re ri ro ru ta te ti to tu".split()
+# message dates count back from a fixed timestamp so the export is byte-identical between runs
+DEFAULT_NOW = 1767225600  # 2026-01-01T00:00:00Z
+
+
+@dataclass
+class Workload:
+    chats: int = 100
+    messages_per_chat: int = 200
+    mean_words: float = 12.0  # median words per message, lognormally distributed
+    length_sigma: float = 0.8  # spread of the lognormal message length
+    participants: int = 3  # distinct senders per chat
+    duplicate_ratio: float = 0.1  # share of messages repeating an earlier message verbatim
+    max_age_minutes: int = 60 * 24 * 7
+    vocabulary: int = 2000
+    seed: int = 42
+
+    @property
+    def messages(self) -> int:
+        return self.chats * self.messages_per_chat
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+    return sorted(words)
+
+
+def telegram_message(message_id: int, chat_id: int, sender: int, date: int, text: str) -> Dict[str, Any]:
+    return {
+        "@type": "message",
+        "id": message_id,
+        "sender_id": {"@type": "messageSenderUser", "user_id": sender},
+        "chat_id": chat_id,
+        "date": date,
+        "content": {
+            "@type": "messageText",
+            "text": {"@type": "formattedText", "text": text}
+        }
+    }
+
+
+def discord_message(message_id: int, chat_id: int, sender: int, date: int, text: str) -> Dict[str, Any]:
+    """A message as DiscordChatExporter writes it."""
+    return {
+        "id": str(message_id),
+        "type": "Default",
+        "timestamp": datetime.fromtimestamp(date, timezone.utc).isoformat(timespec='milliseconds'),
+        "timestampEdited": None,
+        "isPinned": False,
+        "content": text,
+        "author": {"id": str(sender), "name": f"user{sender}", "isBot": False},
+        "attachments": [],
+        "reactions": [],
+    }
+
+
+MESSAGE_FORMATS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'telegram': telegram_message,
+    'discord': discord_message,
+}
+
+
+def iter_chats(workload: Workload, now: int = DEFAULT_NOW, source: str = 'telegram') -> Iterator[Dict[str, Any]]:
+    """The chats of the export one at a time, so large exports can be written without holding them."""
+    make_message = MESSAGE_FORMATS[source]
+    rng = random.Random(workload.seed)
+    vocabulary = make_vocabulary(rng, workload.vocabulary)
+    log_mean = math.log(max(workload.mean_words, 1.0))
+    sent = []  # texts already generated, the pool duplicates are drawn from
+    message_id = 0
+    for chat_index in range(workload.chats):
+        chat_id = chat_index + 1
+        senders = [chat_id * 1000 + k for k in range(max(workload.participants, 1))]
+        contents = []
+        for _ in range(workload.messages_per_chat):
+            message_id += 1
+            if sent and rng.random() < workload.duplicate_ratio:
+                text = sent[rng.randrange(len(sent))]
+            else:
+                words = max(1, round(rng.lognormvariate(log_mean, workload.length_sigma)))
+                text = " ".join(rng.choices(vocabulary, k=words))
+                sent.append(text)
+            sender = rng.choice(senders)
+            date = now - 60 * rng.randint(0, workload.max_age_minutes)
+            contents.append(make_message(message_id, chat_id, sender, date, text))
+        yield {"chat_id": chat_id, "contents": contents}
+
+
+def generate_chats(workload: Workload, now: int = DEFAULT_NOW, source: str = 'telegram') -> Dict[str, Any]:
+    """A chats.json export as parsed JSON."""
+    return {"source": source, "user": f"bench-{workload.seed}", "chats": list(iter_chats(workload, now, source))}
+
+
+def write_chats_json(path: str, workload: Workload, now: int = DEFAULT_NOW, source: str = 'telegram') -> None:
+    """Write the export chat by chat; the file is the same as json.dump(generate_chats(...))."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(json.dumps({"source": source, "user": f"bench-{workload.seed}"})[:-1] + ', "chats": [')
+        for index, chat in enumerate(iter_chats(workload, now, source)):
+            if index:
+                f.write(', ')
+            json.dump(chat, f)
+        f.write(']}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    parser.add_argument('--source', choices=sorted(MESSAGE_FORMATS), default='telegram')
+    defaults = Workload()
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+    workload = Workload(**{name: getattr(args, name) for name in defaults.to_dict()})
+    write_chats_json(args.path, workload, source=args.source)
+    print(f"Wrote {workload.messages} messages in {workload.chats} chats to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,23 @@
+import time
+
+START_TIME = time.perf_counter()
+
+from utils.import_timer import import_timer
+
+import_timer.install()  # before any other import, so the startup report covers them
+
+import argparse
 import json
 import logging
 import os
 import sys
 import traceback
-import zipfile
 from typing import Dict, Any
 
+from batch import list_submissions, run_batch
 from proof import Proof
+from server import serve
+from utils.feature_extraction import configure_models, configure_embedding_cache, configure_stopwords, warm_up_models, get_model_stats
 
 INPUT_DIR, OUTPUT_DIR, SEALED_DIR = '/input', '/output', '/sealed'
 #INPUT_DIR, OUTPUT_DIR, SEALED_DIR = 'input', 'output', '/sealed'
@@ -19,13 +30,46 @@ def load_config() -> Dict[str, Any]:
     config = {
         'dlp_id': 1234,  # Set your own DLP ID here
         'use_sealing': os.path.isdir(SEALED_DIR),
+        'sealed_dir': SEALED_DIR,
         'input_dir': INPUT_DIR,
         'salt': os.environ.get('SALT', None), #TODO: Move Salt to Secrets in manifest https://docs.vana.org/docs/data-validation#running-proofs-on-a-satya-node
+        'model_dir': os.environ.get('MODEL_DIR', None),  # pre-downloaded models for offline enclaves
+        'inference_backend': os.environ.get('INFERENCE_BACKEND', 'torch'),  # 'torch', 'quantized' or 'onnx'
+        'warm_up_models': os.environ.get('WARM_UP_MODELS', '0') == '1',
+        'embedding_cache_size': int(os.environ.get('EMBEDDING_CACHE_SIZE', 50000)),  # in-memory KeyBERT embeddings
+        'embedding_cache_dir': os.environ.get('EMBEDDING_CACHE_DIR', None),  # optional memory-mapped disk tier
+        'sentiment_token_budget': int(os.environ.get('SENTIMENT_TOKEN_BUDGET', 8192)),  # padded tokens per batch
+        'stream_input': os.environ.get('STREAM_INPUT', '0') == '1',  # incremental chats.json parsing
+        'workers': int(os.environ.get('PROOF_WORKERS', 1)),  # > 1 extracts keywords in a process pool
+        'keyword_engine': os.environ.get('KEYWORD_ENGINE', 'lda'),  # 'lda' or 'tfidf', fills keywords_lda
+        'stopword_languages': os.environ.get('STOPWORD_LANGUAGES', 'english').split(','),  # NLTK stopword lists for lda/tfidf
+        'worker_torch_threads': int(os.environ.get('TORCH_THREADS_PER_WORKER', 0)),  # 0: cores / workers
+        'server_queue_size': int(os.environ.get('PROOF_QUEUE_SIZE', 16)),  # --serve: jobs waiting before 503
+        'max_input_file_bytes': int(os.environ.get('MAX_INPUT_FILE_BYTES', 1 << 30)),  # uncompressed, per file
+        'max_input_total_bytes': int(os.environ.get('MAX_INPUT_TOTAL_BYTES', 2 << 30)),  # uncompressed, per submission
+        'max_compression_ratio': int(os.environ.get('MAX_COMPRESSION_RATIO', 100)),  # zip bomb guard
+        'min_message_chars': int(os.environ.get('MIN_MESSAGE_CHARS', 16)),  # shorter messages are ignored by message dedup
+        'chat_cache_max_entries': int(os.environ.get('CHAT_CACHE_MAX_ENTRIES', 100000)),  # sealed per-chat results, 0: off
+        'analysis_budget_seconds': float(os.environ.get('ANALYSIS_BUDGET_SECONDS', 0)),  # 0: analyze every chat
+        'analysis_budget_chars': int(os.environ.get('ANALYSIS_BUDGET_CHARS', 0)),  # 0: analyze every chat
+        'sample_max_chars': int(os.environ.get('SAMPLE_MAX_CHARS', 0)),  # larger chats are analyzed from a sample, 0: off
+        'sample_strategy': os.environ.get('SAMPLE_STRATEGY', 'stratified'),  # 'stratified' (by message age) or 'reservoir'
+        'sample_seed': int(os.environ.get('SAMPLE_SEED', 0)),
+        'profile': os.environ.get('PROFILE', 'off'),  # 'off', 'time' or 'memory' (adds per-stage peak allocations)
+        'profile_attributes': os.environ.get('PROFILE_ATTRIBUTES', '0') == '1',  # also put the profile in attributes
     }
     logging.info(f"Using config: {json.dumps(config, indent=2)}")
     return config
 
 
+def prepare_models(config: Dict[str, Any]) -> None:
+    configure_models(config['model_dir'], config['inference_backend'])
+    configure_embedding_cache(config['embedding_cache_size'], config['embedding_cache_dir'])
+    configure_stopwords(config['stopword_languages'])
+    if config['warm_up_models']:
+        warm_up_models()
+
+
 def run() -> None:
     """Generate proofs for all input files."""
     config = load_config()
@@ -33,9 +77,12 @@ def run() -> None:
 
     if not input_files_exist:
         raise FileNotFoundError(f"No input files found in {INPUT_DIR}")
-    extract_input()
+    # zips in INPUT_DIR are read in place by Proof, see utils.input_files
+
+    prepare_models(config)
 
     proof = Proof(config)
+    startup_seconds = time.perf_counter() - START_TIME
 
     #proof_response = proof.generate()
     #RL: new code ...
@@ -44,25 +91,62 @@ def run() -> None:
     output_path = os.path.join(OUTPUT_DIR, "results.json")
     with open(output_path, 'w') as f:
         json.dump(proof_response.dict(), f, indent=2)
+    if proof.profile is not None:
+        with open(os.path.join(OUTPUT_DIR, "profile.json"), 'w') as f:
+            json.dump(proof.profile, f, indent=2)
     logging.info(f"Proof generation complete: {proof_response}")
+    logging.info(f"Model stats: {json.dumps(get_model_stats(), indent=2)}")
+    log_startup_report(startup_seconds)
 
 
-def extract_input() -> None:
-    """
-    If the input directory contains any zip files, extract them
-    :return:
-    """
-    for input_filename in os.listdir(INPUT_DIR):
-        input_file = os.path.join(INPUT_DIR, input_filename)
+def run_batch_mode(batch_path: str, output_path: str) -> None:
+    """Generate proofs for many submissions (folders or zips) with one set of loaded models."""
+    config = load_config()
+    submissions = list_submissions(batch_path)
+    if not submissions:
+        raise FileNotFoundError(f"No submissions found in {batch_path}")
+    logging.info(f"Proving {len(submissions)} submissions from {batch_path}")
+
+    prepare_models(config)
+    run_batch(config, submissions, output_path)
+    logging.info(f"Model stats: {json.dumps(get_model_stats(), indent=2)}")
+    log_startup_report(time.perf_counter() - START_TIME)
+
+
+def run_server_mode(socket_path: str, port: int) -> None:
+    """Keep models and indexes loaded and prove submissions posted to a local HTTP endpoint."""
+    config = load_config()
+    config['warm_up_models'] = True
+    prepare_models(config)
+    log_startup_report(time.perf_counter() - START_TIME)
+    serve(config, socket_path, port, config['server_queue_size'])
+
 
-        if zipfile.is_zipfile(input_file):
-            with zipfile.ZipFile(input_file, 'r') as zip_ref:
-                zip_ref.extractall(INPUT_DIR)
+def log_startup_report(startup_seconds: float) -> None:
+    """Time to reach the proof and the packages that took longest to import, including lazy imports."""
+    logging.info(f"Startup: {startup_seconds:.3f}s to reach the proof, "
+                 f"{import_timer.total_seconds():.3f}s importing, "
+                 f"{time.perf_counter() - START_TIME:.3f}s total")
+    for package, seconds in import_timer.report():
+        logging.info(f"  import {package:<24} {seconds:.4f}s")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch', help='directory of submission folders/zips, or a manifest listing them')
+    parser.add_argument('--output', default=os.path.join(OUTPUT_DIR, 'batch'),
+                        help='batch output directory, or a .jsonl file for one JSON line per submission')
+    parser.add_argument('--serve', action='store_true', help='run as a resident proof worker')
+    parser.add_argument('--socket', help='--serve on this Unix socket instead of localhost')
+    parser.add_argument('--port', type=int, default=8000, help='--serve on this localhost port')
+    args = parser.parse_args()
     try:
-        run()
+        if args.serve:
+            run_server_mode(args.socket, args.port)
+        elif args.batch:
+            run_batch_mode(args.batch, args.output)
+        else:
+            run()
     except Exception as e:
         logging.error(f"Error during proof generation: {e}")
         traceback.print_exc()
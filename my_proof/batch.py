@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import time
+import traceback
+from typing import Any, Dict, List
+
+import numpy as np
+
+from proof import Proof
+from utils.input_files import is_zip
+
+
+def list_submissions(path: str) -> List[str]:
+    """
+    Submissions to prove: the folders and zip files in a directory, or the paths listed
+    one per line in a manifest file (relative paths are resolved against the manifest).
+    """
+    if os.path.isdir(path):
+        return [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if os.path.isdir(os.path.join(path, name)) or is_zip(os.path.join(path, name))
+        ]
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base_dir, line) for line in lines if line and not line.startswith('#')]
+
+
+def submission_id(path: str) -> str:
+    name = os.path.basename(os.path.normpath(path))
+    return name[:-len('.zip')] if name.lower().endswith('.zip') else name
+
+
+def write_result(output_path: str, record: Dict[str, Any], jsonl_file) -> None:
+    if jsonl_file is not None:
+        jsonl_file.write(json.dumps(record) + '\n')
+        jsonl_file.flush()
+        return
+    result_dir = os.path.join(output_path, record['submission'])
+    os.makedirs(result_dir, exist_ok=True)
+    with open(os.path.join(result_dir, 'results.json'), 'w') as f:
+        json.dump(record.get('result') or record, f, indent=2)
+    if record.get('profile') is not None:
+        with open(os.path.join(result_dir, 'profile.json'), 'w') as f:
+            json.dump(record['profile'], f, indent=2)
+
+
+def run_batch(config: Dict[str, Any], submissions: List[str], output_path: str) -> Dict[str, Any]:
+    """
+    Prove submissions one after another in this process, sharing the loaded models and the
+    sealed uniqueness/near-duplicate indexes, so each submission sees the ones before it.
+    Results go to <output_path>/<submission>/results.json (and profile.json when profiling),
+    or to one JSONL stream when output_path ends in .jsonl. A failing submission is recorded and the batch continues.
+    """
+    jsonl_file = None
+    if output_path.endswith('.jsonl'):
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        jsonl_file = open(output_path, 'w')
+    else:
+        os.makedirs(output_path, exist_ok=True)
+
+    latencies = []
+    failed = 0
+    batch_start = time.perf_counter()
+    try:
+        for path in submissions:
+            record: Dict[str, Any] = {'submission': submission_id(path)}
+            start = time.perf_counter()
+            try:
+                # a folder or a zip; zips are read in place by utils.input_files
+                proof = Proof(dict(config, input_dir=path))
+                record['result'] = proof.proof_data().dict()
+                if proof.profile is not None:
+                    record['profile'] = proof.profile
+            except Exception as e:
+                failed += 1
+                record['error'] = str(e)
+                logging.error(f"Error proving {path}: {e}")
+                traceback.print_exc()
+            latency = time.perf_counter() - start
+            latencies.append(latency)
+            record['latency_seconds'] = round(latency, 4)
+            write_result(output_path, record, jsonl_file)
+            logging.info(f"Proved {record['submission']} in {latency:.3f}s")
+    finally:
+        if jsonl_file is not None:
+            jsonl_file.close()
+
+    elapsed = time.perf_counter() - batch_start
+    report = {
+        'submissions': len(submissions),
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'submissions_per_second': round(len(submissions) / elapsed, 3) if elapsed else 0.0,
+        'latency_p50_seconds': round(float(np.percentile(latencies, 50)), 4) if latencies else None,
+        'latency_p95_seconds': round(float(np.percentile(latencies, 95)), 4) if latencies else None,
+    }
+    logging.info(f"Batch complete: {json.dumps(report)}")
+    return report
@@ -1,3 +1,5 @@
+from array import array
+from collections.abc import Sequence
 from enum import Enum
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
@@ -10,15 +12,83 @@ from dataclasses import dataclass, field
 # Enum for DataSource
 class DataSource(Enum):
     telegram = 1
+    discord = 2
+
+CONTENT_SEPARATOR = "\r"
+
+# quality score parameters, shared with the vectorized scoring in utils.quality_scoring
+TIMELINESS_HALF_LIFE_MINUTES = 60
+OPTIMAL_PARTICIPANTS = 2
+PARTICIPANTS_DEVIATION = 1
+CONTEXT_MIDPOINT = 2
+CONTEXT_STEEPNESS = 1
+
+
+class ChatContents(Sequence):
+    """
+    Read-only list-like view of a chat's messages, decoded from the chat's UTF-8 buffer on access.
+    """
+    __slots__ = ("_chat",)
+
+    def __init__(self, chat: 'SourceChatData'):
+        self._chat = chat
+
+    def __len__(self) -> int:
+        return len(self._chat.content_lengths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return str(self._chat.content_bytes(index), "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield str(self._chat.content_bytes(index), "utf-8")
+
+    def __repr__(self) -> str:
+        return f"ChatContents({len(self)} messages)"
+
 
 # Source Chat Data
-@dataclass
 class SourceChatData:
-    chat_id: int
-    participants: list[str] = field(default_factory=list)
-    contents: list[str] = field(default_factory=list)
-    total_content_length: int = 0
-    total_content_value: int = 0
+    """
+    Chat messages stored compactly: the UTF-8 text of all messages in one buffer, separated
+    like content_as_text joins them, with message end offsets, character lengths and age in
+    minutes in int arrays, and the participants as dict keys, in the order they were added.
+    A message costs its UTF-8 bytes plus 16 bytes instead of a str object and list slot per message.
+    """
+    __slots__ = (
+        "chat_id", "buffer", "content_ends", "content_lengths", "content_minutes",
+        "participant_ids", "total_content_length", "total_content_value",
+    )
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.buffer = bytearray()
+        self.content_ends = array("q")  # end offset of each message in buffer
+        self.content_lengths = array("i")  # characters per message
+        self.content_minutes = array("i")  # minutes between the message and the submission
+        self.participant_ids: Dict[str, None] = {}
+        self.total_content_length = 0
+        self.total_content_value = 0
+
+    @property
+    def contents(self) -> ChatContents:
+        return ChatContents(self)
+
+    @property
+    def participants(self) -> List[str]:
+        return list(self.participant_ids)
+
+    def content_bytes(self, index: int) -> memoryview:
+        """UTF-8 bytes of one message, without copying."""
+        count = len(self.content_ends)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("message index out of range")
+        start = self.content_ends[index - 1] + len(CONTENT_SEPARATOR) if index else 0
+        return memoryview(self.buffer)[start:self.content_ends[index]]
 
     def timeliness_value(self) -> float:
         if self.total_content_length == 0:
@@ -26,23 +96,23 @@ class SourceChatData:
         # tav = (𝛴 litsi) / (𝛴 li)
         time_avg = self.total_content_value / self.total_content_length
         # a = ln(2) / thl
-        half_life = 60  # 60 minutes
+        half_life = TIMELINESS_HALF_LIFE_MINUTES  # 60 minutes
         time_decay = math.log(2) / half_life
         # t = exp(-atav)
         return math.exp(- time_decay * time_avg)  # range 0 to 1
 
     def thoughtfulness_of_conversation(self) -> float:
-        n = len(self.participants)  # n: number of participants
-        u = 2  # 𝜇: optimal number of participants
-        d = 1  # 𝜎: standard deviation of the curve
+        n = len(self.participant_ids)  # n: number of participants
+        u = OPTIMAL_PARTICIPANTS  # 𝜇: optimal number of participants
+        d = PARTICIPANTS_DEVIATION  # 𝜎: standard deviation of the curve
 
         # Formula: p = exp(-(n-𝜇) / (2𝜎^2))
         return math.exp(-(n - u) / (2 * d ** 2))  # range 0 to 1
 
     def contextualness_of_conversation(self)  -> float:
         c = self.total_content_length #total token length, c, of the text data
-        m = 2 #midpoint
-        k = 1 #key parameters.
+        m = CONTEXT_MIDPOINT #midpoint
+        k = CONTEXT_STEEPNESS #key parameters.
         # l=1/(1+exp(-k(c-c0)))
         return 1/(1 + math.exp(-k*(c-m)))
 
@@ -56,23 +126,64 @@ class SourceChatData:
         return round((a*t + b*t + c*l)/(a+b+c),2)
 
 
+    def text_length(self, start: int = 0) -> int:
+        """len() of content_as_text(), or of the text of messages start.., without building it."""
+        count = len(self.content_lengths)
+        if start >= count:
+            return 0
+        chars = self.total_content_length if start == 0 else sum(self.content_lengths[start:])
+        return chars + (count - start - 1) * len(CONTENT_SEPARATOR)
+
     def content_as_text(self) -> str:
         """Converts contents to a single string with each entry on a new line."""
-        return "\r".join(self.contents)
+        return self.buffer.decode("utf-8")
 
     def add_content(self, content: str, submission_in_minutes: int) -> None:
-        """Adds a new content string to the contents list if it's not empty."""
+        """Adds a new content string to the contents if it's not empty."""
         if content:
             content_len = len(content)
             self.total_content_length += content_len
             content_value = submission_in_minutes * content_len
             self.total_content_value += content_value
-            self.contents.append(content)
+            if self.content_ends:
+                self.buffer += CONTENT_SEPARATOR.encode("utf-8")
+            self.buffer += content.encode("utf-8")
+            self.content_ends.append(len(self.buffer))
+            self.content_lengths.append(content_len)
+            self.content_minutes.append(submission_in_minutes)
+
+    def add_contents(self, contents: List[str], minutes: Sequence[int]) -> None:
+        """Adds many content strings at once, with the same result as add_content for each."""
+        minutes = np.asarray(minutes, dtype=np.int64)
+        if not all(contents):
+            kept = [i for i, content in enumerate(contents) if content]
+            contents = [contents[i] for i in kept]
+            minutes = minutes[kept]
+        if not contents:
+            return
+        lengths = np.fromiter(map(len, contents), np.int64, len(contents))
+        self.total_content_length += int(lengths.sum())
+        self.total_content_value += int(np.dot(minutes, lengths))
+
+        text = CONTENT_SEPARATOR.join(contents)
+        separator_bytes = len(CONTENT_SEPARATOR.encode("utf-8"))
+        # ASCII text has as many bytes as characters, so only other text is encoded per message
+        byte_lengths = lengths if text.isascii() else np.fromiter(
+            (len(content.encode("utf-8")) for content in contents), np.int64, len(contents))
+        start = len(self.buffer)
+        if self.content_ends:
+            self.buffer += CONTENT_SEPARATOR.encode("utf-8")
+            start += separator_bytes
+        self.buffer += text.encode("utf-8")
+        ends = start + np.cumsum(byte_lengths) + np.arange(len(contents), dtype=np.int64) * separator_bytes
+        self.content_ends.frombytes(ends.astype(np.int64).tobytes())
+        self.content_lengths.frombytes(lengths.astype(np.int32).tobytes())
+        self.content_minutes.frombytes(minutes.astype(np.int32).tobytes())
 
     def add_participant(self, participant: str) -> None:
-        """Adds a new participant to the participants list if it's not already present."""
-        if participant and participant not in self.participants:
-            self.participants.append(participant)
+        """Adds a new participant if it's not already present."""
+        if participant:
+            self.participant_ids[participant] = None
 
     def to_dict(self) -> dict:
         """Converts the object to a dictionary representation."""
@@ -110,15 +221,23 @@ class ChatData:
     sentiment: Dict[str, Any] = field(default_factory=dict)
     keywords_keybert: Dict[str, Any] = field(default_factory=dict)
     keywords_lda: Dict[str, Any] = field(default_factory=dict)
+    analysis_tier: str = 'full'  # 'full', 'partial' or 'cheap', see utils.analysis_budget
+    sampling: Optional[Dict[str, int]] = None  # messages analyzed out of messages, for sampled chats
 
     def to_dict(self):
-        return {
+        chat_dict = {
             "chat_id": self.chat_id,
             "chat_length": self.chat_length,
             "sentiment": self.sentiment,                # No need to call .to_dict() for dicts
             "keywords_keybert": self.keywords_keybert,  # Same for other dict fields
-            "keywords_lda": self.keywords_lda           # Same for other dict fields
+            "keywords_lda": self.keywords_lda,          # Same for other dict fields
         }
+        # only chats the analysis budget or sampling touched say so; fully analyzed chats keep the original shape
+        if self.analysis_tier != 'full':
+            chat_dict["analysis_tier"] = self.analysis_tier
+        if self.sampling is not None:
+            chat_dict["sampling"] = self.sampling
+        return chat_dict
 
 # CargoData for Source
 @dataclass
@@ -1,21 +1,46 @@
 import json
 import logging
 import os
-from typing import Dict, Any
-import requests
+from functools import wraps
+from typing import Dict, Any, Optional
 
 from datetime import datetime
+
 from models.proof_response import ProofResponse
 from utils.hashing_utils import salted_data, serialize_bloom_filter_base64, deserialize_bloom_filter_base64
 from utils.feature_extraction import get_keywords_keybert, get_sentiment_data, get_keywords_lda
 from models.cargo_data import SourceChatData, CargoData, SourceData, DataSource, MetaData, DataSource
 from utils.validate_data import validate_data
+from utils.stream_parser import JsonStreamReader, iter_chats
+from utils.input_files import iter_input_files
+from utils.source_adapters import get_source, get_source_adapter
+from utils.profiling import profiled, profiler
+from utils.chat_sampling import SamplingPolicy
+
+
+def profiled_proof(func):
+    """
+    Run a Proof method in a profiling session (config 'profile') recorded as a stage of its name.
+    The profile is kept on Proof.profile and, with config 'profile_attributes', added to the attributes.
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with profiler.session(self.config.get('profile')) as session:
+            with profiler.stage(func.__name__):
+                proof_response = func(self, *args, **kwargs)
+        if session.profile is not None:
+            self.profile = session.profile
+            if self.config.get('profile_attributes'):
+                proof_response.attributes['profile'] = session.profile
+        return proof_response
+    return wrapper
 
 
 class Proof:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.proof_response = ProofResponse(dlp_id=config['dlp_id'])
+        self.profile: Optional[Dict[str, Any]] = None
 
     #Patrck's original Code...
     def generate(self) -> ProofResponse:
@@ -27,10 +52,10 @@ class Proof:
         source = None
         user = None
 
-        for input_filename in os.listdir(self.config['input_dir']):
-            input_file = os.path.join(self.config['input_dir'], input_filename)
-            if os.path.splitext(input_file)[1].lower() == '.json':
-                with open(input_file, 'r') as f:
+        for input_file in iter_input_files(self.config['input_dir'], self.config):
+            input_filename = input_file.name
+            if os.path.splitext(input_filename)[1].lower() == '.json':
+                with input_file.open() as f:
                     input_data = json.load(f)
 
                     if input_filename == 'zktls_proof.json':
@@ -88,6 +113,7 @@ class Proof:
         return self.proof_response
 
     #RL: Proof Data...
+    @profiled_proof
     def proof_data(self) -> ProofResponse:
         """Generate proofs for all input files."""
         logging.info("Starting proof data")
@@ -95,10 +121,15 @@ class Proof:
         zktls_proof = None
         source_data = None
 
-        for input_filename in os.listdir(self.config['input_dir']):
-            input_file = os.path.join(self.config['input_dir'], input_filename)
-            if os.path.splitext(input_file)[1].lower() == '.json':
-                with open(input_file, 'r') as f:
+        for input_file in iter_input_files(self.config['input_dir'], self.config):
+            input_filename = input_file.name
+            if os.path.splitext(input_filename)[1].lower() == '.json':
+                with input_file.open() as f:
+                    if input_filename == 'chats.json' and self.config.get('stream_input'):
+                        # walk chats incrementally instead of loading the whole export
+                        source_data = get_source_data_stream(f)
+                        continue
+
                     input_data = json.load(f)
                     #print(f"Input Data: {input_data}")
 
@@ -112,6 +143,16 @@ class Proof:
                         )
                         continue
 
+        return self.proof_source_data(source_data, zktls_proof)
+
+    @profiled_proof
+    def proof_input_data(self, input_data: Dict[str, Any], zktls_proof: Any = None) -> ProofResponse:
+        """Score an already loaded chats.json; used by the resident proof worker."""
+        return self.proof_source_data(get_source_data(input_data), zktls_proof)
+
+    @profiled_proof
+    def proof_source_data(self, source_data: SourceData, zktls_proof: Any = None) -> ProofResponse:
+        """Score already parsed chats; shared by proof_data and proof_input_data."""
         salt = self.config['salt']
         source_user_hash_64 = salted_data(
             (source_data.source, source_data.user),
@@ -143,7 +184,7 @@ class Proof:
             self.proof_response.attributes = {
                 'proof_valid': False,
                 'did_score_content': False,
-                'source': source_data.Source.name,
+                'source': source_data.source.name,
                 'submit_on': current_datetime,
                 'chat_data': None
             }
@@ -177,59 +218,21 @@ class Proof:
             'submit_on': current_datetime,
             'chat_data': cargo_data.get_chat_list_data()
         }
+        sampling = SamplingPolicy.from_config(self.config)
+        if sampling.enabled:
+            # the parameters chats marked with 'sampling' were analyzed with, to reproduce them
+            self.proof_response.attributes['sampling'] = sampling.to_dict()
         self.proof_response.metadata = metadata
         return self.proof_response
 
-def get_telegram_data(
-    current_timestamp: datetime,
-    input_content: dict,
-    source_chat_data: 'SourceChatData'
-):
-    chat_type = input_content.get('@type')
-    if chat_type == "message":
-        # Extract user ID
-        chat_user_id = input_content.get("sender_id", {}).get("user_id", "")
-        print(f"chat_user_id: {chat_user_id}")
-        source_chat_data.add_participant(chat_user_id)
-
-        # Extract and convert the Unix timestamp to a datetime object
-        date_value = input_content.get("date", None)
-        if date_value:
-            message_date = datetime.utcfromtimestamp(date_value)  # Convert Unix timestamp to datetime
-            #print(f"message_date: {message_date}")
-
-            # Convert current_timestamp to datetime if it's a Unix timestamp
-            if isinstance(current_timestamp, int):
-                current_timestamp = datetime.utcfromtimestamp(current_timestamp)
-
-            # Calculate the difference in minutes
-            time_in_seconds = (current_timestamp - message_date).total_seconds()
-            time_in_minutes = int(time_in_seconds // 60)
-        else:
-            time_in_minutes = 0  # Default to 0 if no date is provided
-            print("No valid date found in the input content.")
-
-        # Extract the message content
-        message = input_content.get('content', {})
-        if isinstance(message, dict) and message.get("@type") == "messageText":
-            content = message.get("text", {}).get("text", "")
-            #print(f"Extracted content: {content}")
-            source_chat_data.add_content(
-                content,
-                time_in_minutes
-            )
-
-
+@profiled()
 def get_source_data(input_data: Dict[str, Any]) -> SourceData:
     current_timestamp = int(datetime.now().timestamp())
 
-    input_source_value = input_data.get('source', '').upper()
-    input_source = None
-
-    if input_source_value == 'TELEGRAM':
-        input_source = DataSource.telegram
-    else:
-        print(f"Unmapped data source: {input_source_value}")
+    input_source_value = input_data.get('source', '')
+    input_source = get_source(input_source_value)
+    if input_source is None:
+        logging.warning(f"Unmapped data source: {input_source_value.upper()}")
 
     input_user = input_data.get('user')
     #print(f"input_user: {input_user}")
@@ -239,6 +242,11 @@ def get_source_data(input_data: Dict[str, Any]) -> SourceData:
         user=input_user
     )
 
+    # dispatch once per export, not per message
+    adapter = get_source_adapter(input_source)
+    if adapter is None:
+        logging.warning(f"Unhandled data source: {input_source}")
+
     input_chats = input_data.get('chats', [])
     #print(f"input_chats: {input_chats}")
     source_chats = source_data.source_chats
@@ -247,24 +255,90 @@ def get_source_data(input_data: Dict[str, Any]) -> SourceData:
         chat_id = input_chat.get('chat_id')
         input_contents = input_chat.get('contents', [])
         if chat_id and input_contents:
-            source_chat = SourceChatData(
-                chat_id=chat_id
-            )
+            if adapter is None:
+                source_chats.append(SourceChatData(chat_id=chat_id))
+                continue
+            builder = adapter.chat_builder()
             for input_content in input_contents:
-                if input_source == DataSource.telegram:
-                    get_telegram_data(
-                        current_timestamp,
-                        input_content,
-                        source_chat
-                    )
-                else:
-                    print(f"Unhandled data source: {input_source}")
+                builder.add(input_content)
             source_chats.append(
-                source_chat
+                builder.build(chat_id, current_timestamp)
             )
     return source_data
 
 
+@profiled()
+def get_source_data_stream(input_stream) -> SourceData:
+    """
+    Streaming variant of get_source_data: chats.json is walked one message at a time,
+    so only the extracted chat text is kept instead of the parsed export.
+    """
+    current_timestamp = int(datetime.now().timestamp())
+
+    source_data = SourceData(
+        source=None,
+        user=None
+    )
+    adapter = None
+    source_known = False
+    pending_chats = []  # raw chats seen before 'source', replayed once it is known
+    builder = None
+    raw_contents = None
+
+    def add_source_chat(chat_id, contents):
+        if chat_id and contents:
+            if adapter is None:
+                source_data.source_chats.append(SourceChatData(chat_id=chat_id))
+                return
+            pending_builder = adapter.chat_builder()
+            for input_content in contents:
+                pending_builder.add(input_content)
+            source_data.source_chats.append(pending_builder.build(chat_id, current_timestamp))
+
+    def set_source(input_source_value):
+        nonlocal adapter
+        source_data.source = get_source(input_source_value)
+        if source_data.source is None:
+            logging.warning(f"Unmapped data source: {(input_source_value or '').upper()}")
+        adapter = get_source_adapter(source_data.source)
+        if adapter is None:
+            logging.warning(f"Unhandled data source: {source_data.source}")
+
+    for event, value in iter_chats(JsonStreamReader(input_stream)):
+        if event == 'source':
+            set_source(value)
+            source_known = True
+            for chat_id, contents in pending_chats:
+                add_source_chat(chat_id, contents)
+            pending_chats = []
+        elif event == 'user':
+            source_data.user = value
+        elif event == 'chat':
+            builder = adapter.chat_builder() if adapter is not None else None
+            raw_contents = 0 if source_known else []
+        elif event == 'content':
+            if source_known:
+                if builder is not None:
+                    builder.add(value)
+                raw_contents += 1
+            else:
+                raw_contents.append(value)
+        elif event == 'chat_end':
+            if not source_known:
+                pending_chats.append((value, raw_contents))
+            elif value and raw_contents:
+                source_data.source_chats.append(
+                    builder.build(value, current_timestamp) if builder is not None
+                    else SourceChatData(chat_id=value)
+                )
+
+    if not source_known:  # export without a 'source' key
+        set_source(None)
+    for chat_id, contents in pending_chats:
+        add_source_chat(chat_id, contents)
+    return source_data
+
+
 def get_is_data_authentic(content, zktls_proof) -> bool:
     """Determine if the submitted data is authentic by checking the content against a zkTLS proof"""
     return 1.0
@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from proof import Proof
+from utils.bloom_filter import get_message_filter
+from utils.near_duplicates import get_near_duplicate_index
+from utils.uniqueness_index import get_uniqueness_index
+
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+FINISHED_JOBS_KEPT = 1024
+
+
+@dataclass
+class ProofJob:
+    job_id: str
+    chats: Dict[str, Any]
+    zktls_proof: Any = None
+    status: str = 'queued'  # queued, running, done, failed or cancelled
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.perf_counter)
+    seconds: Optional[float] = None
+    profile: Optional[Dict[str, Any]] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'profile': self.profile,
+        }
+
+
+class ProofWorker:
+    """
+    Resident prover: a bounded queue of proof jobs executed one at a time by a single thread,
+    with the models, stopwords and sealed dedup indexes kept loaded between jobs.
+    Jobs run sequentially so every submission sees the index state left by the previous one,
+    as consecutive runs of __main__ would. A full queue rejects new jobs instead of growing;
+    a cancelled job leaves the queue at once, so it frees its slot.
+    """
+
+    def __init__(self, config: Dict[str, Any], queue_size: int = 16):
+        self.config = config
+        self.queue_size = queue_size
+        self._queue: Deque[ProofJob] = deque()
+        self._jobs: 'OrderedDict[str, ProofJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = threading.Condition(self._lock)
+        self._latencies = []
+        self.rejected = 0
+        self._thread = threading.Thread(target=self._run, name='proof-worker', daemon=True)
+
+    def start(self) -> None:
+        # open the sealed indexes now rather than on the first job
+        get_uniqueness_index(self.config)
+        get_message_filter(self.config)
+        get_near_duplicate_index(self.config)
+        self._thread.start()
+
+    def submit(self, chats: Dict[str, Any], zktls_proof: Any = None) -> Optional[ProofJob]:
+        """Queue a job, or return None when the queue is full (the caller should retry later)."""
+        job = ProofJob(job_id=uuid.uuid4().hex, chats=chats, zktls_proof=zktls_proof)
+        with self._lock:
+            if len(self._queue) >= self.queue_size:
+                self.rejected += 1
+                return None
+            self._queue.append(job)
+            self._queued.notify()
+            self._jobs[job.job_id] = job
+            self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[ProofJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started; a running proof is never interrupted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != 'queued':
+                return False
+            job.status = 'cancelled'
+            self._queue.remove(job)
+        job.done.set()
+        return True
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        while True:
+            with self._queued:
+                while not self._queue:
+                    self._queued.wait()
+                job = self._queue.popleft()
+                job.status = 'running'
+            start = time.perf_counter()
+            try:
+                proof = Proof(self.config)
+                job.result = proof.proof_input_data(job.chats, job.zktls_proof).dict()
+                job.profile = proof.profile
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+                logging.error(f"Error proving job {job.job_id}: {e}")
+                traceback.print_exc()
+            job.seconds = time.perf_counter() - start
+            with self._lock:
+                self._latencies.append(job.seconds)
+                self._latencies = self._latencies[-1000:]
+            logging.info(f"Proof job {job.job_id} {job.status} in {job.seconds:.3f}s")
+            job.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self._latencies)
+            queued = len(self._queue)
+            rejected = self.rejected
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            'queued': queued,
+            'queue_size': self.queue_size,
+            'rejected': rejected,
+            'jobs': statuses,
+            'latency_p50_seconds': round(float(np.percentile(latencies, 50)), 4) if latencies else None,
+            'latency_p95_seconds': round(float(np.percentile(latencies, 95)), 4) if latencies else None,
+        }
+
+
+class ProofRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST   /proofs            {"chats": <chats.json>, "zktls_proof": <optional>} -> ProofResponse JSON
+           /proofs?async=1    -> 202 {"job_id": ...}, poll with GET
+    GET    /proofs/<job_id>   job status, with the ProofResponse once done
+    DELETE /proofs/<job_id>   cancel a job that has not started
+    GET    /health            queue depth and latency stats
+    A full queue answers 503 with Retry-After; a synchronous request that times out
+    (?timeout=<seconds>) cancels its job if it has not started and answers 504.
+    """
+
+    server_version = 'ProofWorker/1.0'
+    worker: ProofWorker = None
+    request_timeout = 300.0
+
+    def address_string(self) -> str:
+        # client_address is not a (host, port) tuple on a Unix socket
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def parse_path(self):
+        url = urlsplit(self.path)
+        # the last value of a repeated parameter wins
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return unquote(url.path).rstrip('/'), params
+
+    def do_GET(self) -> None:
+        path, _ = self.parse_path()
+        if path == '/health':
+            self.send_json(200, self.worker.stats())
+            return
+        if path.startswith('/proofs/'):
+            job = self.worker.get(path[len('/proofs/'):])
+            if job is None:
+                self.send_json(404, {'error': 'unknown job'})
+            else:
+                self.send_json(200, job.to_dict())
+            return
+        self.send_json(404, {'error': 'not found'})
+
+    def do_DELETE(self) -> None:
+        path, _ = self.parse_path()
+        if not path.startswith('/proofs/'):
+            self.send_json(404, {'error': 'not found'})
+            return
+        job = self.worker.get(path[len('/proofs/'):])
+        if job is None:
+            self.send_json(404, {'error': 'unknown job'})
+        elif self.worker.cancel(job.job_id):
+            self.send_json(200, job.to_dict())
+        else:
+            self.send_json(409, {'error': f'job is {job.status}', 'job_id': job.job_id})
+
+    def do_POST(self) -> None:
+        path, params = self.parse_path()
+        if path != '/proofs':
+            self.send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            timeout = float(params.get('timeout', self.request_timeout))
+        except ValueError:
+            self.send_json(400, {'error': 'Content-Length and timeout must be numbers'})
+            return
+        if length < 0:  # rfile.read(-1) would wait for the client to close the connection
+            self.send_json(400, {'error': 'Content-Length must not be negative'})
+            return
+        if not 0 <= timeout < float('inf'):  # also rejects nan
+            self.send_json(400, {'error': 'timeout must be a non-negative number of seconds'})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.send_json(413, {'error': f'request larger than {MAX_REQUEST_BYTES} bytes'})
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+            chats = body['chats']
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {'error': 'expected a JSON body with a "chats" object'})
+            return
+
+        job = self.worker.submit(chats, body.get('zktls_proof'))
+        if job is None:
+            self.send_json(503, {'error': 'proof queue is full'}, {'Retry-After': '1'})
+            return
+        if params.get('async') == '1':
+            self.send_json(202, {'job_id': job.job_id, 'status': job.status})
+            return
+
+        if not job.done.wait(timeout) and self.worker.cancel(job.job_id):
+            self.send_json(504, {'error': 'timed out waiting in the queue', 'job_id': job.job_id})
+            return
+        job.done.wait()  # already running, finish it rather than waste the work
+        if job.status == 'done':
+            self.send_json(200, job.result)
+        else:
+            self.send_json(500, job.to_dict())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(config: Dict[str, Any], socket_path: Optional[str] = None, port: int = 8000,
+          queue_size: int = 16) -> None:
+    """Run the proof worker behind HTTP on a Unix socket, or on localhost:port."""
+    worker = ProofWorker(config, queue_size)
+    worker.start()
+    handler = type('Handler', (ProofRequestHandler,), {'worker': worker})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        logging.info(f"Proof worker listening on unix:{socket_path}")
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        logging.info(f"Proof worker listening on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
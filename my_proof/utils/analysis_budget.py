@@ -0,0 +1,82 @@
+import math
+import time
+from typing import Iterator, List, Optional, Sequence
+
+# how much of the sentiment/keyword analysis a chat's ChatData reflects
+ANALYSIS_FULL = 'full'  # all its messages
+ANALYSIS_PARTIAL = 'partial'  # the messages of an earlier submission, from the chat result cache
+ANALYSIS_CHEAP = 'cheap'  # none: left out by the analysis budget, only length/quality/uniqueness
+
+TIER_CHATS = 16  # chats analyzed between two checks of the time budget
+
+
+def analysis_priority(quality: float, uniqueness: float, content_length: int) -> float:
+    """Value of analyzing a chat, from the signals scored before analysis; longer chats count sublinearly."""
+    return quality * uniqueness * math.log1p(content_length)
+
+
+class AnalysisBudget:
+    """
+    Decides which chats get the expensive extractors (sentiment, KeyBERT, LDA/TF-IDF).
+    max_chars caps the characters analyzed per submission, deterministically: chats are taken
+    by descending priority while they fit. max_seconds caps the time since the budget was
+    created: chats are analyzed in tiers of TIER_CHATS by descending priority, and analysis
+    stops before a tier that the throughput of the tiers so far says would overrun it.
+    0 disables either limit; with both disabled every chat is analyzed in one tier.
+    """
+
+    def __init__(self, max_seconds: float = 0, max_chars: int = 0, start: Optional[float] = None):
+        self.max_seconds = max_seconds
+        self.max_chars = max_chars
+        self.start = time.perf_counter() if start is None else start
+        self.analyzed = 0
+        self.skipped = 0
+
+    def select(self, priorities: Sequence[float], costs: Sequence[int]) -> List[int]:
+        """Indexes of the chats within max_chars, highest priority first."""
+        order = sorted(range(len(priorities)), key=lambda i: priorities[i], reverse=True)
+        if not self.max_chars:
+            return order
+        selected = []
+        spent = 0
+        for i in order:
+            if spent + costs[i] <= self.max_chars:
+                selected.append(i)
+                spent += costs[i]
+        return selected
+
+    def tiers(self, priorities: Sequence[float], costs: Sequence[int]) -> Iterator[List[int]]:
+        """
+        Chat indexes to analyze, a tier at a time; the caller analyzes each tier before asking
+        for the next one, which is how the time spent per character is measured.
+        """
+        if not self.max_seconds and not self.max_chars:
+            self.analyzed = len(priorities)
+            if priorities:
+                yield list(range(len(priorities)))
+            return
+        selected = self.select(priorities, costs)
+        if not self.max_seconds:
+            self.analyzed = len(selected)
+            self.skipped = len(priorities) - len(selected)
+            if selected:
+                yield sorted(selected)
+            return
+        analysis_seconds = 0.0
+        analyzed_chars = 0
+        for tier_start in range(0, len(selected), TIER_CHATS):
+            tier = selected[tier_start:tier_start + TIER_CHATS]
+            tier_chars = sum(costs[i] for i in tier)
+            elapsed = time.perf_counter() - self.start
+            estimate = analysis_seconds / analyzed_chars * tier_chars if analyzed_chars else 0.0
+            if elapsed + estimate > self.max_seconds:
+                break
+            tier_start_time = time.perf_counter()
+            yield tier
+            analysis_seconds += time.perf_counter() - tier_start_time
+            analyzed_chars += tier_chars
+            self.analyzed += len(tier)
+        self.skipped = len(priorities) - self.analyzed
+
+    def stats(self):
+        return {'analyzed': self.analyzed, 'skipped': self.skipped}
@@ -0,0 +1,235 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+FILTER_FILENAME = 'message_bloom.bin'
+
+# Serialized layout (little endian):
+#   header: magic, version, reserved, stage count, initial capacity, error rate, growth, tightening ratio
+#   per stage: bit count, capacity, item count, hash count, stage error rate, then the raw bit array
+MAGIC = b'VBSF'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQdId')
+STAGE_HEADER = struct.Struct('<QQQId')
+
+Item = Union[bytes, str]
+
+# set bits of every byte value, to count a bit array's set bits without a Python loop
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def _hash_pair(item: Item):
+    """Two 64-bit hashes for double hashing. 16-byte digests (salted_digest) are used as is."""
+    if isinstance(item, str):
+        item = item.encode('utf-8')
+    if len(item) != 16:
+        item = hashlib.blake2b(item, digest_size=16).digest()
+    return int.from_bytes(item[:8], 'little'), int.from_bytes(item[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a byte buffer (bytearray, or a read-only memoryview of a mapped file)."""
+
+    def __init__(self, capacity: int, error_rate: float, bits=None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_hashes = max(1, math.ceil(math.log2(1 / error_rate)))
+        self.num_bits = max(8, math.ceil(capacity * abs(math.log(error_rate)) / (math.log(2) ** 2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, item: Item):
+        h1, h2 = _hash_pair(item)
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item: Item) -> bool:
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, item: Item) -> bool:
+        """Add item; returns True if it was (probably) already present."""
+        if not isinstance(self.bits, bytearray):
+            self.bits = bytearray(self.bits)  # copy on first write to a mapped stage
+        bits = self.bits
+        present = True
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                present = False
+                bits[position >> 3] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def union(self, other: 'BloomFilter') -> 'BloomFilter':
+        if (self.num_bits, self.num_hashes) != (other.num_bits, other.num_hashes):
+            raise ValueError("Cannot union Bloom filters of different size")
+        merged = np.bitwise_or(np.frombuffer(self.bits, dtype=np.uint8), np.frombuffer(other.bits, dtype=np.uint8))
+        result = BloomFilter(self.capacity, self.error_rate, bytearray(merged.tobytes()))
+        # estimate the item count from the fill ratio
+        set_bits = int(POPCOUNT[merged].sum(dtype=np.int64))
+        fill = min(set_bits / self.num_bits, 1 - 1e-12)
+        result.count = int(round(-self.num_bits / self.num_hashes * math.log(1 - fill)))
+        return result
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows by adding stages of growth x capacity with error rates tightened
+    by ratio, keeping the compound false positive rate below error_rate.
+    """
+
+    def __init__(self, initial_capacity: int = 100000, error_rate: float = 0.001,
+                 growth: int = 2, ratio: float = 0.9):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.ratio = ratio
+        self.stages: List[BloomFilter] = []
+        self._mmap = None
+
+    def _new_stage(self) -> BloomFilter:
+        index = len(self.stages)
+        stage = BloomFilter(
+            self.initial_capacity * self.growth ** index,
+            self.error_rate * (1 - self.ratio) * self.ratio ** index
+        )
+        self.stages.append(stage)
+        return stage
+
+    def __contains__(self, item: Item) -> bool:
+        return any(item in stage for stage in reversed(self.stages))
+
+    def __len__(self) -> int:
+        return sum(stage.count for stage in self.stages)
+
+    def add(self, item: Item) -> bool:
+        """Add item; returns True if it was (probably) already present."""
+        if item in self:
+            return True
+        stage = self.stages[-1] if self.stages else self._new_stage()
+        if stage.is_full():
+            stage = self._new_stage()
+        stage.add(item)
+        return False
+
+    def update(self, items: Iterable[Item]) -> None:
+        for item in items:
+            self.add(item)
+
+    def count_hits(self, items: Iterable[Item]) -> int:
+        return sum(1 for item in items if item in self)
+
+    def union(self, other: 'ScalableBloomFilter') -> 'ScalableBloomFilter':
+        """Combine two filters built with the same parameters, e.g. from different nodes."""
+        if (self.initial_capacity, self.error_rate, self.growth, self.ratio) != \
+                (other.initial_capacity, other.error_rate, other.growth, other.ratio):
+            raise ValueError("Cannot union scalable Bloom filters with different parameters")
+        result = ScalableBloomFilter(self.initial_capacity, self.error_rate, self.growth, self.ratio)
+        for index in range(max(len(self.stages), len(other.stages))):
+            if index < len(self.stages) and index < len(other.stages):
+                result.stages.append(self.stages[index].union(other.stages[index]))
+            else:
+                stage = (self.stages if index < len(self.stages) else other.stages)[index]
+                result.stages.append(BloomFilter(stage.capacity, stage.error_rate, bytearray(stage.bits), stage.count))
+        return result
+
+    def tobytes(self) -> bytes:
+        parts = [HEADER.pack(MAGIC, VERSION, 0, len(self.stages), self.initial_capacity,
+                             self.error_rate, self.growth, self.ratio)]
+        for stage in self.stages:
+            parts.append(STAGE_HEADER.pack(stage.num_bits, stage.capacity, stage.count,
+                                           stage.num_hashes, stage.error_rate))
+            parts.append(bytes(stage.bits))
+        return b''.join(parts)
+
+    @classmethod
+    def frombytes(cls, buffer) -> 'ScalableBloomFilter':
+        """
+        Rebuild a filter from tobytes() output without copying: stages keep memoryview slices
+        of buffer (bytes or mmap) and are only copied when written to.
+        """
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise ValueError("Bloom filter data is truncated")
+        magic, version, _, num_stages, initial_capacity, error_rate, growth, ratio = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a serialized scalable Bloom filter")
+        if version != VERSION:
+            raise ValueError(f"Unsupported Bloom filter format version {version}")
+        bloom = cls(initial_capacity, error_rate, growth, ratio)
+        offset = HEADER.size
+        for _ in range(num_stages):
+            if offset + STAGE_HEADER.size > len(view):
+                raise ValueError("Bloom filter data is truncated")
+            num_bits, capacity, count, num_hashes, stage_error_rate = STAGE_HEADER.unpack_from(view, offset)
+            offset += STAGE_HEADER.size
+            size = (num_bits + 7) // 8
+            if offset + size > len(view):
+                raise ValueError("Bloom filter data is truncated")
+            stage = BloomFilter(capacity, stage_error_rate, view[offset:offset + size], count)
+            if (stage.num_bits, stage.num_hashes) != (num_bits, num_hashes):
+                raise ValueError("Bloom filter stage header does not match its parameters")
+            bloom.stages.append(stage)
+            offset += size
+        return bloom
+
+    @classmethod
+    def load(cls, path: str) -> 'ScalableBloomFilter':
+        """Memory-map a serialized filter; queries read the file pages directly."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        bloom = cls.frombytes(mapped)
+        bloom._mmap = mapped
+        return bloom
+
+    def save(self, path: str) -> None:
+        """Write atomically so a crash never leaves a half-written filter behind."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.tobytes())
+        os.replace(tmp_path, path)
+
+
+_filters: Dict[str, ScalableBloomFilter] = {}
+_filters_lock = threading.Lock()
+
+
+def get_message_filter(config: Dict[str, Any]) -> Optional[ScalableBloomFilter]:
+    """
+    Load (once per process) the message dedup filter from the sealed directory.
+    Returns None when sealing is not available.
+    """
+    if not config.get('use_sealing'):
+        return None
+    path = os.path.join(config.get('sealed_dir', '/sealed'), FILTER_FILENAME)
+    with _filters_lock:
+        bloom = _filters.get(path)
+        if bloom is None:
+            if os.path.exists(path):
+                logging.info(f"Loading message filter {path}")
+                bloom = ScalableBloomFilter.load(path)
+            else:
+                bloom = ScalableBloomFilter()
+            _filters[path] = bloom
+    return bloom
+
+
+def save_message_filter(config: Dict[str, Any], bloom: ScalableBloomFilter) -> None:
+    path = os.path.join(config.get('sealed_dir', '/sealed'), FILTER_FILENAME)
+    with _filters_lock:
+        bloom.save(path)
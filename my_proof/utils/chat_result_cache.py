@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from models.cargo_data import CargoData, SourceChatData
+from utils.hashing_utils import salted_digest
+
+CACHE_FILENAME = 'chat_results.sqlite'
+DEFAULT_MAX_ENTRIES = 100000
+
+
+@dataclass
+class ChatAnalysis:
+    """
+    Analysis of a chat's first message_count messages, in a form that new messages can be merged into:
+    sentiment as token-weighted category sums, keywords with the character count they were scored on.
+    """
+    message_count: int
+    text_length: int
+    sentiment_scores: Dict[str, float]
+    sentiment_tokens: int
+    keywords_keybert: Dict[str, float]
+    keywords_lda: Optional[Dict[str, float]]
+    analyzed_messages: Optional[int] = None  # set when only a sample of the message_count messages was analyzed
+
+    def sentiment(self) -> Dict[str, float]:
+        return {
+            label: (score / self.sentiment_tokens if self.sentiment_tokens else 0)
+            for label, score in self.sentiment_scores.items()
+        }
+
+    def merge(self, new: 'ChatAnalysis', number_of_keywords: int, number_of_lda_keywords: int) -> 'ChatAnalysis':
+        """
+        This analysis extended by the analysis of the messages appended after it.
+        Sentiment sums add up exactly; keyword scores are averaged weighted by the text length
+        each side was scored on, keeping as many of the best as a fresh extraction returns
+        (number_of_keywords KeyBERT keywords, number_of_lda_keywords in keywords_lda).
+        """
+        return ChatAnalysis(
+            message_count=self.message_count + new.message_count,
+            text_length=self.text_length + new.text_length,
+            sentiment_scores={
+                label: self.sentiment_scores.get(label, 0) + new.sentiment_scores.get(label, 0)
+                for label in dict.fromkeys([*self.sentiment_scores, *new.sentiment_scores])
+            },
+            sentiment_tokens=self.sentiment_tokens + new.sentiment_tokens,
+            keywords_keybert=merge_keywords(
+                self.keywords_keybert, self.text_length, new.keywords_keybert, new.text_length, number_of_keywords
+            ),
+            keywords_lda=merge_keywords(
+                self.keywords_lda, self.text_length, new.keywords_lda, new.text_length, number_of_lda_keywords
+            ) if self.keywords_lda is not None and new.keywords_lda is not None else new.keywords_lda,
+            analyzed_messages=None if self.analyzed_messages is None and new.analyzed_messages is None else (
+                (self.message_count if self.analyzed_messages is None else self.analyzed_messages)
+                + (new.message_count if new.analyzed_messages is None else new.analyzed_messages)
+            ),
+        )
+
+
+def merge_keywords(old: Dict[str, float], old_weight: int, new: Dict[str, float], new_weight: int,
+                   number_of_keywords: int) -> Dict[str, float]:
+    total = old_weight + new_weight
+    if not total:
+        return dict(new)
+    merged = {}
+    for word in set(old) | set(new):
+        merged[word] = (old.get(word, 0) * old_weight + new.get(word, 0) * new_weight) / total
+    best = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:number_of_keywords]
+    return {word: float(score) for word, score in best}
+
+
+class ChatResultCache:
+    """
+    Per-chat analysis results of earlier submissions, in SQLite in the sealed directory.
+    Entries are keyed by a salted (source_id, chat_id) digest and carry a salted hash of the
+    messages they cover, so a resubmitted chat reuses its entry only if it starts with exactly
+    those messages. The least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, path: str, salt: Optional[str], max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.salt = salt
+        self.max_entries = max_entries
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS chat_results (
+                chat_key BLOB PRIMARY KEY,
+                message_count INTEGER NOT NULL,
+                prefix_hash BLOB NOT NULL,
+                analysis TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS chat_results_last_used ON chat_results (last_used);
+        """)
+        row = self._connection.execute("SELECT MAX(last_used) FROM chat_results").fetchone()
+        self._clock = row[0] or 0
+
+    def chat_key(self, source_id: str, chat_id: Any, variant: str = 'lda') -> bytes:
+        # results of different keyword engines, backends or models are not interchangeable
+        return salted_digest((source_id, chat_id, variant), self.salt)
+
+    def prefix_hash(self, source_chat: SourceChatData, message_count: int) -> bytes:
+        """Salted hash of the chat's first message_count messages, read from its buffer without copies."""
+        digest = hashlib.sha256(f"{self.salt}|".encode('utf-8'))
+        for index in range(message_count):
+            content = source_chat.content_bytes(index)
+            digest.update(struct.pack('<Q', len(content)))
+            digest.update(content)
+        return digest.digest()[:16]
+
+    def lookup(self, chat_key: bytes, source_chat: SourceChatData) -> Optional[ChatAnalysis]:
+        """Cached analysis of a prefix of source_chat's messages, or None if the chat changed or is new."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT message_count, prefix_hash, analysis FROM chat_results WHERE chat_key = ?", (chat_key,)
+            ).fetchone()
+        if row is None or row[0] > len(source_chat.content_lengths) \
+                or self.prefix_hash(source_chat, row[0]) != row[1]:
+            self.misses += 1
+            return None
+        if row[0] == len(source_chat.content_lengths):
+            self.hits += 1
+        else:
+            self.partial_hits += 1
+        return ChatAnalysis(**json.loads(row[2]))
+
+    def store(self, entries: List[tuple]) -> None:
+        """Save (chat_key, source_chat, analysis) entries in one transaction, then evict beyond max_entries."""
+        if not entries:
+            return
+        rows = []
+        for chat_key, source_chat, analysis in entries:
+            self._clock += 1
+            rows.append((
+                chat_key,
+                analysis.message_count,
+                self.prefix_hash(source_chat, analysis.message_count),
+                json.dumps(CargoData.convert_to_serializable(analysis.__dict__)),
+                self._clock
+            ))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO chat_results (chat_key, message_count, prefix_hash, analysis, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            count = self._connection.execute("SELECT COUNT(*) FROM chat_results").fetchone()[0]
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM chat_results WHERE chat_key IN "
+                    "(SELECT chat_key FROM chat_results ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_caches: Dict[str, ChatResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_chat_result_cache(config: Dict[str, Any]) -> Optional[ChatResultCache]:
+    """Open (once per process) the chat result cache in the sealed directory, or None without sealing."""
+    if not config.get('use_sealing') or not config.get('chat_cache_max_entries', DEFAULT_MAX_ENTRIES):
+        return None
+    path = os.path.join(config.get('sealed_dir', '/sealed'), CACHE_FILENAME)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            logging.info(f"Opening chat result cache {path}")
+            cache = ChatResultCache(
+                path,
+                config.get('salt'),
+                config.get('chat_cache_max_entries', DEFAULT_MAX_ENTRIES)
+            )
+            _caches[path] = cache
+    return cache
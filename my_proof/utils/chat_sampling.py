@@ -0,0 +1,87 @@
+import hashlib
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from models.cargo_data import CONTENT_SEPARATOR, SourceChatData
+
+SAMPLING_STRATEGIES = ('stratified', 'reservoir')
+TIME_STRATA = 10
+
+
+@dataclass
+class SamplingPolicy:
+    """
+    Which messages of an oversized chat the expensive extractors see. A chat (or the part of
+    it not covered by a cached analysis) longer than max_chars characters is analyzed from a
+    sample of at most max_chars: 'stratified' splits the messages into TIME_STRATA groups by
+    age and samples each in proportion to its text, 'reservoir' samples uniformly. Samples
+    depend only on the seed, the chat id and its messages, so a proof can be reproduced.
+    Length, timeliness and uniqueness are always computed over every message.
+    """
+    max_chars: int = 0  # 0: never sample
+    strategy: str = 'stratified'
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy {self.strategy}, expected one of {SAMPLING_STRATEGIES}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SamplingPolicy':
+        return cls(
+            max_chars=config.get('sample_max_chars', 0),
+            strategy=config.get('sample_strategy', 'stratified'),
+            seed=config.get('sample_seed', 0)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_chars > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def sample(self, source_chat: SourceChatData, start: int, end: int) -> List[int]:
+        """Ascending indexes of messages start..end-1 whose text, with separators, fits in max_chars."""
+        seed = hashlib.sha256(f"{self.seed}:{source_chat.chat_id}:{start}:{end}".encode('utf-8')).digest()
+        rng = np.random.default_rng(int.from_bytes(seed[:8], 'little'))
+        lengths = np.frombuffer(source_chat.content_lengths, dtype=np.int32)[start:end].astype(np.int64)
+        lengths += len(CONTENT_SEPARATOR)
+        if self.strategy == 'stratified':
+            minutes = np.frombuffer(source_chat.content_minutes, dtype=np.int32)[start:end]
+            by_age = np.argsort(minutes, kind='stable')
+            strata = [stratum for stratum in np.array_split(by_age, min(TIME_STRATA, len(by_age))) if stratum.size]
+        else:
+            strata = [np.arange(end - start)]
+        total = int(lengths.sum())
+        chosen = []
+        for stratum in strata:
+            budget = self.max_chars * int(lengths[stratum].sum()) / total
+            shuffled = rng.permutation(stratum)
+            chosen.append(shuffled[np.cumsum(lengths[shuffled]) <= budget])
+        indexes = np.concatenate(chosen)
+        if not indexes.size:  # every message is longer than its share; take one, truncated by the caller
+            indexes = rng.permutation(end - start)[:1]
+        return (np.sort(indexes) + start).tolist()
+
+
+def analysis_input(source_chat: SourceChatData, start: int, policy: SamplingPolicy) -> Tuple[str, List[str], bool]:
+    """
+    Text and messages to analyze for messages start.. of a chat, and whether they were sampled.
+    The chat's full text is only materialized when it is analyzed whole.
+    """
+    count = len(source_chat.content_lengths)
+    lengths = np.frombuffer(source_chat.content_lengths, dtype=np.int32)[start:]
+    chars = int(lengths.sum(dtype=np.int64)) + (count - start - 1) * len(CONTENT_SEPARATOR)
+    if not policy.enabled or chars <= policy.max_chars:
+        if start == 0:
+            return source_chat.content_as_text(), list(source_chat.contents), False
+        messages = source_chat.contents[start:]
+        return CONTENT_SEPARATOR.join(messages), messages, False
+    messages = [
+        str(source_chat.content_bytes(index), 'utf-8')[:policy.max_chars]
+        for index in policy.sample(source_chat, start, count)
+    ]
+    return CONTENT_SEPARATOR.join(messages), messages, True
@@ -0,0 +1,214 @@
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+KEYS_FILENAME = 'keys.bin'
+VECTORS_FILENAME = 'vectors.f32'
+DIM_FILENAME = 'dim'
+LOCK_FILENAME = 'lock'
+KEY_SIZE = 16
+
+
+class DiskEmbeddingTier:
+    """
+    Append-only on-disk embedding store: 16-byte keys in one file and float32 rows in a
+    memory-mapped file next to it. Only the key -> row map is held in memory.
+
+    Several processes (keyword workers) may share a directory: appends take an exclusive
+    lock on LOCK_FILENAME and first read the rows the other processes appended, so a key's
+    row is always its position in the files.
+    """
+
+    def __init__(self, directory: str, dim: int, max_rows: int):
+        self.directory = directory
+        self.dim = dim
+        self.max_rows = max_rows
+        os.makedirs(directory, exist_ok=True)
+        dim_path = os.path.join(directory, DIM_FILENAME)
+        if not os.path.exists(dim_path):
+            # written whole, so another process never reads a partial dim
+            tmp_path = f"{dim_path}.{os.getpid()}"
+            with open(tmp_path, 'w') as f:
+                f.write(str(dim))
+            os.replace(tmp_path, dim_path)
+        self.keys_path = os.path.join(directory, KEYS_FILENAME)
+        self.vectors_path = os.path.join(directory, VECTORS_FILENAME)
+        self.lock_path = os.path.join(directory, LOCK_FILENAME)
+        self.rows: Dict[bytes, int] = {}
+        self.file_rows = 0  # rows of the files read into self.rows
+        self._mapped = None
+        self._mapped_rows = 0
+        self._refresh()
+
+    def _complete_rows(self) -> int:
+        """Rows whose key and vector were both fully written."""
+        key_rows = os.path.getsize(self.keys_path) // KEY_SIZE if os.path.exists(self.keys_path) else 0
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        return min(key_rows, vector_rows)
+
+    def _refresh(self) -> int:
+        """Read keys appended since the last refresh, by this or another process; returns the complete rows."""
+        rows = self._complete_rows()
+        if rows > self.file_rows:
+            with open(self.keys_path, 'rb') as f:
+                f.seek(self.file_rows * KEY_SIZE)
+                data = f.read((rows - self.file_rows) * KEY_SIZE)
+            for offset in range(0, len(data), KEY_SIZE):
+                # a key appended twice (by two processes) keeps its first row
+                self.rows.setdefault(data[offset:offset + KEY_SIZE], self.file_rows + offset // KEY_SIZE)
+            self.file_rows = rows
+        return rows
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if row >= self._mapped_rows:
+            self._mapped_rows = self.file_rows
+            self._mapped = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                     shape=(self._mapped_rows, self.dim))
+        return np.array(self._mapped[row])
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            rows = self._refresh()
+            new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self.rows]
+            new = new[:max(0, self.max_rows - rows)]
+            if not new:
+                return
+            # vectors first, so a crash never leaves a key without its row; a crash between
+            # the two writes leaves vectors without keys, cut off here so rows stay aligned
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(rows * 4 * self.dim)
+                f.write(np.asarray([vector for _, vector in new], dtype=np.float32).tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.truncate(rows * KEY_SIZE)
+                f.write(b''.join(key for key, _ in new))
+            self._refresh()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of text embeddings (hash of model + text -> float32 vector),
+    with an in-memory LRU tier and an optional memory-mapped disk tier.
+    """
+
+    def __init__(self, max_entries: int = 50000, disk_dir: Optional[str] = None, disk_max_rows: int = 1000000):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_rows = disk_max_rows
+        self._memory: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._disk: Dict[str, DiskEmbeddingTier] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model_name}\0{text}".encode('utf-8'), digest_size=KEY_SIZE).digest()
+
+    def _disk_tier(self, model_name: str, dim: Optional[int] = None) -> Optional[DiskEmbeddingTier]:
+        """Disk tier of a model; opened from its directory if it exists, created only when dim is known."""
+        if not self.disk_dir:
+            return None
+        tier = self._disk.get(model_name)
+        if tier is None:
+            directory = os.path.join(self.disk_dir, hashlib.sha1(model_name.encode('utf-8')).hexdigest())
+            dim_path = os.path.join(directory, DIM_FILENAME)
+            if dim is None and os.path.exists(dim_path):
+                with open(dim_path, 'r') as f:
+                    dim = int(f.read())
+            if dim is None:
+                return None
+            tier = DiskEmbeddingTier(directory, dim, self.disk_max_rows)
+            self._disk[model_name] = tier
+        return tier
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def embed(self, model_name: str, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Embeddings for texts in order; only texts not cached in either tier are passed to encode."""
+        keys = [self.key(model_name, text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+        with self._lock:
+            disk_tier = self._disk_tier(model_name)
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    vectors[i] = vector
+                    continue
+                vector = disk_tier.get(key) if disk_tier is not None else None
+                if vector is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+                    vectors[i] = vector
+                    continue
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            missing_keys = list(missing)
+            start = time.perf_counter()
+            encoded = np.asarray(encode([texts[missing[key][0]] for key in missing_keys]), dtype=np.float32)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.misses += len(missing_keys)
+                self.encode_seconds += elapsed
+                for key, vector in zip(missing_keys, encoded):
+                    self._remember(key, vector)
+                    for i in missing[key]:
+                        vectors[i] = vector
+                disk_tier = self._disk_tier(model_name, encoded.shape[1])
+                if disk_tier is not None:
+                    disk_tier.put_many(missing_keys, encoded)
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def counters(self) -> Dict[str, float]:
+        """Raw lookup counters; the difference of two snapshots is the work done in between."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'encode_seconds': self.encode_seconds,
+            }
+
+    def merge_counters(self, counters: Dict[str, float]) -> None:
+        """Add lookups made by another process's cache, e.g. a keyword worker's."""
+        with self._lock:
+            self.hits += counters['hits']
+            self.disk_hits += counters['disk_hits']
+            self.misses += counters['misses']
+            self.encode_seconds += counters['encode_seconds']
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        seconds_per_text = self.encode_seconds / self.misses if self.misses else 0.0
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'encode_seconds': round(self.encode_seconds, 3),
+            'seconds_saved': round(self.hits * seconds_per_text, 3),
+        }
+
@@ -1,42 +1,267 @@
-from keybert import KeyBERT
-from transformers import pipeline
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
-from gensim.corpora.dictionary import Dictionary
-from gensim.models import LdaModel
+import numpy as np
 
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from utils.embedding_cache import EmbeddingCache
+from utils.inference_backends import BACKENDS, check_backend_requirements, load_keybert, load_sentiment_analyzer
+from utils.profiling import profiled, profiler
+from utils.text_preprocessing import TextPreprocessor, get_text_preprocessor
+
+# keybert, torch, transformers, gensim, sklearn and nltk take seconds to import (far more under
+# Gramine), so they are imported inside the functions that use them. A submission rejected
+# before scoring never pays for them.
+if TYPE_CHECKING:
+    from keybert import KeyBERT
+
+SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual"
+KEYBERT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # KeyBERT() default
+LDA_WORDS_PER_TOPIC = 5  # keywords_lda holds up to num_topics x this many words
+LDA_RANDOM_STATE = 42  # fixed seed, so a chat's LDA keywords do not depend on the process that extracts them
+
+
+class ModelRegistry:
+    """
+    Process-wide, lazily initialized holder for the NLP models.
+    Each model is loaded once on first use (or on warm_up) and shared by every caller.
+    If model_dir is set, models are loaded from <model_dir>/<model name> when that
+    directory exists, so offline enclaves can ship pre-downloaded weights.
+    backend selects how they run on CPU, see utils.inference_backends.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None, backend: str = 'torch'):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend}, expected one of {BACKENDS}")
+        check_backend_requirements(backend)
+        self.model_dir = model_dir
+        self.backend = backend
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.load_seconds: Dict[str, float] = {}
+        self.call_counts: Dict[str, int] = {}
+        self.call_seconds: Dict[str, float] = {}
+
+    def configure(self, model_dir: Optional[str], backend: str = 'torch') -> None:
+        """Point the registry at a local model directory and backend, dropping already loaded models."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend}, expected one of {BACKENDS}")
+        check_backend_requirements(backend)
+        with self._lock:
+            self.model_dir = model_dir
+            self.backend = backend
+            self._models.clear()
+
+    def resolve(self, model_name: str) -> str:
+        """Return a local path for model_name if present in model_dir, otherwise the hub name."""
+        if self.model_dir:
+            local_path = os.path.join(self.model_dir, model_name)
+            if os.path.isdir(local_path):
+                return local_path
+            logging.warning(f"Model {model_name} not found in {self.model_dir}, using hub name")
+        return model_name
+
+    def get(self, key: str, loader: Callable[[str], Any], model_name: str) -> Any:
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                with profiler.stage(f"load_{key}"):  # models not warmed up load inside the first proof
+                    model = loader(self.resolve(model_name))
+                self.load_seconds[key] = time.perf_counter() - start
+                logging.info(f"Loaded model {key} ({self.backend}) in {self.load_seconds[key]:.2f}s")
+                self._models[key] = model
+        return model
+
+    def sentiment_analyzer(self):
+        return self.get(
+            "sentiment",
+            lambda name: load_sentiment_analyzer(name, self.backend),
+            SENTIMENT_MODEL
+        )
+
+    def keybert(self) -> 'KeyBERT':
+        return self.get("keybert", lambda name: load_keybert(name, self.backend), KEYBERT_MODEL)
+
+    def warm_up(self) -> None:
+        """Load the models used by validate_data ahead of the first proof."""
+        self.sentiment_analyzer()
+        self.keybert()
+
+    def record_call(self, name: str, seconds: float) -> None:
+        self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        self.call_seconds[name] = self.call_seconds.get(name, 0.0) + seconds
+
+    def merge_calls(self, call_counts: Dict[str, int], call_seconds: Dict[str, float]) -> None:
+        """Add calls made by another process, e.g. a keyword worker."""
+        for name, count in call_counts.items():
+            self.call_counts[name] = self.call_counts.get(name, 0) + count
+        for name, seconds in call_seconds.items():
+            self.call_seconds[name] = self.call_seconds.get(name, 0.0) + seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "load_seconds": dict(self.load_seconds),
+            "call_counts": dict(self.call_counts),
+            "call_seconds": dict(self.call_seconds),
+        }
+
+
+model_registry = ModelRegistry(os.environ.get("MODEL_DIR"), os.environ.get("INFERENCE_BACKEND", "torch"))
+embedding_cache = EmbeddingCache(
+    int(os.environ.get("EMBEDDING_CACHE_SIZE", 50000)),
+    os.environ.get("EMBEDDING_CACHE_DIR")
+)
+# NLTK stopword lists removed from the LDA/TF-IDF tokens
+stopword_languages = tuple(os.environ.get("STOPWORD_LANGUAGES", "english").split(","))
+
+
+def configure_models(model_dir: Optional[str], backend: str = 'torch') -> None:
+    model_registry.configure(model_dir, backend)
+
+
+def configure_embedding_cache(max_entries: int, disk_dir: Optional[str] = None) -> None:
+    global embedding_cache
+    embedding_cache = EmbeddingCache(max_entries, disk_dir)
+
+
+def configure_stopwords(languages) -> None:
+    global stopword_languages
+    stopword_languages = tuple(languages)
+
+
+def text_preprocessor() -> TextPreprocessor:
+    return get_text_preprocessor(stopword_languages)
+
+
+def warm_up_models() -> None:
+    model_registry.warm_up()
+    text_preprocessor()  # loads the stopword lists and the tokenizer once
 
-def get_keywords(chats):
-    kw_model = KeyBERT(model="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-    keywords = kw_model.extract_keywords(chats)
-    return keywords
 
+def embedding_cache_counters() -> Dict[str, float]:
+    return embedding_cache.counters()
+
+
+def merge_embedding_cache_counters(counters: Dict[str, float]) -> None:
+    embedding_cache.merge_counters(counters)
+
+
+def get_model_stats() -> Dict[str, Any]:
+    stats = model_registry.stats()
+    stats["embedding_cache"] = embedding_cache.stats()
+    return stats
+
+
+def timed(func):
+    """Record call count and wall-clock seconds of func in the model registry, and a profile stage when profiling."""
+    stage = profiled(func.__name__)(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return stage(*args, **kwargs)
+        finally:
+            model_registry.record_call(func.__name__, time.perf_counter() - start)
+    return wrapper
+
+
+@timed
 def get_keywords_keybert(text, num_words=5):
-    model = KeyBERT()
-    keywords = model.extract_keywords(text, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=num_words)
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    model = model_registry.keybert()
+    # Same candidate n-grams KeyBERT extracts internally, so the embeddings line up with its vocabulary
+    try:
+        candidates = CountVectorizer(ngram_range=(1, 2), stop_words='english').fit([text]).get_feature_names_out()
+    except ValueError:  # only stop words
+        return {}
+    # embeddings differ slightly between backends, so they are cached separately
+    cache_namespace = f"{KEYBERT_MODEL}:{model_registry.backend}"
+
+    def embed(texts):
+        # only texts missing from the embedding cache reach the model
+        profiler.record_batch('keybert_embed', len(texts))
+        return model.model.embed(texts)
+
+    doc_embeddings = embedding_cache.embed(cache_namespace, [text], embed)
+    word_embeddings = embedding_cache.embed(cache_namespace, list(candidates), embed)
+    keywords = model.extract_keywords(
+        text, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=num_words,
+        doc_embeddings=doc_embeddings, word_embeddings=word_embeddings
+    )
     return {word: score for word, score in keywords}
 
-def get_keywords_lda(text, num_topics=1, num_words=5):
-    stop_words = set(stopwords.words('english'))
-    words = [word for word in word_tokenize(text.lower()) if word.isalnum() and word not in stop_words]
+@timed
+def get_keywords_lda(text, num_topics=1, num_words=LDA_WORDS_PER_TOPIC):
+    return lda_keywords(text_preprocessor().tokenize(text), num_topics, num_words)
+
+@timed
+def get_keywords_lda_batch(texts: List[str], num_topics=1, num_words=LDA_WORDS_PER_TOPIC) -> List[Dict[str, float]]:
+    """get_keywords_lda for all chats of a submission, tokenized in one call."""
+    return [lda_keywords(words, num_topics, num_words) for words in text_preprocessor().tokenize_batch(texts)]
+
+def lda_keywords(words: List[str], num_topics=1, num_words=LDA_WORDS_PER_TOPIC) -> Dict[str, float]:
+    from gensim.corpora.dictionary import Dictionary
+    from gensim.models import LdaModel
 
     # Create dictionary and corpus for LDA
     dictionary = Dictionary([words])
     corpus = [dictionary.doc2bow(words)]
 
     # Train LDA model
-    lda = LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=15)
+    profiler.record_batch('lda', len(words))
+    lda = LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=15, random_state=LDA_RANDOM_STATE)
 
     # Extract keywords and their weights
     topics = lda.show_topics(num_topics=num_topics, num_words=num_words, formatted=False)
     keywords = {word: weight for _, word_weight_list in topics for word, weight in word_weight_list}
     return keywords
 
+@timed
+def get_keywords_tfidf_batch(texts: List[str], num_words=5) -> List[Dict[str, float]]:
+    """
+    Keywords for all chats of a submission from one shared TF-IDF vocabulary.
+    Uses the same tokens as get_keywords_lda; the sparse matrix is built once and
+    each row keeps its num_words highest weights.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # the documents are already token lists
+    vectorizer = TfidfVectorizer(analyzer=lambda words: words)
+    profiler.record_batch('tfidf', len(texts))
+    try:
+        matrix = vectorizer.fit_transform(text_preprocessor().tokenize_batch(texts))
+    except ValueError:  # no tokens left in any chat
+        return [{} for _ in texts]
+    vocabulary = vectorizer.get_feature_names_out()
+
+    keywords = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        weights = matrix.data[start:end]
+        word_indices = matrix.indices[start:end]
+        if weights.size > num_words:
+            top = np.argpartition(-weights, num_words)[:num_words]
+        else:
+            top = np.arange(weights.size)
+        top = top[np.argsort(-weights[top], kind='stable')]
+        keywords.append({str(vocabulary[word_indices[i]]): float(weights[i]) for i in top})
+    return keywords
+
+@timed
 def get_sentiment_data(chats):
-    sentiment_analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual")
+    sentiment_analyzer = model_registry.sentiment_analyzer()
     messages = chats.split(">") #TODO use real way to split out different messages
     #TODO: make sure no single message is too long for classification, can break it up if length too long
+    profiler.record_batch('sentiment', len(messages))
     sentiments = sentiment_analyzer(messages)
     category_scores = {"positive": 0, "neutral": 0, "negative": 0}
     category_counts = {"positive": 0, "neutral": 0, "negative": 0}
@@ -48,3 +273,100 @@ def get_sentiment_data(chats):
     total_messages = len(messages)
     normalized_scores = {key: (category_scores[key] / total_messages) for key in category_scores}
     return normalized_scores
+
+@profiled()
+def segment_messages(tokenizer, messages: List[str], window_tokens: int) -> List[List[int]]:
+    """
+    Token ids of each message split into windows of at most window_tokens,
+    so messages longer than the model limit are classified piecewise instead of truncated.
+    """
+    if not messages:
+        return []
+    token_ids = tokenizer(messages, add_special_tokens=False)['input_ids']
+    return [
+        [ids[start:start + window_tokens] for start in range(0, len(ids), window_tokens)] or [[]]
+        for ids in token_ids
+    ]
+
+
+@profiled()
+def pack_batches(lengths: List[int], token_budget: int) -> List[List[int]]:
+    """
+    Group window indexes into batches whose padded size (windows x longest window) stays
+    within token_budget. Windows are sorted by length so padding inside a batch is small.
+    """
+    batches = []
+    current = []
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # ascending order: the window being added is the longest of the batch
+        if current and (len(current) + 1) * lengths[index] > token_budget:
+            batches.append(current)
+            current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
+
+
+@timed
+def get_sentiment_totals_batch(
+    chat_messages: List[List[str]],
+    token_budget: int = 8192
+) -> List[Tuple[Dict[str, float], int]]:
+    """
+    Token-weighted sentiment category sums and token count of several chats in one pass.
+    Sums of different message sets of a chat add up, so results can be extended incrementally.
+    Each message is split into windows at the model's max length, windows of all chats are
+    packed into batches under token_budget padded tokens, and the class probabilities of a
+    message's windows are averaged weighted by their token counts. Per chat, the category
+    scores of its messages are averaged weighted by message token count.
+    """
+    import torch
+
+    sentiment_analyzer = model_registry.sentiment_analyzer()
+    tokenizer, model = sentiment_analyzer.tokenizer, sentiment_analyzer.model
+    max_length = min(tokenizer.model_max_length, 512)
+    window_tokens = max_length - tokenizer.num_special_tokens_to_add()
+
+    # flatten to windows, remembering which message of which chat they belong to
+    window_owners = []
+    windows = []
+    message_tokens = []
+    for chat_index, messages in enumerate(chat_messages):
+        chat_windows = segment_messages(tokenizer, messages, window_tokens)
+        message_tokens.append([sum(len(window) for window in message_windows) for message_windows in chat_windows])
+        for message_index, message_windows in enumerate(chat_windows):
+            for window in message_windows:
+                window_owners.append((chat_index, message_index))
+                windows.append(tokenizer.build_inputs_with_special_tokens(window))
+
+    labels = [model.config.id2label[i].lower() for i in range(model.config.num_labels)]
+    message_probs = [np.zeros((len(tokens), len(labels))) for tokens in message_tokens]
+    for batch in pack_batches([len(window) for window in windows], token_budget):
+        batch_length = max(len(windows[i]) for i in batch)
+        profiler.record_batch('sentiment', len(batch))
+        input_ids = torch.full((len(batch), batch_length), tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), batch_length), dtype=torch.long)
+        for row, i in enumerate(batch):
+            input_ids[row, :len(windows[i])] = torch.tensor(windows[i])
+            attention_mask[row, :len(windows[i])] = 1
+        with torch.inference_mode():
+            probs = torch.softmax(model(input_ids=input_ids, attention_mask=attention_mask).logits, dim=-1).numpy()
+        for row, i in enumerate(batch):
+            chat_index, message_index = window_owners[i]
+            weight = max(len(windows[i]) - tokenizer.num_special_tokens_to_add(), 1)
+            message_probs[chat_index][message_index] += probs[row] * weight
+
+    chat_totals = []
+    for probs, tokens in zip(message_probs, message_tokens):
+        category_scores = {"positive": 0, "neutral": 0, "negative": 0}
+        total_tokens = sum(tokens)
+        for message_prob, message_token_count in zip(probs, tokens):
+            if message_token_count == 0:
+                continue
+            message_prob = message_prob / message_prob.sum()
+            label = labels[int(np.argmax(message_prob))]
+            # same label/score per message as the pipeline, weighted by message length
+            category_scores[label] += float(np.max(message_prob)) * message_token_count
+        chat_totals.append((category_scores, total_tokens))
+    return chat_totals
@@ -0,0 +1,60 @@
+import builtins
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+class ImportTimer:
+    """
+    Wall-clock time spent importing each top-level package, measured by wrapping __import__.
+    Times are exclusive, like the self column of `python -X importtime`: a package's nested
+    imports of other packages are charged to those packages. Imports deferred to first use
+    (torch, transformers, ...) show up once the code that needs them has run.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._local = threading.local()
+        self._original_import = None
+
+    def install(self) -> None:
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self) -> None:
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # relative and already loaded imports are cheap lookups, charged to the importing package
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)  # time spent in imports nested in this one
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            package = name.partition('.')[0]
+            self.seconds[package] = self.seconds.get(package, 0.0) + elapsed - nested
+
+    def report(self, top: int = 15) -> List[Tuple[str, float]]:
+        """The slowest packages to import so far, in seconds."""
+        ranked = sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [(package, round(seconds, 4)) for package, seconds in ranked]
+
+    def total_seconds(self) -> float:
+        return sum(self.seconds.values())
+
+
+import_timer = ImportTimer()
@@ -0,0 +1,132 @@
+import importlib.util
+import os
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+# torch, transformers and keybert are imported when a model is loaded, not with this module
+if TYPE_CHECKING:
+    import torch
+    from keybert import KeyBERT
+
+# 'torch': fp32 models as published
+# 'quantized': fp32 weights with Linear layers dynamically quantized to int8 at load time
+# 'onnx': graphs exported ahead of time by scripts/export_models.py, run with ONNX Runtime
+BACKENDS = ('torch', 'quantized', 'onnx')
+# packages a backend needs beyond requirements.txt (module name -> pip package)
+BACKEND_REQUIREMENTS = {
+    'onnx': {'onnxruntime': 'onnxruntime', 'optimum': 'optimum'},  # optimum: sentence-transformers' onnx backend
+}
+ONNX_FILE = os.path.join('onnx', 'model.onnx')
+QUANTIZED_ONNX_FILE = os.path.join('onnx', 'model_quantized.onnx')
+
+
+def check_backend_requirements(backend: str) -> None:
+    """Fail before any model is loaded if the backend's optional packages are not installed."""
+    missing = [
+        package for module, package in BACKEND_REQUIREMENTS.get(backend, {}).items()
+        if importlib.util.find_spec(module) is None  # finds the module without importing it
+    ]
+    if missing:
+        raise ImportError(
+            f"The {backend} inference backend needs {', '.join(missing)}; "
+            f"install requirements-{backend}.txt"
+        )
+
+
+def quantize_linear_layers(module: 'torch.nn.Module') -> 'torch.nn.Module':
+    import torch
+
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def onnx_file(model_path: str) -> str:
+    """Relative path of the exported graph to load, preferring the int8 one."""
+    if os.path.exists(os.path.join(model_path, QUANTIZED_ONNX_FILE)):
+        return QUANTIZED_ONNX_FILE
+    if os.path.exists(os.path.join(model_path, ONNX_FILE)):
+        return ONNX_FILE
+    raise FileNotFoundError(
+        f"No exported ONNX model in {model_path}; run scripts/export_models.py and set MODEL_DIR"
+    )
+
+
+class OnnxSequenceClassifier:
+    """Exported sequence classification graph with the call signature of the HF model (torch logits out)."""
+
+    def __init__(self, model_path: str):
+        import onnxruntime  # optional dependency, only needed for this backend
+        import torch
+        from transformers import AutoConfig
+
+        self.config = AutoConfig.from_pretrained(model_path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_path, onnx_file(model_path)),
+            options,
+            providers=['CPUExecutionProvider']
+        )
+
+    def __call__(self, input_ids, attention_mask):
+        import torch
+
+        logits = self.session.run(
+            ['logits'],
+            {'input_ids': input_ids.numpy(), 'attention_mask': attention_mask.numpy()}
+        )[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+class OnnxSentimentPipeline:
+    """Drop-in for the transformers sentiment-analysis pipeline on top of OnnxSequenceClassifier."""
+
+    def __init__(self, model_path: str):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = OnnxSequenceClassifier(model_path)
+
+    def __call__(self, messages, **kwargs):
+        import torch
+
+        if isinstance(messages, str):
+            messages = [messages]
+        encoded = self.tokenizer(messages, padding=True, truncation=True, return_tensors='pt')
+        probs = torch.softmax(self.model(encoded['input_ids'], encoded['attention_mask']).logits, dim=-1)
+        scores, label_ids = probs.max(dim=-1)
+        return [
+            {'label': self.model.config.id2label[int(label_id)], 'score': float(score)}
+            for score, label_id in zip(scores, label_ids)
+        ]
+
+
+def load_sentiment_analyzer(model_path: str, backend: str):
+    if backend == 'onnx':
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"The onnx backend needs a local model directory, got {model_path}")
+        return OnnxSentimentPipeline(model_path)
+    from transformers import pipeline
+
+    sentiment_analyzer = pipeline("sentiment-analysis", model=model_path)
+    if backend == 'quantized':
+        sentiment_analyzer.model = quantize_linear_layers(sentiment_analyzer.model)
+    return sentiment_analyzer
+
+
+def load_keybert(model_path: str, backend: str) -> 'KeyBERT':
+    from keybert import KeyBERT
+
+    if backend == 'onnx':
+        from sentence_transformers import SentenceTransformer
+
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"The onnx backend needs a local model directory, got {model_path}")
+        return KeyBERT(model=SentenceTransformer(
+            model_path,
+            backend='onnx',
+            model_kwargs={'file_name': onnx_file(model_path)}
+        ))
+    kw_model = KeyBERT(model=model_path)
+    if backend == 'quantized':
+        kw_model.model.embedding_model = quantize_linear_layers(kw_model.model.embedding_model)
+    return kw_model
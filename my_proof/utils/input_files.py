@@ -0,0 +1,110 @@
+import io
+import logging
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO
+
+ZIP_MAGIC = b'PK\x03\x04'
+MAX_FILE_BYTES = 1 << 30  # 1 GiB uncompressed per input file
+MAX_TOTAL_BYTES = 2 << 30  # 2 GiB uncompressed per submission
+MAX_COMPRESSION_RATIO = 100  # chat exports compress ~10x, far more means a crafted archive
+
+
+class InputLimitError(ValueError):
+    """Input larger than the configured limits, e.g. a zip bomb."""
+
+
+@dataclass
+class InputFile:
+    name: str  # base name, whether the file was in the input directory or inside an archive
+    size: int  # uncompressed bytes
+    open: Callable[[], TextIO]  # text stream over the content, read straight from disk or the archive
+
+
+class LimitedReader(io.RawIOBase):
+    """Binary stream that fails once more than max_bytes have been read, whatever the archive header claims."""
+
+    def __init__(self, raw, max_bytes: int, name: str):
+        self.raw = raw
+        self.remaining = max_bytes
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(min(len(buffer), self.remaining + 1))
+        if len(data) > self.remaining:
+            raise InputLimitError(f"{self.name} is larger than its declared size")
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+def is_zip(path: str) -> bool:
+    """Cheap check on the local file header magic, instead of zipfile.is_zipfile's search for the central directory."""
+    with open(path, 'rb') as f:
+        return f.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+def _zip_members(path: str, limits: Dict[str, int], budget: Dict[str, int]) -> Iterator[InputFile]:
+    with zipfile.ZipFile(path, 'r') as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = os.path.basename(info.filename)
+            if not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            if info.file_size > limits['max_file_bytes']:
+                raise InputLimitError(f"{info.filename} in {path} is {info.file_size} bytes uncompressed")
+            if info.compress_size and info.file_size / info.compress_size > limits['max_compression_ratio']:
+                raise InputLimitError(f"{info.filename} in {path} has compression ratio "
+                                      f"{info.file_size / info.compress_size:.0f}")
+            budget['total'] += info.file_size
+            if budget['total'] > limits['max_total_bytes']:
+                raise InputLimitError(f"Input is larger than {limits['max_total_bytes']} bytes uncompressed")
+
+            def open_member(info=info):
+                raw = LimitedReader(archive.open(info), info.file_size, info.filename)
+                return io.TextIOWrapper(io.BufferedReader(raw), encoding='utf-8')
+
+            yield InputFile(name, info.file_size, open_member)
+
+
+def iter_input_files(input_path: str, config: Optional[Dict[str, Any]] = None) -> Iterator[InputFile]:
+    """
+    Input files of a submission: the files of a directory, with the members of any zip in it
+    listed in place of the zip, or the members of a single zip file. Nothing is extracted to disk;
+    each InputFile opens a stream over its bytes, so the parser reads every file exactly once.
+    Archives are closed as iteration moves on, so open each file before advancing.
+    Archive members are checked against size and compression ratio limits before they are opened.
+    """
+    config = config or {}
+    limits = {
+        'max_file_bytes': config.get('max_input_file_bytes', MAX_FILE_BYTES),
+        'max_total_bytes': config.get('max_input_total_bytes', MAX_TOTAL_BYTES),
+        'max_compression_ratio': config.get('max_compression_ratio', MAX_COMPRESSION_RATIO),
+    }
+    budget = {'total': 0}
+    if not os.path.isdir(input_path):
+        yield from _zip_members(input_path, limits, budget)
+        return
+
+    for input_filename in sorted(os.listdir(input_path)):
+        input_file = os.path.join(input_path, input_filename)
+        if not os.path.isfile(input_file):
+            continue
+        if is_zip(input_file):
+            logging.info(f"Reading {input_filename} in place")
+            yield from _zip_members(input_file, limits, budget)
+            continue
+        size = os.path.getsize(input_file)
+        budget['total'] += size
+        if size > limits['max_file_bytes'] or budget['total'] > limits['max_total_bytes']:
+            raise InputLimitError(f"{input_filename} exceeds the input size limits")
+        yield InputFile(input_filename, size, lambda input_file=input_file: open(input_file, 'r', encoding='utf-8'))
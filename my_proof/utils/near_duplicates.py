@@ -0,0 +1,203 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+INDEX_FILENAME = 'minhash_lsh.sqlite'
+NUM_PERM = 128
+NUM_BANDS = 32  # 4 rows per band, candidate threshold around 0.42 Jaccard
+SHINGLE_SIZE = 3
+CHUNK_ROWS = 1024  # shingles hashed per vectorized step, sized to stay in cache
+QUERY_CHUNK_SIZE = 500  # stays below SQLite's bound parameter limit
+EMPTY_HASH = np.uint32(0xFFFFFFFF)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Fixed multiply-shift hash family so signatures stay comparable across processes and proofs
+_rng = np.random.RandomState(1)
+PERM_A = _rng.randint(0, np.iinfo(np.uint64).max, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+PERM_B = _rng.randint(0, np.iinfo(np.uint64).max, size=NUM_PERM, dtype=np.uint64)
+
+
+def chat_shingles(contents: Iterable[str], size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    32-bit hashes of the word n-grams of every message. Shingles never span two messages,
+    so reordering messages does not change the set and editing one only touches its own shingles.
+    """
+    shingles = set()
+    for content in contents:
+        words = WORD_PATTERN.findall(content.lower())
+        if len(words) < size:
+            if words:
+                shingles.add(' '.join(words))
+            continue
+        for i in range(len(words) - size + 1):
+            shingles.add(' '.join(words[i:i + size]))
+    return np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def minhash_signatures(shingle_arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    MinHash signatures (one row of NUM_PERM uint32 values per chat) for many chats at once.
+    All shingles are concatenated and hashed in fixed-size chunks, then reduced per chat.
+    """
+    signatures = np.full((len(shingle_arrays), NUM_PERM), EMPTY_HASH, dtype=np.uint32)
+    if not shingle_arrays:
+        return signatures
+    owners = np.repeat(np.arange(len(shingle_arrays)), [len(array) for array in shingle_arrays])
+    if not owners.size:
+        return signatures
+    shingles = np.concatenate(shingle_arrays)
+    buffer = np.empty((CHUNK_ROWS, NUM_PERM), dtype=np.uint64)
+    shift = np.uint64(32)
+    with np.errstate(over='ignore'):
+        for start in range(0, shingles.size, CHUNK_ROWS):
+            chunk = shingles[start:start + CHUNK_ROWS]
+            chunk_owners = owners[start:start + CHUNK_ROWS]
+            permuted = buffer[:chunk.size]
+            # multiply-shift: ((a * x + b) mod 2^64) >> 32, uint64 wraparound is the mod
+            np.multiply(chunk[:, None], PERM_A, out=permuted)
+            permuted += PERM_B
+            permuted >>= shift
+            # owners are sorted, so each chat is one contiguous run of rows in the chunk
+            chunk_chats, run_starts = np.unique(chunk_owners, return_index=True)
+            reduced = np.minimum.reduceat(permuted, run_starts, axis=0).astype(np.uint32)
+            signatures[chunk_chats] = np.minimum(signatures[chunk_chats], reduced)
+    return signatures
+
+
+def empty_signatures(signatures: np.ndarray) -> np.ndarray:
+    """
+    Mask of the chats without a single word shingle (emoji, stickers, punctuation only).
+    Their signatures are all EMPTY_HASH and would match each other at similarity 1.0,
+    so they are neither indexed nor scored.
+    """
+    return np.all(signatures == EMPTY_HASH, axis=1)
+
+
+def estimate_jaccard(signature: np.ndarray, other: np.ndarray) -> float:
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+
+def band_keys(signature: np.ndarray) -> List[bytes]:
+    """One bucket key per band: the band number followed by the band's raw values."""
+    bands = signature.reshape(NUM_BANDS, NUM_PERM // NUM_BANDS)
+    return [bytes((band,)) + bands[band].tobytes() for band in range(NUM_BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of previously submitted chats with an LSH banding table in SQLite.
+    A query only compares against chats sharing at least one band bucket.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS signatures (
+                chat_key TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                bucket BLOB NOT NULL,
+                chat_key TEXT NOT NULL,
+                PRIMARY KEY (bucket, chat_key)
+            ) WITHOUT ROWID;
+        """)
+
+    def max_similarities(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Highest estimated Jaccard similarity of each signature to any indexed chat
+        (0 where there is no candidate, or the chat has no shingles). Buckets and
+        candidates are fetched in bulk.
+        """
+        empty = empty_signatures(signatures)
+        chat_band_keys = [[] if is_empty else band_keys(signature) for signature, is_empty in zip(signatures, empty)]
+        all_keys = list({key for keys in chat_band_keys for key in keys})
+        bucket_chats: Dict[bytes, List[str]] = {}
+        candidate_signatures: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(all_keys), QUERY_CHUNK_SIZE):
+                chunk = all_keys[start:start + QUERY_CHUNK_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT bucket, chat_key FROM lsh_buckets WHERE bucket IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for bucket, chat_key in rows:
+                    bucket_chats.setdefault(bucket, []).append(chat_key)
+            candidate_keys = list({chat_key for chat_keys in bucket_chats.values() for chat_key in chat_keys})
+            for start in range(0, len(candidate_keys), QUERY_CHUNK_SIZE):
+                chunk = candidate_keys[start:start + QUERY_CHUNK_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT chat_key, signature FROM signatures WHERE chat_key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for chat_key, signature in rows:
+                    candidate_signatures[chat_key] = np.frombuffer(signature, dtype=np.uint32)
+
+        similarities = np.zeros(len(signatures))
+        for i, (signature, keys) in enumerate(zip(signatures, chat_band_keys)):
+            candidates = {chat_key for key in keys for chat_key in bucket_chats.get(key, ())}
+            if candidates:
+                matrix = np.stack([candidate_signatures[chat_key] for chat_key in candidates])
+                similarities[i] = np.max(np.count_nonzero(matrix == signature, axis=1)) / NUM_PERM
+        return similarities
+
+    def add_many(self, chat_keys: List[str], signatures: np.ndarray) -> None:
+        """Index chat signatures in one transaction, replacing those of previous submissions."""
+        empty = empty_signatures(signatures)
+        with self._lock, self._connection:
+            for chat_key, signature, is_empty in zip(chat_keys, signatures, empty):
+                if is_empty:
+                    continue
+                row = self._connection.execute(
+                    "SELECT signature FROM signatures WHERE chat_key = ?", (chat_key,)
+                ).fetchone()
+                if row:
+                    previous = np.frombuffer(row[0], dtype=np.uint32)
+                    self._connection.executemany(
+                        "DELETE FROM lsh_buckets WHERE bucket = ? AND chat_key = ?",
+                        ((key, chat_key) for key in band_keys(previous))
+                    )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO signatures (chat_key, signature) VALUES (?, ?)",
+                    (chat_key, signature.tobytes())
+                )
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO lsh_buckets (bucket, chat_key) VALUES (?, ?)",
+                    ((key, chat_key) for key in band_keys(signature))
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_indexes: Dict[str, NearDuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_near_duplicate_index(config: Dict[str, Any]) -> Optional[NearDuplicateIndex]:
+    """Open (once per process) the MinHash LSH index in the sealed directory, or None without sealing."""
+    if not config.get('use_sealing'):
+        return None
+    path = os.path.join(config.get('sealed_dir', '/sealed'), INDEX_FILENAME)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            logging.info(f"Opening near-duplicate index {path}")
+            index = NearDuplicateIndex(path)
+            _indexes[path] = index
+    return index
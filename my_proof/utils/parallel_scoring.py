@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.feature_extraction import (
+    configure_models, configure_stopwords, embedding_cache_counters, get_keywords_keybert, get_keywords_lda,
+    merge_embedding_cache_counters, model_registry
+)
+from utils.profiling import profiler
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def default_torch_threads(workers: int) -> int:
+    """Split the cores between workers so their torch thread pools do not oversubscribe the CPU."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def worker_torch_threads(config: Dict[str, Any]) -> int:
+    return config.get('worker_torch_threads') or default_torch_threads(config['workers'])
+
+
+@contextmanager
+def parent_torch_threads(config: Dict[str, Any]):
+    """
+    While the keyword workers run, cap this process's torch threads (batched sentiment) to the
+    cores the workers leave free, at least one, so workers and parent together fit the CPU.
+    """
+    import torch
+
+    threads = torch.get_num_threads()
+    free = (os.cpu_count() or 1) - config['workers'] * worker_torch_threads(config)
+    torch.set_num_threads(max(1, free))
+    try:
+        yield
+    finally:
+        torch.set_num_threads(threads)
+
+
+def _init_worker(model_dir: Optional[str], backend: str, torch_threads: int, stopword_languages: Tuple[str, ...]) -> None:
+    import torch
+    torch.set_num_threads(torch_threads)
+    configure_models(model_dir, backend)
+    configure_stopwords(stopword_languages)
+    model_registry.keybert()  # load once per worker, before the first chat arrives
+
+
+def _extract_chat_keywords(args: Tuple[str, int, bool, str]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Keywords of one chat, with the model calls, embedding cache lookups and profile stages
+    they took for the parent to merge.
+    """
+    text, number_of_keywords, with_lda, profile_mode = args
+    call_counts = dict(model_registry.call_counts)
+    call_seconds = dict(model_registry.call_seconds)
+    cache_counters = embedding_cache_counters()
+    with profiler.session(profile_mode) as session:
+        keywords = (
+            get_keywords_keybert(text, number_of_keywords),
+            get_keywords_lda(text, number_of_keywords) if with_lda else None
+        )
+    stats = {
+        'call_counts': {
+            name: count - call_counts.get(name, 0) for name, count in model_registry.call_counts.items()
+            if count != call_counts.get(name, 0)
+        },
+        'call_seconds': {
+            name: seconds - call_seconds.get(name, 0.0) for name, seconds in model_registry.call_seconds.items()
+            if seconds != call_seconds.get(name, 0.0)
+        },
+        'embedding_cache': {
+            name: value - cache_counters[name] for name, value in embedding_cache_counters().items()
+        },
+        'profile': session.profile
+    }
+    return (*keywords, stats)
+
+
+def _merge_worker_stats(results: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Dict[str, Any]]]):
+    """
+    Keyword results in order, adding each worker's model calls, embedding cache lookups and
+    profile stages to this process's.
+    """
+    for keywords_keybert, keywords_lda, stats in results:
+        model_registry.merge_calls(stats['call_counts'], stats['call_seconds'])
+        merge_embedding_cache_counters(stats['embedding_cache'])
+        if stats['profile'] is not None:
+            profiler.merge(stats['profile'])
+        yield keywords_keybert, keywords_lda
+
+
+def get_keyword_pool(config: Dict[str, Any]) -> ProcessPoolExecutor:
+    """
+    Process-wide worker pool, created on first use and reused by later proofs.
+    Workers are spawned (not forked) so they never inherit torch/OpenMP state from the parent.
+    """
+    global _pool, _pool_key
+    workers = config['workers']
+    torch_threads = worker_torch_threads(config)
+    backend = config.get('inference_backend', 'torch')
+    stopword_languages = tuple(config.get('stopword_languages', ['english']))
+    key = (workers, torch_threads, config.get('model_dir'), backend, stopword_languages)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown()
+            logging.info(f"Starting {workers} keyword workers with {torch_threads} torch threads each")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(config.get('model_dir'), backend, torch_threads, stopword_languages)
+            )
+            _pool_key = key
+    return _pool
+
+
+def map_chat_keywords(
+    config: Dict[str, Any],
+    texts: List[str],
+    number_of_keywords: int,
+    with_lda: bool = True
+) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    KeyBERT (and, if with_lda, LDA) keywords for each text, in input order. All chats are
+    submitted immediately, so the caller can do other work before consuming the results.
+    Model stats, embedding cache stats and, when this thread is profiling, profile stages of
+    the workers are merged into this process's as the results are consumed.
+    """
+    pool = get_keyword_pool(config)
+    session = profiler.current
+    profile_mode = session.mode if session is not None else 'off'
+    return _merge_worker_stats(pool.map(
+        _extract_chat_keywords,
+        [(text, number_of_keywords, with_lda, profile_mode) for text in texts]
+    ))
+
+
+def shutdown_keyword_pool() -> None:
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+            _pool_key = None
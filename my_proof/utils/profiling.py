@@ -0,0 +1,196 @@
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+PROFILE_MODES = ('off', 'time', 'memory')
+
+
+class ProfileSession:
+    """
+    Stage timers, model batch sizes and counters of one proof. Stages nest: seconds are
+    inclusive and self_seconds exclude nested stages. In 'memory' mode each stage also
+    records the peak of Python allocations traced by tracemalloc while it ran (native
+    tensors of torch are not traced; max_rss_bytes covers the whole process).
+    """
+
+    def __init__(self, mode: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode}, expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.memory = mode == 'memory'
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, int]] = {}
+        self.counters: Dict[str, int] = {}
+        self.profile: Optional[Dict[str, Any]] = None  # set when the session ends
+        self._stack: List[list] = []  # [name, start, nested seconds, peak bytes]
+        self._start = time.perf_counter()
+
+    def enter(self, name: str) -> None:
+        if self.memory:
+            # the enclosing stage keeps the peak reached so far, this stage starts from the current size
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append([name, time.perf_counter(), 0.0, 0])
+
+    def exit(self) -> None:
+        name, start, nested_seconds, peak = self._stack.pop()
+        seconds = time.perf_counter() - start
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0}
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        stage['self_seconds'] += seconds - nested_seconds
+        if self._stack:
+            self._stack[-1][2] += seconds
+        if self.memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            stage['peak_memory_bytes'] = max(stage.get('peak_memory_bytes', 0), peak)
+            tracemalloc.reset_peak()
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], peak)
+
+    def record_batch(self, model: str, size: int) -> None:
+        batch = self.batches.get(model)
+        if batch is None:
+            batch = self.batches[model] = {'calls': 0, 'items': 0, 'max_size': 0}
+        batch['calls'] += 1
+        batch['items'] += size
+        batch['max_size'] = max(batch['max_size'], size)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, profile: Dict[str, Any]) -> None:
+        """
+        Add the stages, batches and counters of a finished profile from another process, such
+        as a keyword worker. Its stages ran alongside this process's, so their seconds overlap.
+        """
+        for name, other in profile['stages'].items():
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0}
+            stage['calls'] += other['calls']
+            stage['seconds'] += other['seconds']
+            stage['self_seconds'] += other['self_seconds']
+            if 'peak_memory_bytes' in other:
+                stage['peak_memory_bytes'] = max(stage.get('peak_memory_bytes', 0), other['peak_memory_bytes'])
+        for model, other in profile['batch_sizes'].items():
+            batch = self.batches.get(model)
+            if batch is None:
+                batch = self.batches[model] = {'calls': 0, 'items': 0, 'max_size': 0}
+            batch['calls'] += other['calls']
+            batch['items'] += other['items']
+            batch['max_size'] = max(batch['max_size'], other['max_size'])
+        for name, amount in profile['counters'].items():
+            self.count(name, amount)
+
+    def finish(self) -> Dict[str, Any]:
+        self.profile = {
+            'mode': self.mode,
+            'seconds': round(time.perf_counter() - self._start, 6),
+            'stages': {
+                name: {key: round(value, 6) if isinstance(value, float) else value for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+            'model_calls': {model: batch['calls'] for model, batch in self.batches.items()},
+            'batch_sizes': {
+                model: dict(batch, mean_size=round(batch['items'] / batch['calls'], 2))
+                for model, batch in self.batches.items()
+            },
+            'counters': dict(self.counters),
+            # ru_maxrss is in kilobytes on Linux; the high-water mark of the whole process so far
+            'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+        return self.profile
+
+
+class Profiler:
+    """
+    Per-thread profiling sessions. Without an active session, stages, batches and counters
+    cost one thread-local lookup, so the instrumentation stays in place when profiling is off.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def current(self) -> Optional[ProfileSession]:
+        return getattr(self._local, 'session', None)
+
+    @contextmanager
+    def session(self, mode: Optional[str]):
+        """
+        Profile the enclosed block unless mode is off. Sessions do not nest: inside an active
+        session this is a no-op whose profile stays None, the outermost one collects everything.
+        """
+        if not mode or mode == 'off' or self.current is not None:
+            yield ProfileSession('off')
+            return
+        session = ProfileSession(mode)
+        started_tracing = session.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        self._local.session = session
+        try:
+            yield session
+        finally:
+            self._local.session = None
+            session.finish()
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str):
+        session = self.current
+        if session is None:
+            yield
+            return
+        session.enter(name)
+        try:
+            yield
+        finally:
+            session.exit()
+
+    def record_batch(self, model: str, size: int) -> None:
+        """One model invocation on size items (texts, windows or tokens, per model)."""
+        session = self.current
+        if session is not None:
+            session.record_batch(model, size)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        session = self.current
+        if session is not None:
+            session.count(name, amount)
+
+    def merge(self, profile: Dict[str, Any]) -> None:
+        session = self.current
+        if session is not None:
+            session.merge(profile)
+
+
+profiler = Profiler()
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator recording each call of the function as a profile stage, named after it by default."""
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            session = profiler.current
+            if session is None:
+                return func(*args, **kwargs)
+            session.enter(stage_name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                session.exit()
+        return wrapper
+    return decorate
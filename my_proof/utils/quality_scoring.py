@@ -0,0 +1,75 @@
+import math
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from models.cargo_data import (
+    CONTEXT_MIDPOINT, CONTEXT_STEEPNESS, OPTIMAL_PARTICIPANTS, PARTICIPANTS_DEVIATION,
+    TIMELINESS_HALF_LIFE_MINUTES, SourceChatData
+)
+from utils.profiling import profiled
+
+
+def round_like_builtin(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    np.round, except that values within float error of a half-way tie are rounded with the
+    builtin round, which rounds the exact binary value and can land on the other side.
+    """
+    scale = 10 ** digits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+
+@dataclass
+class QualityColumns:
+    """Per-chat totals of a submission as columns, the inputs of every quality component."""
+    content_length: np.ndarray  # int64, characters per chat
+    content_value: np.ndarray  # int64, sum of characters x minutes per chat
+    participants: np.ndarray  # int64, distinct participants per chat
+
+    @classmethod
+    def from_chats(cls, source_chats: Sequence[SourceChatData]) -> 'QualityColumns':
+        count = len(source_chats)
+        return cls(
+            content_length=np.fromiter((chat.total_content_length for chat in source_chats), np.int64, count),
+            content_value=np.fromiter((chat.total_content_value for chat in source_chats), np.int64, count),
+            participants=np.fromiter((len(chat.participant_ids) for chat in source_chats), np.int64, count),
+        )
+
+    def timeliness(self) -> np.ndarray:
+        """SourceChatData.timeliness_value for every chat."""
+        has_content = self.content_length > 0
+        # tav = (𝛴 litsi) / (𝛴 li), same float division as the scalar method
+        time_avg = np.divide(self.content_value, self.content_length,
+                             out=np.zeros(len(self.content_length)), where=has_content)
+        time_decay = math.log(2) / TIMELINESS_HALF_LIFE_MINUTES
+        return np.where(has_content, np.exp(-time_decay * time_avg), 0.0)
+
+    def thoughtfulness(self) -> np.ndarray:
+        """SourceChatData.thoughtfulness_of_conversation for every chat."""
+        return np.exp(-(self.participants - OPTIMAL_PARTICIPANTS) / (2 * PARTICIPANTS_DEVIATION ** 2))
+
+    def contextualness(self) -> np.ndarray:
+        """SourceChatData.contextualness_of_conversation for every chat."""
+        return 1 / (1 + np.exp(-CONTEXT_STEEPNESS * (self.content_length - CONTEXT_MIDPOINT)))
+
+    def quality_scores(self) -> List[float]:
+        """SourceChatData.quality_score for every chat."""
+        a, b, c = 1, 1, 1
+        t = self.timeliness()
+        l = self.contextualness()
+        # the scalar score uses t twice and leaves thoughtfulness out; kept identical on purpose
+        raw = (a * t + b * t + c * l) / (a + b + c)
+        return round_like_builtin(raw, 2).tolist()
+
+
+@profiled()
+def score_quality(source_chats: Sequence[SourceChatData]) -> List[float]:
+    """Quality score of every chat in one vectorized pass, equal to calling quality_score per chat."""
+    return QualityColumns.from_chats(source_chats).quality_scores()
+
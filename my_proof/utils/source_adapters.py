@@ -0,0 +1,133 @@
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.cargo_data import DataSource, SourceChatData
+
+logger = logging.getLogger(__name__)
+
+# (sender id, epoch seconds or 0 when unknown, text or None for messages without text)
+MessageRecord = Tuple[Any, int, Optional[str]]
+
+
+class SourceAdapter(ABC):
+    """
+    Turns one source's raw chat messages into normalized message records. An adapter is
+    looked up once per chats.json and then fed each chat's messages, from a parsed list or
+    one at a time from the streaming parser, through a ChatBuilder.
+    """
+    source: DataSource = None
+
+    @abstractmethod
+    def read_message(self, input_content: Dict[str, Any]) -> Optional[MessageRecord]:
+        """Normalized record of one raw message, or None for items that are not messages."""
+
+    def chat_builder(self) -> 'ChatBuilder':
+        return ChatBuilder(self)
+
+
+class ChatBuilder:
+    """A chat's message records as columns, turned into a SourceChatData once the chat is complete."""
+
+    def __init__(self, adapter: SourceAdapter):
+        self.read_message = adapter.read_message
+        self.participants: Dict[Any, None] = {}  # in order of appearance, like SourceChatData's
+        self.texts: List[str] = []
+        self.dates: List[int] = []
+
+    def add(self, input_content: Dict[str, Any]) -> None:
+        record = self.read_message(input_content)
+        if record is None:
+            return
+        sender, date, text = record
+        if sender:
+            self.participants[sender] = None
+        if text:
+            self.texts.append(text)
+            self.dates.append(date)
+
+    def build(self, chat_id: Any, current_timestamp: int) -> SourceChatData:
+        """SourceChatData with the minutes between each message and current_timestamp computed in one pass."""
+        source_chat = SourceChatData(chat_id=chat_id)
+        source_chat.participant_ids.update(self.participants)
+        dates = np.asarray(self.dates, dtype=np.int64)
+        # messages without a date count as current
+        source_chat.add_contents(self.texts, np.where(dates > 0, (current_timestamp - dates) // 60, 0))
+        return source_chat
+
+
+class TelegramAdapter(SourceAdapter):
+    """Telegram TDLib message objects: sender_id.user_id, integer date and messageText content."""
+    source = DataSource.telegram
+
+    def read_message(self, input_content: Dict[str, Any]) -> Optional[MessageRecord]:
+        if input_content.get('@type') != "message":
+            return None
+        chat_user_id = input_content.get("sender_id", {}).get("user_id", "")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"chat_user_id: {chat_user_id}")
+        message = input_content.get('content', {})
+        if not isinstance(message, dict) or message.get("@type") != "messageText":
+            return chat_user_id, 0, None
+        date_value = input_content.get("date", None)
+        if not date_value and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No valid date found in the input content.")
+        return chat_user_id, int(date_value or 0), message.get("text", {}).get("text", "")
+
+
+class DiscordAdapter(SourceAdapter):
+    """
+    Discord messages as exported by DiscordChatExporter's JSON format: author.id, an ISO 8601
+    timestamp and plain-text content. Only user messages (Default, Reply) count; joins,
+    pins and other system messages are skipped, and so are messages whose timestamp cannot
+    be parsed, rather than scoring them as sent at submission time.
+    """
+    source = DataSource.discord
+    USER_MESSAGE_TYPES = ('Default', 'Reply')
+
+    def read_message(self, input_content: Dict[str, Any]) -> Optional[MessageRecord]:
+        if input_content.get('type', 'Default') not in self.USER_MESSAGE_TYPES:
+            return None
+        author_id = (input_content.get('author') or {}).get('id', "")
+        timestamp = input_content.get('timestamp')
+        try:
+            date = self.epoch_seconds(timestamp)
+        except (TypeError, ValueError):
+            logger.warning(f"Skipping Discord message with malformed timestamp {timestamp!r}")
+            return None
+        return author_id, date, input_content.get('content')
+
+    @staticmethod
+    def epoch_seconds(timestamp: Any) -> int:
+        """Epoch seconds of an ISO 8601 timestamp (UTC if it has no offset), 0 when missing."""
+        if not timestamp:
+            return 0
+        if isinstance(timestamp, (int, float)):
+            return int(timestamp)
+        moment = datetime.fromisoformat(timestamp)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+
+
+SOURCE_ADAPTERS: Dict[DataSource, SourceAdapter] = {}
+
+
+def register_source_adapter(adapter: SourceAdapter) -> None:
+    SOURCE_ADAPTERS[adapter.source] = adapter
+
+
+def get_source(input_source_value: Optional[str]) -> Optional[DataSource]:
+    """DataSource named by the export's 'source' value, case-insensitively, or None if unknown."""
+    return DataSource.__members__.get((input_source_value or '').lower())
+
+
+def get_source_adapter(source: Optional[DataSource]) -> Optional[SourceAdapter]:
+    return SOURCE_ADAPTERS.get(source)
+
+
+register_source_adapter(TelegramAdapter())
+register_source_adapter(DiscordAdapter())
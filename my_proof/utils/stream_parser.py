@@ -0,0 +1,139 @@
+import json
+from typing import Any, Iterator, TextIO, Tuple
+
+CHUNK_SIZE = 1 << 16  # 64KB
+WHITESPACE = ' \t\n\r'
+
+
+class JsonStreamReader:
+    """
+    Minimal pull parser over a text stream.
+    Containers are walked key by key / item by item and only the value currently
+    being decoded is held in memory, so arbitrarily large arrays can be consumed
+    with a buffer bounded by the largest single item.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = 0) -> bool:
+        """Read more data into the buffer. Returns False at end of stream."""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.stream.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _skip_ws(self) -> None:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON stream")
+        return self.buffer[self.pos]
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{found}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self._skip_ws()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # value is cut off at the end of the buffer
+                if not self._fill(len(self.buffer)):
+                    raise
+                continue
+            # a number ending exactly at the buffer end may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}, found '{separator}'")
+
+    def elements(self) -> Iterator[None]:
+        """Iterate the elements of an array; the caller must consume each element."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield None
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}, found '{separator}'")
+
+
+def iter_chats(reader: JsonStreamReader) -> Iterator[Tuple[str, Any]]:
+    """
+    Walk a chats.json export and yield events in document order:
+        ('source', value), ('user', value), ('chat', None),
+        ('content', content dict), ('chat_end', chat_id)
+    Keys other than source/user/chats and chat keys other than chat_id/contents are skipped.
+    """
+    for key in reader.items():
+        if key == 'chats' and reader.peek() == '[':
+            for _ in reader.elements():
+                yield from _iter_chat(reader)
+        elif key in ('source', 'user'):
+            yield key, reader.value()
+        else:
+            reader.value()
+
+
+def _iter_chat(reader: JsonStreamReader) -> Iterator[Tuple[str, Any]]:
+    if reader.peek() != '{':
+        reader.value()
+        return
+    # chat_id may follow contents in the document, so it is only final at 'chat_end'
+    chat_id = None
+    yield 'chat', None
+    for key in reader.items():
+        if key == 'contents' and reader.peek() == '[':
+            for _ in reader.elements():
+                yield 'content', reader.value()
+        elif key == 'chat_id':
+            chat_id = reader.value()
+        else:
+            reader.value()
+    yield 'chat_end', chat_id
@@ -0,0 +1,136 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.profiling import profiled, profiler
+
+# NLTK stopword lists for the languages of the multilingual sentiment model that NLTK covers
+# (it has no Hindi list)
+SENTIMENT_MODEL_LANGUAGES = ('arabic', 'english', 'french', 'german', 'italian', 'portuguese', 'spanish')
+
+# characters the Treebank final-period rule lets follow the period at the end of a sentence
+CLOSING_CHARS = ']})>"\'»”’'
+# MacIntyre contractions NLTKWordTokenizer splits inside an alphanumeric word
+CONTRACTION_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+# distinct punctuated chunks memoized per preprocessor; the oldest are evicted past this, so a
+# long-running --serve process keeps a bounded cache however many submissions it tokenizes
+MAX_CACHED_CHUNKS = 200000
+
+
+class TextPreprocessor:
+    """
+    Keyword tokens of chat text: the alphanumeric, non-stopword tokens of nltk's
+    word_tokenize(text.lower()), as get_keywords_lda always used, computed faster.
+
+    Stopword sets are loaded once per language. Sentences are still split by Punkt (skipped
+    for text without sentence-ending punctuation), but NLTKWordTokenizer's two dozen regex
+    passes only run on whitespace-separated chunks that contain punctuation, one chunk at a
+    time with a stand-in neighbour word and memoized; plain alphanumeric chunks, the bulk
+    of chat text, are tokens already. Every Treebank rule only sees a chunk and the
+    whitespace characters next to it, except the final-period rule, which is why a
+    sentence's last chunks are tokenized together; the result equals word_tokenize.
+    """
+
+    def __init__(self, languages: Sequence[str] = ('english',), sentence_language: str = 'english',
+                 stop_words: Optional[Iterable[str]] = None, max_cached_chunks: int = MAX_CACHED_CHUNKS):
+        from nltk.tokenize import NLTKWordTokenizer, sent_tokenize
+
+        self.languages = tuple(languages)
+        if stop_words is None:
+            from nltk.corpus import stopwords
+
+            stop_words = (word for language in self.languages for word in stopwords.words(language))
+        self.stop_words = frozenset(stop_words)
+        self.sentence_language = sentence_language
+        self._sent_tokenize = sent_tokenize
+        self._word_tokenizer = NLTKWordTokenizer()
+        self.max_cached_chunks = max_cached_chunks
+        self._chunk_words: Dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+        self._chunk_words_lock = threading.Lock()
+        self.tokens = 0  # tokens produced so far, for throughput reports
+
+    def chunk_words(self, chunk: str, before: str, after: str) -> Tuple[str, ...]:
+        """
+        Keyword tokens of a chunk with punctuation, tokenized as it would be inside its sentence
+        between the whitespace characters before and after ('' at the sentence boundaries).
+        """
+        key = (chunk, before, after)
+        words = self._chunk_words.get(key)
+        if words is None:
+            # a stand-in neighbour word keeps anchored rules (^, $) from firing; the rules that
+            # look past the chunk only look at the adjacent character
+            tokens = self._word_tokenizer.tokenize(('a' + before if before else '') + chunk + (after + 'a' if after else ''))
+            tokens = tokens[(1 if before else 0):(-1 if after else len(tokens))]
+            words = tuple(token for token in tokens if token.isalnum() and token not in self.stop_words)
+            with self._chunk_words_lock:
+                # dicts keep insertion order, so the first keys are the oldest chunks
+                while self._chunk_words and len(self._chunk_words) >= self.max_cached_chunks:
+                    del self._chunk_words[next(iter(self._chunk_words))]
+                self._chunk_words[key] = words
+        return words
+
+    def sentences(self, text: str) -> Iterable[str]:
+        if '.' in text or '?' in text or '!' in text:
+            return self._sent_tokenize(text, self.sentence_language)
+        text = text.rstrip()  # as Punkt ends its last sentence
+        return (text,) if text else ()  # Punkt has nowhere to split
+
+    def tokenize(self, text: str) -> List[str]:
+        stop_words = self.stop_words
+        words = []
+        for sentence in self.sentences(text.lower()):
+            chunks = sentence.split()
+            # the final-period rule looks past trailing chunks of closing brackets/quotes, so the
+            # last other chunk is tokenized together with them
+            last = len(chunks) - 1
+            while last > 0 and not chunks[last].strip(CLOSING_CHARS):
+                last -= 1
+            position = 0  # end of the last chunk located in the sentence
+            for index, chunk in enumerate(chunks):
+                if chunk.isalnum():
+                    split = CONTRACTION_SPLITS.get(chunk)
+                    if split is None:
+                        if chunk not in stop_words:
+                            words.append(chunk)
+                    else:
+                        words.extend(word for word in split if word not in stop_words)
+                    continue
+                # an alphanumeric chunk cannot contain this one, so its first occurrence is it
+                start = sentence.find(chunk, position)
+                before = sentence[start - 1] if start else ''
+                if index == last:
+                    words.extend(self.chunk_words(sentence[start:], before, ''))
+                    break
+                position = start + len(chunk)
+                words.extend(self.chunk_words(chunk, before, sentence[position] if position < len(sentence) else ''))
+        self.tokens += len(words)
+        return words
+
+    @profiled('tokenize')
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """Tokens of every chat of a submission in one call, sharing the chunk cache."""
+        batch = [self.tokenize(text) for text in texts]
+        profiler.count('keyword_tokens', sum(len(words) for words in batch))
+        return batch
+
+
+_preprocessors: Dict[Tuple[str, ...], TextPreprocessor] = {}
+_preprocessors_lock = threading.Lock()
+
+
+def get_text_preprocessor(languages: Sequence[str] = ('english',)) -> TextPreprocessor:
+    """Process-wide preprocessor for a set of stopword languages, created on first use."""
+    key = tuple(languages)
+    preprocessor = _preprocessors.get(key)
+    if preprocessor is None:
+        with _preprocessors_lock:
+            preprocessor = _preprocessors.get(key)
+            if preprocessor is None:
+                preprocessor = _preprocessors[key] = TextPreprocessor(key)
+    return preprocessor
@@ -0,0 +1,119 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.hashing_utils import salted_data, salted_digest
+
+INDEX_FILENAME = 'uniqueness_index.sqlite'
+QUERY_CHUNK_SIZE = 500  # stays below SQLite's bound parameter limit
+# messages shorter than this, or with fewer distinct characters ("ok", "lol", "hahaha"),
+# are sent by everyone and say nothing about whether a chat was submitted before
+MIN_MESSAGE_CHARS = 16
+MIN_MESSAGE_DISTINCT_CHARS = 5
+
+
+def is_trivial_message(content: str, min_chars: int = MIN_MESSAGE_CHARS) -> bool:
+    normalized = ' '.join(content.lower().split())
+    return len(normalized) < min_chars or len(set(normalized)) < MIN_MESSAGE_DISTINCT_CHARS
+
+
+class UniquenessIndex:
+    """
+    Persistent record of previously submitted chats and messages.
+    Chats are keyed by salted (source_id, chat_id) hashes and messages by salted
+    content digests, both in SQLite B-tree primary keys, so lookups are O(log n)
+    and never load prior submissions into memory.
+    """
+
+    def __init__(self, path: str, salt: Optional[str], min_message_chars: int = MIN_MESSAGE_CHARS):
+        self.path = path
+        self.salt = salt
+        self.min_message_chars = min_message_chars
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS chats (
+                chat_key TEXT PRIMARY KEY,
+                chat_length INTEGER NOT NULL,
+                submissions INTEGER NOT NULL DEFAULT 1
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS messages (
+                message_hash BLOB PRIMARY KEY
+            ) WITHOUT ROWID;
+        """)
+
+    def chat_key(self, source_id: str, chat_id: Any) -> str:
+        return salted_data((source_id, chat_id), self.salt)
+
+    def message_hash(self, content: str) -> bytes:
+        return salted_digest(content, self.salt)
+
+    def message_hashes(self, contents: Iterable[str]) -> List[bytes]:
+        """Hashes of the messages that count towards message uniqueness; trivial ones are left out."""
+        return [
+            self.message_hash(content) for content in contents
+            if not is_trivial_message(content, self.min_message_chars)
+        ]
+
+    def get_chat_length(self, chat_key: str) -> Optional[int]:
+        """Length of the chat at its last submission, or None if never submitted."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT chat_length FROM chats WHERE chat_key = ?", (chat_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count_known_messages(self, message_hashes: List[bytes]) -> int:
+        """Number of distinct message_hashes already present in the index."""
+        unique_hashes = list(set(message_hashes))
+        known = 0
+        with self._lock:
+            for start in range(0, len(unique_hashes), QUERY_CHUNK_SIZE):
+                chunk = unique_hashes[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                known += self._connection.execute(
+                    f"SELECT COUNT(*) FROM messages WHERE message_hash IN ({placeholders})", chunk
+                ).fetchone()[0]
+        return known
+
+    def add_chat(self, chat_key: str, chat_length: int, message_hashes: Iterable[bytes]) -> None:
+        """Record a submitted chat and its messages."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO chats (chat_key, chat_length) VALUES (?, ?) "
+                "ON CONFLICT(chat_key) DO UPDATE SET chat_length = excluded.chat_length, "
+                "submissions = submissions + 1",
+                (chat_key, chat_length)
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO messages (message_hash) VALUES (?)",
+                ((message_hash,) for message_hash in message_hashes)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_indexes: Dict[str, UniquenessIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_uniqueness_index(config: Dict[str, Any]) -> Optional[UniquenessIndex]:
+    """
+    Open (once per process) the uniqueness index in the sealed directory.
+    Returns None when sealing is not available, in which case every chat scores as unique.
+    """
+    if not config.get('use_sealing'):
+        return None
+    path = os.path.join(config.get('sealed_dir', '/sealed'), INDEX_FILENAME)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            logging.info(f"Opening uniqueness index {path}")
+            index = UniquenessIndex(path, config.get('salt'), config.get('min_message_chars', MIN_MESSAGE_CHARS))
+            _indexes[path] = index
+    return index
@@ -1,19 +1,40 @@
+import contextlib
+import logging
+import time
 from models.cargo_data import CargoData, ChatData, SourceChatData, SourceData
 from models.proof_response import ProofResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 # Assuming the existence of these functions
-from utils.feature_extraction import get_sentiment_data, get_keywords_keybert, get_keywords_lda
+from utils.feature_extraction import KEYBERT_MODEL, LDA_WORDS_PER_TOPIC, SENTIMENT_MODEL, get_sentiment_totals_batch, get_keywords_keybert, get_keywords_lda_batch, get_keywords_tfidf_batch
+from utils.uniqueness_index import UniquenessIndex, get_uniqueness_index
+from utils.bloom_filter import ScalableBloomFilter, get_message_filter, save_message_filter
+from utils.near_duplicates import chat_shingles, empty_signatures, minhash_signatures, get_near_duplicate_index
+from utils.parallel_scoring import map_chat_keywords, parent_torch_threads
+from utils.quality_scoring import score_quality
+from utils.chat_result_cache import ChatAnalysis, get_chat_result_cache
+from utils.profiling import profiled, profiler
+from utils.chat_sampling import SamplingPolicy, analysis_input
+from utils.analysis_budget import ANALYSIS_CHEAP, ANALYSIS_FULL, ANALYSIS_PARTIAL, AnalysisBudget, analysis_priority
 
 def get_user_submited_chat_data(
         config: Dict[str, Any],
         cargo_data: CargoData
     ) -> List[ChatData]:
+    """Previous submissions of this submission's chats, looked up in the sealed uniqueness index."""
+    index = get_uniqueness_index(config)
+    if index is None:
+        return []
 
-    # Fetch old data from IPFS...
-    # Patrick: Need to found out from Vana Team...
-
-    return []
+    previous_chat_list = []
+    for source_chat in cargo_data.source_data.source_chats:
+        chat_key = index.chat_key(cargo_data.source_id, source_chat.chat_id)
+        chat_length = index.get_chat_length(chat_key)
+        if chat_length is not None:
+            previous_chat_list.append(
+                ChatData(chat_id=source_chat.chat_id, chat_length=chat_length)
+            )
+    return previous_chat_list
 
 def score_uniqueness(previous_chat_list: List[ChatData], chat_id: int, content_length: int) -> float:
     if content_length == 0 :
@@ -35,11 +56,136 @@ def score_uniqueness(previous_chat_list: List[ChatData], chat_id: int, content_l
 
     return 1
 
+def score_near_duplicate_uniqueness(similarity: float, content_length: int) -> float:
+    """One minus the estimated Jaccard similarity to the closest previously submitted chat."""
+    if content_length == 0:
+        return 0
+    return 1 - float(similarity)
+
+def score_message_uniqueness(
+    index: UniquenessIndex,
+    message_filter: ScalableBloomFilter,
+    message_hashes: List[bytes]
+) -> float:
+    """
+    Fraction of distinct messages in a chat that were never submitted before.
+    The Bloom filter screens every message; only its hits are confirmed in the index,
+    which removes false positives without a database lookup per message.
+    """
+    if not message_hashes:
+        return 1  # only trivial messages, nothing to compare; empty chats score 0 by length
+    unique_hashes = set(message_hashes)
+    filter_hits = [message_hash for message_hash in unique_hashes if message_hash in message_filter]
+    known = index.count_known_messages(filter_hits) if filter_hits else 0
+    return 1 - known / len(unique_hashes)
+
+def record_submitted_chats(
+    index: UniquenessIndex,
+    cargo_data: CargoData,
+    chat_lengths: Dict[int, int],
+    chat_message_hashes: Dict[int, List[bytes]],
+    message_filter: ScalableBloomFilter
+) -> None:
+    """Add this submission's chats to the index so later submissions are scored against them."""
+    for chat_id, chat_length in chat_lengths.items():
+        message_hashes = chat_message_hashes.get(chat_id, [])
+        index.add_chat(
+            index.chat_key(cargo_data.source_id, chat_id),
+            chat_length,
+            message_hashes
+        )
+        message_filter.update(message_hashes)
+
+def analysis_cache_variant(config: Dict[str, Any], sampling: SamplingPolicy) -> str:
+    """Everything besides the messages that a cached chat analysis depends on; part of its cache key."""
+    variant = '|'.join([
+        config.get('keyword_engine', 'lda'),
+        config.get('inference_backend', 'torch'),
+        SENTIMENT_MODEL,
+        KEYBERT_MODEL
+    ])
+    stopwords = config.get('stopword_languages', ['english'])
+    if list(stopwords) != ['english']:
+        variant += f"|stopwords:{','.join(stopwords)}"
+    if sampling.enabled:
+        variant += f"|sample:{sampling.strategy}:{sampling.max_chars}:{sampling.seed}"
+    return variant
+
+def analyze_chats(
+    config: Dict[str, Any],
+    chats: List[Tuple[str, List[str]]],
+    number_of_keywords: int,
+    use_lda: bool,
+    sentiment_token_budget: int,
+    keywords_tfidf: Optional[List[Dict[str, float]]] = None
+) -> List[ChatAnalysis]:
+    """
+    Sentiment and keywords of (text, messages) chats, the expensive part of validate_data.
+    keywords_tfidf are the chats' rows of a TF-IDF fitted over more chats than these; without
+    them and without use_lda, TF-IDF is fitted over these chats.
+    """
+    if not chats:
+        return []
+    texts = [text for text, _ in chats]
+
+    chat_keywords = None
+    if config.get('workers', 1) > 1 and len(chats) > 1:
+        # keyword extraction runs in the worker pool while sentiment runs here
+        chat_keywords = map_chat_keywords(
+            config,
+            texts,
+            number_of_keywords,
+            use_lda
+        )
+    chat_keywords_tfidf = keywords_tfidf
+    if chat_keywords_tfidf is None and not use_lda:
+        chat_keywords_tfidf = get_keywords_tfidf_batch(
+            texts,
+            number_of_keywords
+        )
+    # all chats are tokenized in one call
+    chat_keywords_lda_batch = get_keywords_lda_batch(
+        texts,
+        number_of_keywords
+    ) if use_lda and chat_keywords is None else None
+
+    # sentiment for all chats in shared batches, on the cores the keyword workers leave free
+    with parent_torch_threads(config) if chat_keywords is not None else contextlib.nullcontext():
+        chat_sentiment_totals = get_sentiment_totals_batch(
+            [messages for _, messages in chats],
+            sentiment_token_budget
+        )
+
+    analyses = []
+    for chat_index, ((text, messages), (sentiment_scores, sentiment_tokens)) in enumerate(
+            zip(chats, chat_sentiment_totals)):
+        if chat_keywords is not None:
+            chat_keywords_keybert, chat_keywords_lda = next(chat_keywords)
+        else:
+            chat_keywords_keybert = get_keywords_keybert(
+                text,
+                number_of_keywords
+            )
+            chat_keywords_lda = chat_keywords_lda_batch[chat_index] if use_lda else None
+        if chat_keywords_tfidf is not None:
+            chat_keywords_lda = chat_keywords_tfidf[chat_index]
+        analyses.append(ChatAnalysis(
+            message_count=len(messages),
+            text_length=len(text),
+            sentiment_scores=sentiment_scores,
+            sentiment_tokens=sentiment_tokens,
+            keywords_keybert=chat_keywords_keybert,
+            keywords_lda=chat_keywords_lda
+        ))
+    return analyses
+
+@profiled()
 def validate_data(
     config: Dict[str, Any],
     cargo_data : CargoData,
     proof_data : ProofResponse
 ) :
+    validate_start = time.perf_counter()  # the analysis time budget counts from here
     source_data = cargo_data.source_data
     source_chats = source_data.source_chats
 
@@ -50,66 +196,206 @@ def validate_data(
     total_quality = 0.00
     chat_count = 0
 
-    previous_chat_list = get_user_submited_chat_data(
-        config,
-        cargo_data
-    )
+    index = get_uniqueness_index(config)
+    message_filter = get_message_filter(config)
+    near_duplicate_index = get_near_duplicate_index(config)
+    previous_chats: Dict[int, List[ChatData]] = {}
+    chat_signatures = None
+    chat_similarities = None
+    chats_without_shingles = None
+    if near_duplicate_index is not None:
+        # MinHash all chats in one vectorized pass, then look them up in the LSH table
+        with profiler.stage('near_duplicates'):
+            chat_signatures = minhash_signatures(
+                [chat_shingles(source_chat.contents) for source_chat in source_chats]
+            )
+            chat_similarities = near_duplicate_index.max_similarities(chat_signatures)
+            chats_without_shingles = empty_signatures(chat_signatures)
+    # MinHash similarity replaces the length comparison with the chat's previous submission,
+    # except for chats without words (emoji, stickers), which have no signature to compare
+    if chats_without_shingles is None or chats_without_shingles.any():
+        previous_chat_list = get_user_submited_chat_data(
+            config,
+            cargo_data
+        )
+        for chat_data in previous_chat_list:
+            previous_chats.setdefault(chat_data.chat_id, []).append(chat_data)
+    chat_lengths: Dict[int, int] = {}
+    chat_message_hashes: Dict[int, List[bytes]] = {}
+    sentiment_token_budget = config.get('sentiment_token_budget', 8192)
+
+    # 'lda' trains one model per chat, 'tfidf' shares one vocabulary across the submission
+    keyword_engine = config.get('keyword_engine', 'lda')
+    use_lda = keyword_engine == 'lda'
+    # the most keywords_lda a fresh extraction returns: words of number_of_keywords LDA topics, or TF-IDF's top words
+    number_of_lda_keywords = number_of_keywords * LDA_WORDS_PER_TOPIC if use_lda else number_of_keywords
+    # oversized chats are analyzed from a sample of their messages
+    sampling = SamplingPolicy.from_config(config)
+    # chats analyzed in an earlier submission reuse that analysis; only messages appended since are analyzed
+    result_cache = get_chat_result_cache(config)
+    cache_variant = analysis_cache_variant(config, sampling)
+
+    scored_chats = []
+    cache_keys = []  # per scored chat, None without the result cache
+    cached_analyses = []  # per scored chat, the cached analysis of a prefix of its messages
+    # quality components of all chats in one vectorized pass
+    chat_quality = score_quality(source_chats)
     # Loop through the chat_data_list
-    for source_chat in source_chats:
+    for chat_index, source_chat in enumerate(source_chats):
 
         #print(f"source_chat:{source_chat}")
         chat_count += 1  # Increment chat count
-        source_contents = None
-        contents_length = 0
-        if source_chat.contents:  # Ensure chat_contents is not None
-            source_contents = source_chat.content_as_text()
-            print(f"source_contents: {source_contents}")
-            contents_length = len(source_contents)
+        # the chat's text is only materialized if it is analyzed whole, see utils.chat_sampling
+        contents_length = source_chat.text_length()
+        if source_chat.contents and logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("source_contents: %s", source_chat.content_as_text())
 
         chat_id = source_chat.chat_id
-        uniqueness = score_uniqueness(
-            previous_chat_list,
-            chat_id,
-            contents_length
-        )
-        print(f"Chat({chat_id}) - uniqueness: {uniqueness}")
+        if chat_similarities is not None and not chats_without_shingles[chat_index]:
+            uniqueness = score_near_duplicate_uniqueness(
+                chat_similarities[chat_index],
+                contents_length
+            )
+        else:
+            uniqueness = score_uniqueness(
+                previous_chats.get(chat_id, []),
+                chat_id,
+                contents_length
+            )
+        if index is not None:
+            chat_lengths[chat_id] = contents_length
+            message_hashes = index.message_hashes(source_chat.contents)
+            chat_message_hashes[chat_id] = message_hashes
+            uniqueness = min(uniqueness, score_message_uniqueness(index, message_filter, message_hashes))
+        logging.debug(f"Chat({chat_id}) - uniqueness: {uniqueness}")
         total_uniqueness += uniqueness
 
-        quality = source_chat.quality_score()
-        print(f"Chat({chat_id}) - quality: {quality}")
+        quality = chat_quality[chat_index]
+        logging.debug(f"Chat({chat_id}) - quality: {quality}")
         total_quality += quality
 
+        # the cache is consulted before the uniqueness gate: a resubmitted chat scores low on
+        # uniqueness, but its cached analysis only needs the messages appended since
+        cache_key = None
+        cached = None
+        if result_cache is not None and source_chat.contents:
+            cache_key = result_cache.chat_key(cargo_data.source_id, chat_id, cache_variant)
+            cached = result_cache.lookup(cache_key, source_chat)
+
         # if chat data has meaningful data...
-        if uniqueness > score_threshold:
-            # content is unique...
-            chat_sentiment = get_sentiment_data(
-                source_contents
-            )
-            chat_keywords_keybert = get_keywords_keybert(
-                source_contents,
-                number_of_keywords
-            )
-            chat_keywords_lda = get_keywords_lda(
-                source_contents,
-                number_of_keywords
-            )
+        if uniqueness > score_threshold or cached is not None:
+            # content is unique, or was analyzed when it was
+            scored_chats.append((source_chat, contents_length, quality, uniqueness))
+            cache_keys.append(cache_key)
+            cached_analyses.append(cached)
 
-            # Create a ChatData instance and add it to the list
+    analysis_chats = []  # (position in scored_chats, text, messages, sampled) still to analyze
+    for position, (source_chat, *_) in enumerate(scored_chats):
+        cached = cached_analyses[position]
+        start = cached.message_count if cached is not None else 0
+        if start < len(source_chat.contents):
+            analysis_chats.append((position, *analysis_input(source_chat, start, sampling)))
+    profiler.count('chats', len(source_chats))
+    profiler.count('chats_scored', len(scored_chats))
+
+    # the most valuable chats are analyzed first, the rest are summarized cheaply once the budget runs out
+    budget = AnalysisBudget(
+        config.get('analysis_budget_seconds', 0),
+        config.get('analysis_budget_chars', 0),
+        validate_start
+    )
+    priorities = []
+    for position, *_ in analysis_chats:
+        _, contents_length, quality, uniqueness = scored_chats[position]
+        priorities.append(analysis_priority(quality, uniqueness, contents_length))
+    costs = [len(text) for _, text, _, _ in analysis_chats]
+    chat_keywords_tfidf: Dict[int, Dict[str, float]] = {}
+    if not use_lda and analysis_chats:
+        # one TF-IDF vocabulary over every chat the budget may analyze, rather than one per tier
+        selected = budget.select(priorities, costs)
+        chat_keywords_tfidf = dict(zip(selected, get_keywords_tfidf_batch(
+            [analysis_chats[i][1] for i in selected],
+            number_of_keywords
+        )))
+    new_analyses: Dict[int, ChatAnalysis] = {}
+    for tier in budget.tiers(priorities, costs):
+        tier_chats = [analysis_chats[i] for i in tier]
+        tier_analyses = analyze_chats(
+            config,
+            [(text, messages) for _, text, messages, _ in tier_chats],
+            number_of_keywords,
+            use_lda,
+            sentiment_token_budget,
+            [chat_keywords_tfidf[i] for i in tier] if not use_lda else None
+        )
+        for (position, _, _, sampled), analysis in zip(tier_chats, tier_analyses):
+            if sampled:
+                # the analysis stands for all messages after the cached ones, not just the sample
+                source_chat = scored_chats[position][0]
+                start = cached_analyses[position].message_count if cached_analyses[position] is not None else 0
+                analysis.analyzed_messages = analysis.message_count
+                analysis.message_count = len(source_chat.contents) - start
+                analysis.text_length = source_chat.text_length(start)
+            new_analyses[position] = analysis
+    profiler.count('chats_analyzed', budget.analyzed)
+    profiler.count('chats_over_budget', budget.skipped)
+    if budget.skipped:
+        logging.info(f"Analysis budget: {budget.stats()}")
+
+    cache_entries = []
+    for position, (source_chat, contents_length, *_) in enumerate(scored_chats):
+        analysis = cached_analyses[position]
+        if analysis is None:
+            analysis = new_analyses.get(position)
+        elif position in new_analyses:
+            analysis = analysis.merge(new_analyses[position], number_of_keywords, number_of_lda_keywords)
+
+        if analysis is None:
+            # over the analysis budget: length, quality and uniqueness still count
             chat_data = ChatData(
                 chat_id=source_chat.chat_id,
                 chat_length=contents_length,
-                sentiment=chat_sentiment,
-                keywords_keybert=chat_keywords_keybert,
-                keywords_lda=chat_keywords_lda
+                analysis_tier=ANALYSIS_CHEAP
             )
-            #print(f"chat_data: {chat_data}")
-            cargo_data.chat_list.append(
-                chat_data
+        else:
+            if cache_keys[position] is not None:
+                cache_entries.append((cache_keys[position], source_chat, analysis))
+            # Create a ChatData instance and add it to the list
+            chat_data = ChatData(
+                chat_id=source_chat.chat_id,
+                chat_length=contents_length,
+                sentiment=analysis.sentiment(),
+                keywords_keybert=analysis.keywords_keybert,
+                keywords_lda=analysis.keywords_lda,
+                analysis_tier=ANALYSIS_FULL if analysis.message_count == len(source_chat.contents) else ANALYSIS_PARTIAL,
+                sampling={
+                    'analyzed_messages': analysis.analyzed_messages,
+                    'messages': analysis.message_count
+                } if analysis.analyzed_messages is not None else None
             )
+        #print(f"chat_data: {chat_data}")
+        cargo_data.chat_list.append(
+            chat_data
+        )
+    if result_cache is not None:
+        with profiler.stage('result_cache_store'):
+            result_cache.store(cache_entries)
+        logging.info(f"Chat result cache: {result_cache.stats()}")
+
+    if index is not None:
+        with profiler.stage('uniqueness_index_update'):
+            record_submitted_chats(index, cargo_data, chat_lengths, chat_message_hashes, message_filter)
+            save_message_filter(config, message_filter)
+            if chat_signatures is not None:
+                submitted = [i for i, source_chat in enumerate(source_chats) if source_chat.contents]
+                near_duplicate_index.add_many(
+                    [index.chat_key(cargo_data.source_id, source_chats[i].chat_id) for i in submitted],
+                    chat_signatures[submitted]
+                )
 
     # Calculate uniqueness if there are chats
     if chat_count > 0:
         proof_data.uniqueness = round(total_uniqueness / chat_count, 2)
-        print(f"proof_data.uniqueness: {proof_data.uniqueness}")
+        logging.info(f"proof_data.uniqueness: {proof_data.uniqueness}")
         proof_data.quality = round(total_quality / chat_count, 2)
-        print(f"proof_data.quality: {proof_data.quality}")
+        logging.info(f"proof_data.quality: {proof_data.quality}")
@@ -0,0 +1,83 @@
+"""
+Download the proof models into a local model directory and export ONNX graphs for INFERENCE_BACKEND=onnx.
+
+    python scripts/export_models.py /models --quantize
+    MODEL_DIR=/models INFERENCE_BACKEND=onnx python my_proof/__main__.py
+
+Each model ends up in <output dir>/<model name>, which is where the model registry looks for it.
+With --quantize, an int8 graph (onnx/model_quantized.onnx) is written next to the fp32 one and
+is preferred by the onnx backend.
+"""
+import argparse
+import os
+import sys
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
+
+from utils.feature_extraction import KEYBERT_MODEL, SENTIMENT_MODEL
+from utils.inference_backends import ONNX_FILE, QUANTIZED_ONNX_FILE
+
+
+def export_sentiment_model(output_dir: str, quantize: bool) -> None:
+    model_path = os.path.join(output_dir, SENTIMENT_MODEL)
+    tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+    model = AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL).eval()
+    # keep the torch weights too, so the torch/quantized backends can use the same directory
+    tokenizer.save_pretrained(model_path)
+    model.save_pretrained(model_path)
+
+    onnx_path = os.path.join(model_path, ONNX_FILE)
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    torch.onnx.export(
+        model,
+        (sample['input_ids'], sample['attention_mask']),
+        onnx_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'},
+        },
+        opset_version=14
+    )
+    print(f"Exported {onnx_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(model_path, QUANTIZED_ONNX_FILE)
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"Exported {quantized_path}")
+
+
+def export_keybert_model(output_dir: str, quantize: bool) -> None:
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_path = os.path.join(output_dir, KEYBERT_MODEL)
+    # the onnx backend exports the graph on load when the model has none
+    model = SentenceTransformer(KEYBERT_MODEL, backend='onnx')
+    model.save(model_path)
+    print(f"Exported {os.path.join(model_path, ONNX_FILE)}")
+
+    if quantize:
+        export_dynamic_quantized_onnx_model(model, 'avx2', model_path, file_suffix='quantized')
+        print(f"Exported {os.path.join(model_path, QUANTIZED_ONNX_FILE)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output_dir')
+    parser.add_argument('--quantize', action='store_true', help='also write dynamically int8-quantized graphs')
+    args = parser.parse_args()
+
+    export_sentiment_model(args.output_dir, args.quantize)
+    export_keybert_model(args.output_dir, args.quantize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the proof runs as a script from my_proof/, so its modules import as `utils.…` and `models.…`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'my_proof'))
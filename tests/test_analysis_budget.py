@@ -0,0 +1,162 @@
+import pytest
+
+import utils.analysis_budget as analysis_budget
+import utils.validate_data as validate
+from models.cargo_data import CargoData
+from models.proof_response import ProofResponse
+from proof import get_source_data
+from utils.analysis_budget import TIER_CHATS, AnalysisBudget, analysis_priority
+from utils.chat_result_cache import ChatAnalysis
+
+MESSAGES = [
+    "are we still meeting at the station tomorrow morning",
+    "yes and please bring the printed tickets with you",
+    "the train leaves at nine so we should be there early",
+    "I will grab coffee for both of us on the way over",
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(analysis_budget.time, 'perf_counter', clock)
+    return clock
+
+
+def test_priority_prefers_quality_uniqueness_and_length():
+    assert analysis_priority(1.0, 1.0, 100) > analysis_priority(0.5, 1.0, 100)
+    assert analysis_priority(1.0, 1.0, 100) > analysis_priority(1.0, 0.5, 100)
+    assert analysis_priority(1.0, 1.0, 1000) > analysis_priority(1.0, 1.0, 100)
+    # sublinear in length: ten times the text is not ten times the value
+    assert analysis_priority(1.0, 1.0, 1000) < 10 * analysis_priority(1.0, 1.0, 100)
+
+
+def test_unlimited_budget_analyzes_everything_in_one_tier():
+    budget = AnalysisBudget()
+    assert list(budget.tiers([0.1, 0.9, 0.5], [10, 10, 10])) == [[0, 1, 2]]
+    assert budget.stats() == {'analyzed': 3, 'skipped': 0}
+
+
+def test_char_cap_takes_chats_by_priority_while_they_fit():
+    budget = AnalysisBudget(max_chars=100)
+    priorities = [0.1, 0.9, 0.5, 0.7]
+    costs = [10, 50, 50, 40]
+
+    assert budget.select(priorities, costs) == [1, 3, 0]  # 2 does not fit after 1 and 3, 0 still does
+    assert list(budget.tiers(priorities, costs)) == [[0, 1, 3]]
+    assert budget.stats() == {'analyzed': 3, 'skipped': 1}
+
+
+def test_time_budget_already_spent_analyzes_nothing(clock):
+    budget = AnalysisBudget(max_seconds=1, start=clock.now - 2)
+    assert list(budget.tiers([1.0] * 3, [10] * 3)) == []
+    assert budget.stats() == {'analyzed': 0, 'skipped': 3}
+
+
+def test_time_budget_stops_before_a_tier_estimated_to_overrun(clock):
+    budget = AnalysisBudget(max_seconds=10)
+    chats = 3 * TIER_CHATS
+    tiers = []
+    for tier in budget.tiers(list(range(chats)), [1] * chats):
+        tiers.append(tier)
+        clock.now += 4  # each tier takes 4s: 0 + 4 and 4 + 4 fit in 10s, 8 + 4 does not
+    assert [len(tier) for tier in tiers] == [TIER_CHATS, TIER_CHATS]
+    # highest priority first
+    assert tiers[0] == list(range(chats - 1, chats - 1 - TIER_CHATS, -1))
+    assert budget.stats() == {'analyzed': 2 * TIER_CHATS, 'skipped': TIER_CHATS}
+
+
+def telegram_export(chats):
+    return {
+        'source': 'telegram',
+        'user': 'user-a',
+        'chats': [{
+            'chat_id': chat_id,
+            'contents': [
+                {
+                    '@type': 'message',
+                    'id': i,
+                    'sender_id': {'@type': 'messageSenderUser', 'user_id': 7},
+                    'chat_id': chat_id,
+                    'date': 1767225600 + 60 * i,
+                    'content': {'@type': 'messageText', 'text': {'@type': 'formattedText', 'text': text}}
+                }
+                for i, text in enumerate(messages)
+            ]
+        } for chat_id, messages in chats.items()]
+    }
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """The (texts, keywords_tfidf) of each analyze_chats call."""
+    calls = []
+
+    def analyze_chats(config, chats, number_of_keywords, use_lda, sentiment_token_budget, keywords_tfidf=None):
+        calls.append(([text for text, _ in chats], keywords_tfidf))
+        return [
+            ChatAnalysis(
+                message_count=len(messages),
+                text_length=len(text),
+                sentiment_scores={'positive': 1.0},
+                sentiment_tokens=1,
+                keywords_keybert={'tickets': 1.0},
+                keywords_lda={'train': 1.0}
+            )
+            for text, messages in chats
+        ]
+    monkeypatch.setattr(validate, 'analyze_chats', analyze_chats)
+    return calls
+
+
+def submit(config, chats):
+    cargo_data = CargoData(source_data=get_source_data(telegram_export(chats)), source_id='user-a')
+    validate.validate_data(config, cargo_data, ProofResponse(dlp_id=1))
+    return {chat_data.chat_id: chat_data for chat_data in cargo_data.chat_list}
+
+
+def test_chats_over_the_char_budget_are_cheap(tmp_path, analyzed):
+    config = {'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt', 'analysis_budget_chars': 250}
+    chat_list = submit(config, {1: MESSAGES, 2: MESSAGES[:1] * 10})
+
+    assert len(analyzed) == 1
+    assert chat_list[1].analysis_tier == 'full'
+    assert chat_list[2].analysis_tier == 'cheap'
+    assert chat_list[2].sentiment == {} and chat_list[2].keywords_keybert == {}
+
+
+def test_cached_chat_whose_new_messages_are_over_budget_is_partial(tmp_path, analyzed):
+    config = {'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt'}
+    submit(config, {1: MESSAGES[:3]})
+
+    chat_list = submit(dict(config, analysis_budget_chars=1), {1: MESSAGES})
+    assert len(analyzed) == 1
+    assert chat_list[1].analysis_tier == 'partial'
+    assert chat_list[1].keywords_keybert == {'tickets': 1.0}
+
+
+def test_tfidf_is_fitted_once_across_tiers(tmp_path, analyzed, monkeypatch):
+    fitted = []
+
+    def get_keywords_tfidf_batch(texts, num_words):
+        fitted.append(texts)
+        return [{text: 1.0} for text in texts]
+    monkeypatch.setattr(validate, 'get_keywords_tfidf_batch', get_keywords_tfidf_batch)
+    chats = {chat_id: [f"{MESSAGES[chat_id % 4]} chat{chat_id}"] for chat_id in range(1, TIER_CHATS + 5)}
+    config = {'keyword_engine': 'tfidf', 'analysis_budget_seconds': 3600}
+    chat_list = submit(config, chats)
+
+    assert len(fitted) == 1 and len(fitted[0]) == len(chats)
+    assert [len(texts) for texts, _ in analyzed] == [TIER_CHATS, 4]
+    # each tier gets its chats' rows of the shared fit
+    for texts, keywords_tfidf in analyzed:
+        assert keywords_tfidf == [{text: 1.0} for text in texts]
+    assert all(chat_data.analysis_tier == 'full' for chat_data in chat_list.values())
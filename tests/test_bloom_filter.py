@@ -0,0 +1,134 @@
+import os
+import struct
+
+import pytest
+
+from utils.bloom_filter import HEADER, STAGE_HEADER, VERSION, BloomFilter, ScalableBloomFilter
+from utils.hashing_utils import deserialize_bloom_filter_base64, salted_digest, serialize_bloom_filter_base64
+
+
+def digests(prefix, count):
+    return [salted_digest(f"{prefix}|{i}", 'salt') for i in range(count)]
+
+
+def filled(items, initial_capacity=100, error_rate=0.001):
+    bloom = ScalableBloomFilter(initial_capacity=initial_capacity, error_rate=error_rate)
+    bloom.update(items)
+    return bloom
+
+
+def test_round_trip_keeps_parameters_and_items():
+    items = digests('a', 500)
+    bloom = filled(items)
+
+    restored = deserialize_bloom_filter_base64(serialize_bloom_filter_base64(bloom))
+
+    assert (restored.initial_capacity, restored.error_rate, restored.growth, restored.ratio) == \
+        (bloom.initial_capacity, bloom.error_rate, bloom.growth, bloom.ratio)
+    assert [bytes(stage.bits) for stage in restored.stages] == [bytes(stage.bits) for stage in bloom.stages]
+    assert len(restored) == len(bloom)
+    assert all(item in restored for item in items)
+    assert restored.tobytes() == bloom.tobytes()
+
+
+def test_rejects_other_data():
+    data = bytearray(filled(digests('a', 10)).tobytes())
+    data[:4] = b'XXXX'
+    with pytest.raises(ValueError, match="Not a serialized"):
+        ScalableBloomFilter.frombytes(bytes(data))
+
+
+def test_rejects_unknown_version():
+    data = bytearray(filled(digests('a', 10)).tobytes())
+    struct.pack_into('<H', data, 4, VERSION + 1)
+    with pytest.raises(ValueError, match="version"):
+        ScalableBloomFilter.frombytes(bytes(data))
+
+
+@pytest.mark.parametrize('cut', ['header', 'stage_header', 'bits'])
+def test_rejects_truncated_data(cut):
+    data = filled(digests('a', 10)).tobytes()
+    end = {
+        'header': HEADER.size - 1,
+        'stage_header': HEADER.size + STAGE_HEADER.size - 1,
+        'bits': len(data) - 1,
+    }[cut]
+    with pytest.raises(ValueError, match="truncated"):
+        ScalableBloomFilter.frombytes(data[:end])
+
+
+def test_rejects_stage_header_not_matching_its_parameters():
+    data = bytearray(filled(digests('a', 10)).tobytes())
+    num_bits, capacity, count, num_hashes, error_rate = STAGE_HEADER.unpack_from(data, HEADER.size)
+    STAGE_HEADER.pack_into(data, HEADER.size, num_bits, capacity, count, num_hashes + 1, error_rate)
+    with pytest.raises(ValueError, match="does not match"):
+        ScalableBloomFilter.frombytes(bytes(data))
+
+
+def test_loaded_filter_is_copied_on_write(tmp_path):
+    path = str(tmp_path / 'bloom.bin')
+    items = digests('a', 50)
+    filled(items).save(path)
+    with open(path, 'rb') as f:
+        saved = f.read()
+
+    bloom = ScalableBloomFilter.load(path)
+    assert all(item in bloom for item in items)
+    assert isinstance(bloom.stages[0].bits, memoryview)
+
+    new_items = digests('b', 20)
+    bloom.update(new_items)
+    assert isinstance(bloom.stages[0].bits, bytearray)
+    assert all(item in bloom for item in items + new_items)
+    with open(path, 'rb') as f:
+        assert f.read() == saved  # the mapped file is untouched until saved
+
+    bloom.save(path)
+    assert all(item in ScalableBloomFilter.load(path) for item in items + new_items)
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_adds_stages_with_growing_capacity_and_tighter_error_rates():
+    items = digests('a', 1000)
+    bloom = filled(items, initial_capacity=100)
+
+    capacities = [stage.capacity for stage in bloom.stages]
+    error_rates = [stage.error_rate for stage in bloom.stages]
+    assert capacities == [100 * 2 ** i for i in range(len(bloom.stages))]
+    assert len(bloom.stages) >= 3
+    assert error_rates == sorted(error_rates, reverse=True)
+    assert sum(error_rates) <= bloom.error_rate
+    assert all(stage.count <= stage.capacity for stage in bloom.stages)
+    assert all(item in bloom for item in items)
+    assert bloom.add(items[0]) is True
+
+
+def test_union_contains_both_filters():
+    a_items, b_items = digests('a', 300), digests('b', 150)
+    a, b = filled(a_items), filled(b_items)
+
+    merged = a.union(b)
+
+    assert len(merged.stages) == max(len(a.stages), len(b.stages))
+    assert all(item in merged for item in a_items + b_items)
+    first = merged.stages[0]
+    assert bytes(first.bits) == bytes(x | y for x, y in zip(a.stages[0].bits, b.stages[0].bits))
+    # the item count of merged stages is estimated from the fill ratio
+    assert first.count == pytest.approx(a.stages[0].count + b.stages[0].count, rel=0.1)
+
+
+def test_union_estimates_count_of_identical_filters():
+    stage = BloomFilter(1000, 0.01)
+    for item in digests('a', 500):
+        stage.add(item)
+
+    merged = stage.union(stage)
+
+    assert merged.count == pytest.approx(500, rel=0.05)
+
+
+def test_union_rejects_different_parameters():
+    with pytest.raises(ValueError):
+        filled(digests('a', 10), initial_capacity=100).union(filled(digests('b', 10), initial_capacity=200))
+    with pytest.raises(ValueError):
+        BloomFilter(100, 0.01).union(BloomFilter(200, 0.01))
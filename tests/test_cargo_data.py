@@ -0,0 +1,83 @@
+import pytest
+
+from models.cargo_data import ChatData, SourceChatData
+
+BATCHES = [
+    (["hello there", "", "how are you?"], [30, 20, 10]),
+    (["café ☕", "", "日本語のメッセージ", "emoji 😀 ok"], [9, 8, 7, 6]),
+    (["", ""], [5, 4]),
+    ([], []),
+    (["plain ascii again", "x"], [3, 0]),
+]
+
+
+def one_by_one(chat_id=1):
+    chat = SourceChatData(chat_id=chat_id)
+    for contents, minutes in BATCHES:
+        for content, minute in zip(contents, minutes):
+            chat.add_content(content, minute)
+    return chat
+
+
+def state(chat):
+    return (
+        bytes(chat.buffer), list(chat.content_ends), list(chat.content_lengths), list(chat.content_minutes),
+        chat.total_content_length, chat.total_content_value, list(chat.contents), chat.content_as_text(),
+        chat.text_length(), chat.text_length(2)
+    )
+
+
+def test_add_contents_matches_add_content():
+    chat = SourceChatData(chat_id=1)
+    # successive batches also append to a chat that already has messages
+    for contents, minutes in BATCHES:
+        chat.add_contents(contents, minutes)
+
+    assert state(chat) == state(one_by_one())
+    assert chat.content_as_text() == "\r".join(content for contents, _ in BATCHES for content in contents if content)
+
+
+def test_add_contents_after_add_content():
+    chat = SourceChatData(chat_id=1)
+    chat.add_content("first", 60)
+    chat.add_contents(["ünïcode", "", "last"], [2, 1, 0])
+
+    expected = SourceChatData(chat_id=1)
+    for content, minute in [("first", 60), ("ünïcode", 2), ("", 1), ("last", 0)]:
+        expected.add_content(content, minute)
+    assert state(chat) == state(expected)
+
+
+def test_contents_indexing_is_bounds_checked():
+    chat = one_by_one()
+    contents = list(chat.contents)
+    count = len(contents)
+
+    assert chat.contents[-1] == contents[-1]
+    assert chat.contents[-count] == contents[0]
+    assert chat.contents[1:3] == contents[1:3]
+    for index in (count, -count - 1):
+        with pytest.raises(IndexError):
+            chat.contents[index]
+        with pytest.raises(IndexError):
+            chat.content_bytes(index)
+    with pytest.raises(IndexError):
+        SourceChatData(chat_id=2).contents[0]
+
+
+def test_participants_keep_insertion_order():
+    chat = SourceChatData(chat_id=1)
+    for participant in ["zoe", "adam", "", "mia", "adam", "bob"]:
+        chat.add_participant(participant)
+
+    assert chat.participants == ["zoe", "adam", "mia", "bob"]
+
+
+def test_chat_data_reports_tier_and_sampling_only_when_set():
+    assert set(ChatData(chat_id=1, chat_length=10).to_dict()) == {
+        'chat_id', 'chat_length', 'sentiment', 'keywords_keybert', 'keywords_lda'
+    }
+    assert ChatData(chat_id=1, chat_length=10, analysis_tier='cheap').to_dict()['analysis_tier'] == 'cheap'
+    sampled = ChatData(chat_id=1, chat_length=10, sampling={'analyzed_messages': 2, 'messages': 5}).to_dict()
+    assert sampled['sampling'] == {'analyzed_messages': 2, 'messages': 5}
+    assert 'analysis_tier' not in sampled
@@ -0,0 +1,138 @@
+import pytest
+
+import utils.validate_data as validate
+from models.cargo_data import CargoData
+from models.proof_response import ProofResponse
+from proof import get_source_data
+from utils.chat_result_cache import ChatAnalysis
+
+MESSAGES = [
+    "are we still meeting at the station tomorrow morning",
+    "yes and please bring the printed tickets with you",
+    "the train leaves at nine so we should be there early",
+    "I will grab coffee for both of us on the way over",
+]
+
+
+def telegram_export(messages):
+    return {
+        'source': 'telegram',
+        'user': 'user-a',
+        'chats': [{
+            'chat_id': 1,
+            'contents': [
+                {
+                    '@type': 'message',
+                    'id': i,
+                    'sender_id': {'@type': 'messageSenderUser', 'user_id': 7},
+                    'chat_id': 1,
+                    'date': 1767225600 + 60 * i,
+                    'content': {'@type': 'messageText', 'text': {'@type': 'formattedText', 'text': text}}
+                }
+                for i, text in enumerate(messages)
+            ]
+        }]
+    }
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """The messages each validate_data call sent to the (expensive) analysis."""
+    calls = []
+
+    def analyze_chats(config, chats, number_of_keywords, use_lda, sentiment_token_budget, keywords_tfidf=None):
+        calls.append([messages for _, messages in chats])
+        return [
+            ChatAnalysis(
+                message_count=len(messages),
+                text_length=len(text),
+                sentiment_scores={'positive': float(len(messages))},
+                sentiment_tokens=len(messages),
+                keywords_keybert={'tickets': 1.0},
+                keywords_lda={'train': 1.0}
+            )
+            for text, messages in chats
+        ]
+    monkeypatch.setattr(validate, 'analyze_chats', analyze_chats)
+    return calls
+
+
+def submit(config, messages):
+    cargo_data = CargoData(source_data=get_source_data(telegram_export(messages)), source_id='user-a')
+    proof_response = ProofResponse(dlp_id=1)
+    validate.validate_data(config, cargo_data, proof_response)
+    return proof_response, cargo_data.chat_list
+
+
+def test_resubmitted_chat_only_analyzes_new_messages(tmp_path, analyzed):
+    config = {'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt'}
+
+    submit(config, MESSAGES[:3])
+    assert analyzed == [[MESSAGES[:3]]]
+
+    # unchanged: no longer unique, but its cached analysis is reused without analyzing anything
+    proof_response, chat_list = submit(config, MESSAGES[:3])
+    assert proof_response.uniqueness < 0.5
+    assert len(analyzed) == 1
+    assert chat_list[0].analysis_tier == 'full'
+    assert chat_list[0].keywords_keybert == {'tickets': 1.0}
+
+    # grown by one message: only that message is analyzed
+    proof_response, chat_list = submit(config, MESSAGES)
+    assert proof_response.uniqueness < 0.5
+    assert analyzed[1:] == [[MESSAGES[3:]]]
+    assert chat_list[0].analysis_tier == 'full'
+
+
+def test_cached_results_are_per_inference_backend(tmp_path, analyzed):
+    submit({'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt'}, MESSAGES)
+    _, chat_list = submit(
+        {'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt', 'inference_backend': 'onnx'},
+        MESSAGES
+    )
+    # the resubmission is not unique and nothing was cached for onnx, so it is not analyzed
+    assert len(analyzed) == 1
+    assert chat_list == []
+
+
+def test_merged_keywords_keep_the_size_of_a_fresh_extraction(tmp_path, monkeypatch):
+    calls = []
+
+    def analyze_chats(config, chats, number_of_keywords, use_lda, sentiment_token_budget, keywords_tfidf=None):
+        calls.append(chats)
+        # up to number_of_keywords topics x LDA_WORDS_PER_TOPIC words, as get_keywords_lda returns
+        words = [f"word{len(calls)}_{i}" for i in range(20)]
+        return [
+            ChatAnalysis(
+                message_count=len(messages),
+                text_length=len(text),
+                sentiment_scores={'positive': 1.0},
+                sentiment_tokens=1,
+                keywords_keybert={word: 1.0 for word in words[:number_of_keywords]},
+                keywords_lda={word: 1.0 for word in words}
+            )
+            for text, messages in chats
+        ]
+    monkeypatch.setattr(validate, 'analyze_chats', analyze_chats)
+    config = {'use_sealing': True, 'sealed_dir': str(tmp_path), 'salt': 'salt'}
+
+    _, chat_list = submit(config, MESSAGES[:3])
+    assert len(chat_list[0].keywords_lda) == 20
+    _, chat_list = submit(config, MESSAGES)
+    assert len(calls) == 2
+    assert len(chat_list[0].keywords_lda) == 40
+    assert len(chat_list[0].keywords_keybert) == 10
+
+
+def test_merge_caps_keywords_like_a_fresh_extraction():
+    def analysis(prefix, count):
+        return ChatAnalysis(
+            message_count=1, text_length=10, sentiment_scores={}, sentiment_tokens=0,
+            keywords_keybert={f"{prefix}{i}": 1.0 for i in range(count)},
+            keywords_lda={f"{prefix}{i}": 1.0 for i in range(count)}
+        )
+
+    merged = analysis('a', 30).merge(analysis('b', 30), 10, 50)
+
+    assert len(merged.keywords_keybert) == 10
+    assert len(merged.keywords_lda) == 50
@@ -0,0 +1,87 @@
+import pytest
+
+from models.cargo_data import CONTENT_SEPARATOR, SourceChatData
+from utils.chat_sampling import SamplingPolicy, analysis_input
+
+
+def chat(chat_id=1, count=200):
+    source_chat = SourceChatData(chat_id=chat_id)
+    # older messages are longer, so age strata differ in size
+    source_chat.add_contents(
+        [f"message {i} " + "word " * (i % 7 + (5 if i < count // 2 else 0)) for i in range(count)],
+        list(range(count, 0, -1))
+    )
+    return source_chat
+
+
+def sampled_chars(source_chat, indexes):
+    return sum(source_chat.content_lengths[i] for i in indexes) + (len(indexes) - 1) * len(CONTENT_SEPARATOR)
+
+
+@pytest.mark.parametrize('strategy', ['stratified', 'reservoir'])
+def test_same_seed_same_sample(strategy):
+    source_chat = chat()
+    policy = SamplingPolicy(max_chars=500, strategy=strategy, seed=3)
+
+    sample = policy.sample(source_chat, 0, 200)
+    assert sample == SamplingPolicy(max_chars=500, strategy=strategy, seed=3).sample(chat(), 0, 200)
+    assert sample != SamplingPolicy(max_chars=500, strategy=strategy, seed=4).sample(source_chat, 0, 200)
+    assert sample == sorted(set(sample))
+
+
+@pytest.mark.parametrize('strategy', ['stratified', 'reservoir'])
+def test_sample_fits_in_max_chars(strategy):
+    source_chat = chat()
+    for max_chars in (50, 500, 2000):
+        sample = SamplingPolicy(max_chars=max_chars, strategy=strategy).sample(source_chat, 0, 200)
+        assert sample
+        assert sampled_chars(source_chat, sample) <= max_chars
+
+
+def test_stratified_sample_covers_every_age_and_reservoir_does_not_have_to():
+    source_chat = chat()
+    stratified = SamplingPolicy(max_chars=1000, strategy='stratified').sample(source_chat, 0, 200)
+    reservoir = SamplingPolicy(max_chars=1000, strategy='reservoir').sample(source_chat, 0, 200)
+
+    # ten strata of twenty messages by age, each sampled in proportion to its text
+    assert {index // 20 for index in stratified} == set(range(10))
+    assert stratified != reservoir
+
+
+def test_sample_starts_at_offset():
+    source_chat = chat()
+    sample = SamplingPolicy(max_chars=300).sample(source_chat, 150, 200)
+    assert sample and min(sample) >= 150 and max(sample) < 200
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError, match='Unknown sampling strategy'):
+        SamplingPolicy(strategy='random')
+
+
+def test_short_chat_is_analyzed_whole():
+    source_chat = chat(count=5)
+    text, messages, sampled = analysis_input(source_chat, 0, SamplingPolicy(max_chars=10000))
+    assert not sampled
+    assert text == source_chat.content_as_text()
+    assert messages == list(source_chat.contents)
+
+    text, messages, sampled = analysis_input(source_chat, 2, SamplingPolicy())
+    assert not sampled
+    assert messages == source_chat.contents[2:]
+    assert len(text) == source_chat.text_length(2)
+
+
+def test_long_chat_is_analyzed_from_a_sample():
+    source_chat = chat()
+    text, messages, sampled = analysis_input(source_chat, 100, SamplingPolicy(max_chars=300))
+    assert sampled
+    assert len(text) <= 300 < source_chat.text_length(100)
+    assert set(messages) <= set(source_chat.contents[100:])
+    assert text == CONTENT_SEPARATOR.join(messages)
+
+
+def test_text_length():
+    source_chat = chat(count=10)
+    for start in range(12):
+        assert source_chat.text_length(start) == len(CONTENT_SEPARATOR.join(source_chat.contents[start:]))
@@ -0,0 +1,53 @@
+import multiprocessing
+
+import numpy as np
+
+from utils.embedding_cache import DiskEmbeddingTier, EmbeddingCache
+
+DIM = 8
+
+
+def vector_of(key: bytes) -> np.ndarray:
+    return np.frombuffer(key[:DIM], dtype=np.uint8).astype(np.float32)
+
+
+def write_keys(directory: str, writer: int, batches: int) -> None:
+    tier = DiskEmbeddingTier(directory, DIM, 1000000)
+    for batch in range(batches):
+        # every batch shares some keys with the other writer and adds some of its own
+        keys = [EmbeddingCache.key('model', f"shared {batch} {i}") for i in range(5)]
+        keys += [EmbeddingCache.key('model', f"writer {writer} {batch} {i}") for i in range(5)]
+        tier.put_many(keys, np.stack([vector_of(key) for key in keys]))
+        for key in keys:
+            assert np.array_equal(tier.get(key), vector_of(key))
+
+
+def test_two_processes_append_to_one_tier(tmp_path):
+    directory = str(tmp_path / 'tier')
+    context = multiprocessing.get_context('spawn')
+    writers = [context.Process(target=write_keys, args=(directory, writer, 200)) for writer in range(2)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+    assert [process.exitcode for process in writers] == [0, 0]
+
+    tier = DiskEmbeddingTier(directory, DIM, 1000000)
+    assert len(tier.rows) == 200 * 15
+    for key in tier.rows:
+        assert np.array_equal(tier.get(key), vector_of(key))
+
+
+def test_rows_written_without_keys_are_dropped(tmp_path):
+    directory = str(tmp_path / 'tier')
+    tier = DiskEmbeddingTier(directory, DIM, 100)
+    first = EmbeddingCache.key('model', 'first')
+    tier.put_many([first], vector_of(first)[None])
+    with open(tier.vectors_path, 'ab') as f:  # a crash between the vector and the key write
+        f.write(np.zeros(DIM, dtype=np.float32).tobytes())
+
+    second = EmbeddingCache.key('model', 'second')
+    tier.put_many([second], vector_of(second)[None])
+    reopened = DiskEmbeddingTier(directory, DIM, 100)
+    assert np.array_equal(reopened.get(second), vector_of(second))
+    assert np.array_equal(reopened.get(first), vector_of(first))
@@ -0,0 +1,16 @@
+import importlib.util
+
+import pytest
+
+from utils.inference_backends import check_backend_requirements
+
+
+def test_torch_backend_needs_no_extras():
+    check_backend_requirements('torch')
+    check_backend_requirements('quantized')
+
+
+@pytest.mark.skipif(importlib.util.find_spec('onnxruntime') is not None, reason='onnxruntime is installed')
+def test_onnx_backend_names_missing_packages():
+    with pytest.raises(ImportError, match='onnxruntime'):
+        check_backend_requirements('onnx')
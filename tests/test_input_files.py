@@ -0,0 +1,82 @@
+import io
+import zipfile
+
+import pytest
+
+from utils.input_files import InputLimitError, LimitedReader, iter_input_files
+
+CHATS = b'{"source": "telegram", "chats": []}'
+
+
+def write_zip(path, members, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, 'w', compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def read_all(input_path, config=None):
+    return {input_file.name: input_file.open().read() for input_file in iter_input_files(input_path, config)}
+
+
+def test_members_are_flattened_and_metadata_skipped(tmp_path):
+    path = write_zip(tmp_path / 'export.zip', {
+        'export/nested/chats.json': CHATS,
+        '__MACOSX/export/._chats.json': b'resource fork',
+        'export/.DS_Store': b'finder',
+        'export/empty/': b'',
+    })
+
+    assert read_all(path) == {'chats.json': CHATS.decode()}
+
+
+def test_zip_in_input_directory_is_read_in_place(tmp_path):
+    write_zip(tmp_path / 'a.zip', {'inner/chats.json': CHATS})
+    (tmp_path / 'b.json').write_bytes(b'{}')
+
+    assert read_all(str(tmp_path)) == {'chats.json': CHATS.decode(), 'b.json': '{}'}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a.zip', 'b.json']  # nothing extracted
+
+
+def test_member_larger_than_max_file_bytes(tmp_path):
+    path = write_zip(tmp_path / 'export.zip', {'chats.json': b'x' * 1000}, zipfile.ZIP_STORED)
+
+    with pytest.raises(InputLimitError, match='bytes uncompressed'):
+        read_all(path, {'max_input_file_bytes': 999})
+    assert read_all(path, {'max_input_file_bytes': 1000})['chats.json'] == 'x' * 1000
+
+
+def test_members_larger_than_max_total_bytes(tmp_path):
+    path = write_zip(tmp_path / 'export.zip', {'a.json': b'x' * 600, 'b.json': b'y' * 600}, zipfile.ZIP_STORED)
+
+    with pytest.raises(InputLimitError, match='Input is larger than 1000 bytes'):
+        read_all(path, {'max_input_total_bytes': 1000})
+
+
+def test_total_counts_zips_and_plain_files_together(tmp_path):
+    write_zip(tmp_path / 'a.zip', {'a.json': b'x' * 600}, zipfile.ZIP_STORED)
+    (tmp_path / 'b.json').write_bytes(b'y' * 600)
+
+    with pytest.raises(InputLimitError):
+        read_all(str(tmp_path), {'max_input_total_bytes': 1000})
+
+
+def test_highly_compressed_member_is_a_zip_bomb(tmp_path):
+    path = write_zip(tmp_path / 'bomb.zip', {'chats.json': b'\0' * (1 << 20)})
+
+    with pytest.raises(InputLimitError, match='compression ratio'):
+        read_all(path)
+    assert len(read_all(path, {'max_compression_ratio': 10000})['chats.json']) == 1 << 20
+
+
+def test_member_stream_longer_than_declared_size():
+    reader = io.BufferedReader(LimitedReader(io.BytesIO(b'x' * 100), 10, 'chats.json'))
+
+    with pytest.raises(InputLimitError, match='larger than its declared size'):
+        reader.read()
+
+
+def test_member_stream_of_declared_size():
+    reader = io.BufferedReader(LimitedReader(io.BytesIO(b'x' * 10), 10, 'chats.json'))
+
+    assert reader.read() == b'x' * 10
@@ -0,0 +1,24 @@
+import numpy as np
+
+from utils.near_duplicates import NearDuplicateIndex, chat_shingles, empty_signatures, minhash_signatures
+
+
+def test_chats_without_words_are_not_near_duplicates(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'lsh.sqlite'))
+    emoji_chat = ["😂😂", "👍", "!!!"]
+    other_emoji_chat = ["🎉", "🔥🔥🔥", "..."]
+    signatures = minhash_signatures([chat_shingles(emoji_chat)])
+    assert empty_signatures(signatures).all()
+
+    index.add_many(['a'], signatures)
+    similarities = index.max_similarities(minhash_signatures([chat_shingles(other_emoji_chat)]))
+    assert similarities.tolist() == [0.0]
+
+
+def test_resubmitted_chat_is_a_near_duplicate(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'lsh.sqlite'))
+    chat = ["are we still meeting at the station tomorrow", "yes bring the printed tickets please"]
+    signatures = minhash_signatures([chat_shingles(chat)])
+    assert not empty_signatures(signatures).any()
+    index.add_many(['a'], signatures)
+    assert np.allclose(index.max_similarities(signatures), [1.0])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import utils.feature_extraction as feature_extraction
+import utils.parallel_scoring as parallel_scoring
+from utils.feature_extraction import get_model_stats, model_registry
+from utils.parallel_scoring import _merge_worker_stats
+from utils.profiling import ProfileSession, profiler
+
+
+def worker_result(keywords):
+    session = ProfileSession('time')
+    session.enter('get_keywords_keybert')
+    session.record_batch('keybert_embed', 3)
+    session.exit()
+    session.count('chats')
+    stats = {
+        'call_counts': {'get_keywords_keybert': 1},
+        'call_seconds': {'get_keywords_keybert': 0.5},
+        'embedding_cache': {'hits': 4, 'disk_hits': 1, 'misses': 2, 'encode_seconds': 0.25},
+        'profile': session.finish()
+    }
+    return keywords, None, stats
+
+
+def test_worker_stats_are_merged_into_the_parent():
+    calls = model_registry.call_counts.get('get_keywords_keybert', 0)
+    cache = get_model_stats()['embedding_cache']
+    results = [worker_result({'a': 1.0}), worker_result({'b': 1.0})]
+    with profiler.session('time') as session:
+        keywords = list(_merge_worker_stats(results))
+
+    assert keywords == [({'a': 1.0}, None), ({'b': 1.0}, None)]
+    assert model_registry.call_counts['get_keywords_keybert'] == calls + 2
+    assert session.profile['stages']['get_keywords_keybert']['calls'] == 2
+    assert session.profile['batch_sizes']['keybert_embed']['items'] == 6
+    assert session.profile['counters']['chats'] == 2
+    merged_cache = get_model_stats()['embedding_cache']
+    assert merged_cache['hits'] == cache['hits'] + 8
+    assert merged_cache['disk_hits'] == cache['disk_hits'] + 2
+    assert merged_cache['misses'] == cache['misses'] + 4
+    assert merged_cache['encode_seconds'] == pytest.approx(cache['encode_seconds'] + 0.5)
+
+
+def test_worker_task_returns_its_embedding_cache_lookups(monkeypatch):
+    def get_keywords_keybert(text, number_of_keywords):
+        feature_extraction.embedding_cache.embed('model', [text, text + ' again'], lambda texts: np.ones((len(texts), 4)))
+        return {'a': 1.0}
+    monkeypatch.setattr(parallel_scoring, 'get_keywords_keybert', get_keywords_keybert)
+    monkeypatch.setattr(feature_extraction, 'embedding_cache', feature_extraction.EmbeddingCache())
+
+    parallel_scoring._extract_chat_keywords(('first chat', 5, False, 'off'))
+    keywords_keybert, keywords_lda, stats = parallel_scoring._extract_chat_keywords(('first chat', 5, False, 'off'))
+
+    assert (keywords_keybert, keywords_lda) == ({'a': 1.0}, None)
+    assert stats['embedding_cache']['hits'] == 2
+    assert stats['embedding_cache']['misses'] == 0
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+from models.cargo_data import SourceChatData
+from utils.quality_scoring import QualityColumns, round_like_builtin, score_quality
+
+
+def random_chats(count, seed):
+    rng = random.Random(seed)
+    chats = []
+    for chat_id in range(count):
+        chat = SourceChatData(chat_id=chat_id + 1)
+        for _ in range(rng.randint(0, 12)):
+            chat.add_participant(rng.randint(1, 6))
+            chat.add_content('x' * rng.randint(1, 200), rng.choice([0, rng.randint(0, 120), rng.randint(0, 60 * 24 * 30)]))
+        chats.append(chat)
+    return chats
+
+
+def test_columns_match_scalar_methods():
+    chats = random_chats(2000, seed=1)
+    columns = QualityColumns.from_chats(chats)
+
+    assert score_quality(chats) == [chat.quality_score() for chat in chats]
+    # np.exp may differ from math.exp in the last bit before rounding
+    np.testing.assert_allclose(columns.timeliness(), [chat.timeliness_value() for chat in chats], rtol=1e-12)
+    np.testing.assert_allclose(columns.thoughtfulness(), [chat.thoughtfulness_of_conversation() for chat in chats], rtol=1e-12)
+    np.testing.assert_allclose(columns.contextualness(), [chat.contextualness_of_conversation() for chat in chats], rtol=1e-12)
+
+
+def test_chat_without_messages():
+    chat = SourceChatData(chat_id=1)
+    assert score_quality([chat]) == [chat.quality_score()]
+    assert score_quality([]) == []
+
+
+def test_half_way_ties_round_like_builtin_round():
+    ties = [(2 * k + 1) / 200 for k in range(1000)]
+    expected = [round(value, 2) for value in ties]
+    # np.rint rounds the decimal tie, round() the binary value next to it; they differ for many ties
+    assert (np.rint(np.array(ties) * 100) / 100 != expected).any()
+
+    assert round_like_builtin(np.array(ties), 2).tolist() == expected
+    values = np.random.RandomState(0).random_sample(10000).tolist()
+    assert round_like_builtin(np.array(values), 2).tolist() == [round(value, 2) for value in values]
@@ -0,0 +1,81 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from server import ProofRequestHandler, ProofWorker
+
+
+@pytest.fixture
+def server():
+    # the worker thread is not started: requests rejected before queueing never need it
+    worker = ProofWorker({'use_sealing': False}, queue_size=1)
+    handler = type('Handler', (ProofRequestHandler,), {'worker': worker})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, worker
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(httpd, path, body):
+    connection = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@pytest.mark.parametrize('timeout', ['abc', '-1', 'nan', 'inf'])
+def test_invalid_timeout_is_a_bad_request(server, timeout):
+    httpd, worker = server
+    status, body = post(httpd, f'/proofs?timeout={timeout}', {'chats': {}})
+    assert status == 400
+    assert 'timeout' in body['error']
+    assert worker.stats()['queued'] == 0
+
+
+def test_full_queue_is_counted(server):
+    httpd, worker = server
+    assert post(httpd, '/proofs?async=1', {'chats': {}})[0] == 202
+    assert post(httpd, '/proofs?async=1', {'chats': {}})[0] == 503
+    assert worker.stats()['rejected'] == 1
+
+
+def request(httpd, method, path, body=b'', headers=None):
+    connection = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    connection.request(method, path, body, headers or {})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_negative_content_length_is_a_bad_request(server):
+    httpd, worker = server
+    status, body = request(httpd, 'POST', '/proofs', b'{}', {'Content-Length': '-1'})
+    assert status == 400
+    assert 'Content-Length' in body['error']
+    assert worker.stats()['queued'] == 0
+
+
+def test_cancelled_job_frees_its_queue_slot(server):
+    httpd, worker = server
+    status, body = post(httpd, '/proofs?async=1', {'chats': {}})
+    assert status == 202
+    assert request(httpd, 'DELETE', f"/proofs/{body['job_id']}")[1]['status'] == 'cancelled'
+    assert worker.stats()['queued'] == 0
+
+    assert post(httpd, '/proofs?async=1', {'chats': {}})[0] == 202
+    assert worker.stats()['rejected'] == 0
+
+
+def test_path_and_query_are_percent_decoded(server):
+    httpd, worker = server
+    status, body = post(httpd, '/proofs?async=%31', {'chats': {}})
+    assert status == 202
+    job_id = body['job_id']
+    encoded = ''.join(f'%{ord(char):02x}' for char in job_id)
+    status, body = request(httpd, 'GET', f'/%70roofs/{encoded}')
+    assert status == 200
+    assert body['job_id'] == job_id
@@ -0,0 +1,69 @@
+import pytest
+
+from models.cargo_data import DataSource
+from utils.source_adapters import DiscordAdapter, SourceAdapter, get_source_adapter
+
+NOW = 1767225600  # 2026-01-01T00:00:00Z
+
+
+def discord_message(content, author_id='111', timestamp='2026-01-01T00:00:00+00:00', message_type='Default'):
+    return {
+        'id': '1',
+        'type': message_type,
+        'timestamp': timestamp,
+        'content': content,
+        'author': {'id': author_id, 'name': 'someone'},
+    }
+
+
+def build(messages):
+    builder = get_source_adapter(DataSource.discord).chat_builder()
+    for message in messages:
+        builder.add(message)
+    return builder.build('chat', NOW)
+
+
+def test_source_adapter_is_abstract():
+    with pytest.raises(TypeError):
+        SourceAdapter()
+
+
+def test_only_default_and_reply_messages_count():
+    chat = build([
+        discord_message("hello there", author_id='111'),
+        discord_message("replying to you", author_id='222', message_type='Reply'),
+        discord_message("Pinned a message.", author_id='333', message_type='ChannelPinnedMessage'),
+        discord_message("Joined the server.", author_id='444', message_type='GuildMemberJoin'),
+    ])
+
+    assert list(chat.contents) == ["hello there", "replying to you"]
+    assert chat.participants == ['111', '222']
+
+
+@pytest.mark.parametrize('timestamp', [
+    '2025-12-31T22:00:00Z',
+    '2025-12-31T22:00:00.123+00:00',
+    '2026-01-01T01:00:00+03:00',
+    '2025-12-31T17:00:00-05:00',
+    '2025-12-31T22:00:00',  # no offset is UTC
+])
+def test_iso_timestamps_are_converted_to_utc(timestamp):
+    assert DiscordAdapter.epoch_seconds(timestamp) == NOW - 7200
+    assert list(build([discord_message("two hours ago", timestamp=timestamp)]).content_minutes) == [120]
+
+
+def test_malformed_timestamp_is_skipped(caplog):
+    chat = build([
+        discord_message("sent at an unknown time", author_id='111', timestamp='yesterday-ish'),
+        discord_message("sent an hour ago", author_id='222', timestamp='2025-12-31T23:00:00Z'),
+    ])
+
+    assert list(chat.contents) == ["sent an hour ago"]
+    assert list(chat.content_minutes) == [60]
+    assert chat.participants == ['222']
+    assert 'malformed timestamp' in caplog.text
+
+
+def test_missing_timestamp_counts_as_current():
+    chat = build([discord_message("no timestamp", timestamp=None)])
+    assert list(chat.content_minutes) == [0]
@@ -0,0 +1,120 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import proof
+from proof import get_source_data, get_source_data_stream
+from utils.stream_parser import JsonStreamReader, iter_chats
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+@pytest.fixture(autouse=True)
+def frozen_now(monkeypatch):
+    # both paths compute message ages from the submission time
+    monkeypatch.setattr(proof, 'datetime', FrozenDatetime)
+
+
+def message(i, text, user_id=7):
+    return {
+        '@type': 'message',
+        'id': i,
+        'sender_id': {'@type': 'messageSenderUser', 'user_id': user_id},
+        'date': 1767225600 - 3600 * i,
+        'content': {'@type': 'messageText', 'text': {'@type': 'formattedText', 'text': text}}
+    }
+
+
+def export():
+    return {
+        'source': 'telegram',
+        'user': 'user-a',
+        'chats': [
+            {'chat_id': 1, 'contents': [
+                message(1, "are we still meeting tomorrow?"),
+                message(2, "tab\tquote\" backslash\\ newline\n", user_id=8),
+                {'@type': 'messageChatJoinByLink', 'id': 3},
+            ]},
+            {'chat_id': 2, 'contents': [
+                message(4, "emoji 😀 and accents café, 日本語"),
+                message(5, "numbers 1.5e3 -0.25 12345678901234567890"),
+            ]},
+            {'chat_id': 3, 'contents': []},
+        ]
+    }
+
+
+def snapshot(source_data):
+    return (
+        source_data.source,
+        source_data.user,
+        [
+            (chat.chat_id, list(chat.contents), sorted(chat.participant_ids), list(chat.content_minutes))
+            for chat in source_data.source_chats
+        ]
+    )
+
+
+def streamed(text):
+    return get_source_data_stream(io.StringIO(text))
+
+
+def reordered(data, order):
+    return {key: data[key] for key in order if key in data}
+
+
+def test_stream_matches_parsed_export():
+    data = export()
+    assert snapshot(streamed(json.dumps(data))) == snapshot(get_source_data(data))
+
+
+def test_source_after_chats():
+    data = reordered(export(), ['chats', 'user', 'source'])
+    assert snapshot(streamed(json.dumps(data))) == snapshot(get_source_data(data))
+
+
+def test_chat_id_after_contents():
+    data = export()
+    data['chats'] = [reordered(chat, ['contents', 'chat_id']) for chat in data['chats']]
+    assert snapshot(streamed(json.dumps(data))) == snapshot(get_source_data(data))
+
+
+def test_missing_source():
+    data = export()
+    del data['source']
+    result = streamed(json.dumps(data))
+    assert result.source is None
+    assert snapshot(result) == snapshot(get_source_data(data))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7])
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_tiny_chunks_split_numbers_escapes_and_surrogates(monkeypatch, chunk_size, ensure_ascii):
+    monkeypatch.setattr(proof, 'JsonStreamReader', lambda stream: JsonStreamReader(stream, chunk_size))
+    # ensure_ascii writes the emoji as a \ud83d\ude00 surrogate pair, split across reads
+    data = export()
+    text = json.dumps(data, ensure_ascii=ensure_ascii)
+    assert snapshot(streamed(text)) == snapshot(get_source_data(data))
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '[]',
+    '{"source": "telegram", "chats": [{"chat_id": 1, "contents": [',
+    '{"source": "telegram", "chats": [{"chat_id": 1 "contents": []}]}',
+    '{"source": "telegram" "chats": []}',
+    '{"source": "telegram", "chats": [{"chat_id": 1, "contents": [{"@type": "message"]}]}',
+    '{"source": "telegram", "chats": [{"chat_id": 1, "contents": [{"text": "cut off',
+    '{"source": "telegram", "chats": [}',
+])
+def test_malformed_json_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_chats(JsonStreamReader(io.StringIO(text), chunk_size=4)))
@@ -0,0 +1,62 @@
+import nltk.tokenize
+import pytest
+from nltk.tokenize import word_tokenize
+from nltk.tokenize.punkt import PunktParameters, PunktSentenceTokenizer
+
+from utils.text_preprocessing import TextPreprocessor
+
+STOP_WORDS = {'the', 'a', 'is', 'to', 'of', 'and', 'i', 'it', 'you', 'on', 'in', 'at', 'for', 'not'}
+
+TEXTS = [
+    "Hello there. How are you? I'm fine!",
+    "Mr. Smith met Dr. Jones at 5 p.m. on Jan. 3. They talked.",
+    "We moved to the U.S. last year. It's great, e.g. the food... Right?!",
+    "Wait -- what?? No way!!! (He said \"really.\") Then: she left.",
+    "I cannot go, gonna stay. Gimme 5.5 mins, ok? Prices rose 10% ($3.50) e.g. today.",
+    "Ends with a quote 'like this.' And another sentence ending in brackets [see it.]",
+    "no punctuation at all here   ",
+    "Trailing abbreviation etc.",
+    "Line one.\nLine two?\n\nLine three! email me at someone@example.com. Thanks.",
+    "Don't won't can't shouldn't. She'd've gone. O'Neil's dog's bone.",
+]
+
+
+@pytest.fixture
+def sentence_tokenizer(monkeypatch):
+    """Punkt with the english model if the NLTK data is installed, else with a few known abbreviations."""
+    try:
+        nltk.tokenize.sent_tokenize('Mr. Smith left.')
+    except LookupError:
+        parameters = PunktParameters()
+        parameters.abbrev_types = {'mr', 'dr', 'p.m', 'jan', 'e.g', 'u.s', 'etc'}
+        tokenizer = PunktSentenceTokenizer(parameters)
+        # patches the tokenizer both word_tokenize and TextPreprocessor split sentences with
+        monkeypatch.setattr(nltk.tokenize, '_get_punkt_tokenizer', lambda language='english': tokenizer)
+
+
+def reference_tokens(text):
+    return [word for word in word_tokenize(text.lower()) if word.isalnum() and word not in STOP_WORDS]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_tokens_match_word_tokenize(sentence_tokenizer, text):
+    preprocessor = TextPreprocessor(stop_words=STOP_WORDS)
+
+    assert preprocessor.tokenize(text) == reference_tokens(text)
+
+
+def test_batch_matches_word_tokenize_with_shared_cache(sentence_tokenizer):
+    preprocessor = TextPreprocessor(stop_words=STOP_WORDS)
+
+    # the second pass is served from the chunk cache
+    for _ in range(2):
+        assert preprocessor.tokenize_batch(TEXTS) == [reference_tokens(text) for text in TEXTS]
+
+
+def test_chunk_cache_stays_bounded(sentence_tokenizer):
+    preprocessor = TextPreprocessor(stop_words=STOP_WORDS, max_cached_chunks=8)
+
+    tokens = preprocessor.tokenize_batch(TEXTS)
+
+    assert len(preprocessor._chunk_words) == 8
+    assert tokens == [reference_tokens(text) for text in TEXTS]
@@ -0,0 +1,41 @@
+import pytest
+
+from utils.bloom_filter import ScalableBloomFilter
+from utils.uniqueness_index import UniquenessIndex, is_trivial_message
+from utils.validate_data import score_message_uniqueness
+
+TRIVIAL = ["ok", "lol", "hi", "hahahahahahahahahaha", "OK  ", "thanks!"]
+
+
+def record(index, bloom, source_id, chat_id, contents):
+    hashes = index.message_hashes(contents)
+    index.add_chat(index.chat_key(source_id, chat_id), len(contents), hashes)
+    bloom.update(hashes)
+
+
+def test_trivial_messages():
+    assert all(is_trivial_message(content) for content in TRIVIAL)
+    assert not is_trivial_message("are we still meeting at the station tomorrow?")
+
+
+def test_users_sharing_only_trivial_messages_keep_full_uniqueness(tmp_path):
+    index = UniquenessIndex(str(tmp_path / 'index.sqlite'), 'salt')
+    bloom = ScalableBloomFilter()
+    first = TRIVIAL + ["are we still meeting at the station tomorrow?", "I will bring the printed tickets"]
+    second = TRIVIAL + ["the new release fixes the login crash", "can you review my pull request today"]
+
+    assert score_message_uniqueness(index, bloom, index.message_hashes(first)) == 1
+    record(index, bloom, 'user-a', 1, first)
+    assert score_message_uniqueness(index, bloom, index.message_hashes(second)) == 1
+    record(index, bloom, 'user-b', 2, second)
+
+    # a real repeat still counts
+    copied = second[-2:] + ["something new that nobody has written before"]
+    assert score_message_uniqueness(index, bloom, index.message_hashes(copied)) == pytest.approx(1 / 3)
+
+
+def test_chat_of_only_trivial_messages_is_not_penalized(tmp_path):
+    index = UniquenessIndex(str(tmp_path / 'index.sqlite'), 'salt')
+    bloom = ScalableBloomFilter()
+    record(index, bloom, 'user-a', 1, TRIVIAL)
+    assert score_message_uniqueness(index, bloom, index.message_hashes(TRIVIAL)) == 1